@@ -11,7 +11,7 @@ import {
 } from 'recharts';
 import { Trophy, TrendingUp } from 'lucide-react';
 import { Card } from '@/components/ui/card';
-import { Team } from '@/services/api';
+import { fetchHistory, HistoryApiResponse, Team } from '@/services/api';
 import confetti from 'canvas-confetti';
 import {
   Select,
@@ -21,19 +21,25 @@ import {
   SelectValue,
 } from '@/components/ui/select';
 
-interface TeamProgress {
+interface ChallengeProgress {
+  key: string; // Chart data key (series names and labels may contain dots)
   name: string;
   color: string;
-  progress: number;
+  progress: number; // Latest participant count
 }
 
 interface ChartDataPoint {
   time: string;
-  [key: string]: number | string;
+  [key: string]: number | string | null;
 }
 
 const REFRESH_DURATION = 10000; // 10 seconds
 
+// Chart the last 6 hours, in 60 buckets downsampled by the server
+const HISTORY_SPAN = 6 * 60 * 60;
+const HISTORY_POINTS = 60;
+const PARTICIPANTS_SERIES = 'challenge:*:participants';
+
 const TEAM_COLORS = [
   '#22c55e', // Green
   '#ef4444', // Red
@@ -52,134 +58,105 @@ const TEAM_COLORS = [
   '#6366f1', // Indigo
 ];
 
-const RealTimeProgress = ({ existingteams }: { existingteams: any[] }) => {
-  const [chartData, setChartData] = useState<ChartDataPoint[]>([]);
-  const [currentTime, setCurrentTime] = useState(0);
-  const [teams, setTeams] = useState<any[]>([]);
-  const [selectedTeam, setSelectedTeam] = useState<string | null>(null);
+const formatClock = (seconds: number): string =>
+  new Date(seconds * 1000).toLocaleTimeString('fr-FR', {
+    hour: '2-digit',
+    minute: '2-digit',
+  });
+
+const RealTimeProgress = ({ existingteams }: { existingteams: Team[] }) => {
+  const [history, setHistory] = useState<HistoryApiResponse | null>(null);
+  const [lastUpdate, setLastUpdate] = useState<Date | null>(null);
+  const [selectedChallenge, setSelectedChallenge] = useState<string | null>(null);
   const previousLeaderRef = useRef<string | null>(null);
 
+  // Participant counts of every challenge, recorded and downsampled by the server
   useEffect(() => {
-    // Assign colors to teams based on predefined colors
-    const teamsWithColors = existingteams?.map((team, index) => ({
-      ...team,
-      color: TEAM_COLORS[index % TEAM_COLORS.length],
-      progress: Math.random() * 60 + 5, // Start between 5-65 for more variance
-    }));
-    setTeams(teamsWithColors || []);
-  }, [existingteams]);
-  useEffect(() => {
-    if (!teams || teams.length === 0) return;
+    let cancelled = false;
 
-    // Initialize chart with first data point
-    const initialData: ChartDataPoint = {
-      time: formatTime(0),
+    const loadHistory = async () => {
+      try {
+        const data = await fetchHistory([PARTICIPANTS_SERIES], {
+          start: -HISTORY_SPAN,
+          points: HISTORY_POINTS,
+        });
+        if (!cancelled) {
+          setHistory(data);
+          setLastUpdate(new Date());
+        }
+      } catch (error) {
+        console.error('Failed to fetch participants history:', error);
+      }
     };
 
-    teams.forEach((team) => {
-      initialData[team.name] = team.progress;
+    loadHistory();
+    const interval = setInterval(loadHistory, REFRESH_DURATION);
+
+    return () => {
+      cancelled = true;
+      clearInterval(interval);
+    };
+  }, []);
+
+  // Challenges with their latest participant count, most popular first
+  const challenges = useMemo<ChallengeProgress[]>(() => {
+    if (!history) return [];
+
+    return Object.entries(history.series)
+      .map(([name, series]) => {
+        const values = series.last.filter((value): value is number => value !== null);
+        return {
+          key: name.replace(/[^a-zA-Z0-9]/g, '_'),
+          name: series.label ?? name,
+          progress: values.length > 0 ? values[values.length - 1] : 0,
+        };
+      })
+      .sort((a, b) => b.progress - a.progress)
+      .map((challenge, index) => ({
+        ...challenge,
+        color: TEAM_COLORS[index % TEAM_COLORS.length],
+      }));
+  }, [history]);
+
+  const chartData = useMemo<ChartDataPoint[]>(() => {
+    if (!history) return [];
+
+    const seriesByKey = new Map(
+      Object.entries(history.series).map(([name, series]) => [
+        name.replace(/[^a-zA-Z0-9]/g, '_'),
+        series,
+      ])
+    );
+    const buckets = Math.max(
+      0,
+      ...Array.from(seriesByKey.values()).map((series) => series.last.length)
+    );
+
+    return Array.from({ length: buckets }, (_, index) => {
+      const point: ChartDataPoint = {
+        time: formatClock(history.start + index * history.step),
+      };
+      seriesByKey.forEach((series, key) => {
+        point[key] = series.last[index] ?? null;
+      });
+      return point;
     });
+  }, [history]);
 
-    setChartData([initialData]);
-
-    // Update chart every 2 seconds
-    const interval = setInterval(() => {
-      setCurrentTime((prevTime) => {
-        const newTime = prevTime + 2;
-
-        setChartData((prevData) => {
-          const newDataPoint: ChartDataPoint = {
-            time: formatTime(newTime),
-          };
-
-          // Update each team's progress with random changes
-          teams.forEach((team) => {
-            const lastValue = prevData[prevData.length - 1][
-              team.name
-            ] as number;
-
-            // Give selected team a boost (90% chance of positive change vs 40% for others)
-            let change;
-            if (team.name === selectedTeam) {
-              // Selected team gets +4 to +12 points most of the time, rarely -1 to +2
-              const isBoost = Math.random() > 0.1; // 90% chance of boost
-              change = isBoost
-                ? Math.random() * 8 + 4 // +4 to +12
-                : Math.random() * 3 - 1; // -1 to +2
-            } else {
-              // Other teams: -3 to +8 points for more variance
-              change = Math.random() * 11 - 3;
-            }
-
-            const newValue = Math.max(0, Math.min(100, lastValue + change));
-            newDataPoint[team.name] = Number(newValue.toFixed(1));
-          });
-
-          // Keep only last 15 data points for better visualization
-          const newData = [...prevData, newDataPoint];
-          if (newData.length > 15) {
-            return newData.slice(-15);
-          }
-          return newData;
-        });
+  const topChallenges = useMemo(() => challenges.slice(0, 3), [challenges]);
+  const top10Challenges = useMemo(() => challenges.slice(0, 10), [challenges]);
+  const leaderCount = challenges[0]?.progress || 1;
 
-        return newTime;
-      });
-    }, REFRESH_DURATION); // Update every 2 seconds
-
-    return () => clearInterval(interval);
-  }, [teams, selectedTeam]);
-
-  const formatTime = (seconds: number): string => {
-    const mins = Math.floor(seconds / 60);
-    const secs = seconds % 60;
-    return `${mins}:${secs.toString().padStart(2, '0')}`;
-  };
-
-  // Get top 3 teams by current progress for leaderboard
-  const getTopTeams = () => {
-    if (chartData.length === 0) return [];
-
-    const latestData = chartData[chartData.length - 1];
-    const teamScores = teams
-      .map((team) => ({
-        name: team.name,
-        color: team.color,
-        progress: latestData[team.name] as number,
-      }))
-      .sort((a, b) => b.progress - a.progress);
-
-    return teamScores.slice(0, 3);
-  };
-
-  // Get top 10 teams for chart display
-  const getTop10Teams = () => {
-    if (chartData.length === 0) return teams.slice(0, 10);
-
-    const latestData = chartData[chartData.length - 1];
-    const teamScores = teams
-      .map((team) => ({
-        ...team,
-        currentProgress: latestData[team.name] as number,
-      }))
-      .sort((a, b) => b.currentProgress - a.currentProgress);
-
-    return teamScores.slice(0, 10);
-  };
-
-  const topTeams = useMemo(() => getTopTeams(), [chartData, teams]);
-  const top10Teams = useMemo(() => getTop10Teams(), [chartData, teams]);
-
-  // Trigger confetti when selected team becomes leader
+  // Trigger confetti when the selected challenge becomes the most popular
   useEffect(() => {
-    if (!selectedTeam || topTeams.length === 0) return;
+    if (!selectedChallenge || topChallenges.length === 0) return;
 
-    const currentLeader = topTeams[0]?.name;
+    const currentLeader = topChallenges[0]?.name;
 
-    // Check if selected team just became the leader
+    // Check if the selected challenge just took the lead
     if (
-      currentLeader === selectedTeam &&
-      previousLeaderRef.current !== selectedTeam
+      currentLeader === selectedChallenge &&
+      previousLeaderRef.current !== selectedChallenge
     ) {
       // Trigger confetti celebration
       const duration = 3000;
@@ -213,7 +190,7 @@ const RealTimeProgress = ({ existingteams }: { existingteams: any[] }) => {
     }
 
     previousLeaderRef.current = currentLeader || null;
-  }, [topTeams, selectedTeam]);
+  }, [topChallenges, selectedChallenge]);
 
   return (
     <section
@@ -235,52 +212,52 @@ const RealTimeProgress = ({ existingteams }: { existingteams: any[] }) => {
           </h2>
 
           <p className='text-muted-foreground max-w-2xl mx-auto'>
-            Suivez la progression des équipes en direct pendant le Challenge de
-            la Nuit 2025
+            Suivez en direct le nombre d'équipes inscrites à chaque défi pendant
+            le Challenge de la Nuit 2025
           </p>
         </div>
 
-        {/* Team Selector */}
+        {/* Challenge Selector */}
         <div className='max-w-md mx-auto mb-8'>
           <Card
             className={`p-4 backdrop-blur-sm border-2 transition-all duration-500 ${
-              selectedTeam && topTeams[0]?.name === selectedTeam
+              selectedChallenge && topChallenges[0]?.name === selectedChallenge
                 ? 'bg-gradient-to-r from-yellow-500/20 to-orange-500/20 border-yellow-500 shadow-lg shadow-yellow-500/50'
                 : 'bg-card/50 border-border'
             }`}
           >
             <div className='space-y-2'>
               <label className='text-sm font-medium text-foreground'>
-                🎯 Sélectionnez votre équipe favorite
+                🎯 Sélectionnez votre défi favori
               </label>
               <Select
-                value={selectedTeam || ''}
-                onValueChange={setSelectedTeam}
+                value={selectedChallenge || ''}
+                onValueChange={setSelectedChallenge}
               >
                 <SelectTrigger className='w-full'>
-                  <SelectValue placeholder='Choisir une équipe...' />
+                  <SelectValue placeholder='Choisir un défi...' />
                 </SelectTrigger>
                 <SelectContent>
-                  {teams.map((team) => (
-                    <SelectItem key={team.id} value={team.name}>
+                  {challenges.map((challenge) => (
+                    <SelectItem key={challenge.key} value={challenge.name}>
                       <div className='flex items-center gap-2'>
                         <div
                           className='w-3 h-3 rounded-full'
-                          style={{ backgroundColor: team.color }}
+                          style={{ backgroundColor: challenge.color }}
                         />
-                        <span>{team.name}</span>
+                        <span>{challenge.name}</span>
                       </div>
                     </SelectItem>
                   ))}
                 </SelectContent>
               </Select>
-              {selectedTeam && topTeams[0]?.name === selectedTeam ? (
+              {selectedChallenge && topChallenges[0]?.name === selectedChallenge ? (
                 <div className='flex items-center gap-2 text-sm font-bold text-yellow-500 animate-pulse'>
-                  🏆 Votre équipe est en tête ! 🎉
+                  🏆 Votre défi est en tête ! 🎉
                 </div>
-              ) : selectedTeam ? (
+              ) : selectedChallenge ? (
                 <p className='text-xs text-muted-foreground'>
-                  🎉 Vous serez notifié quand {selectedTeam} prend la tête !
+                  🎉 Vous serez notifié quand {selectedChallenge} prend la tête !
                 </p>
               ) : null}
             </div>
@@ -296,7 +273,8 @@ const RealTimeProgress = ({ existingteams }: { existingteams: any[] }) => {
                   Graphique de Progression
                 </h3>
                 <p className='text-sm text-muted-foreground'>
-                  Mise à jour toutes les {REFRESH_DURATION} secondes
+                  Équipes inscrites par défi, mises à jour toutes les{' '}
+                  {REFRESH_DURATION / 1000} secondes
                 </p>
               </div>
 
@@ -318,9 +296,9 @@ const RealTimeProgress = ({ existingteams }: { existingteams: any[] }) => {
                   <YAxis
                     stroke='#888'
                     style={{ fontSize: '12px' }}
-                    domain={[0, 100]}
+                    allowDecimals={false}
                     label={{
-                      value: 'Progression (%)',
+                      value: 'Équipes inscrites',
                       angle: -90,
                       position: 'insideLeft',
                       style: { fill: '#888' },
@@ -333,19 +311,21 @@ const RealTimeProgress = ({ existingteams }: { existingteams: any[] }) => {
                       borderRadius: '8px',
                       color: '#fff',
                     }}
-                    formatter={(value: number) => [`${value.toFixed(1)}%`, '']}
+                    formatter={(value: number) => [`${value} équipes`, '']}
                   />
                   <Legend wrapperStyle={{ fontSize: '12px' }} iconType='line' />
-                  {top10Teams.map((team) => (
+                  {top10Challenges.map((challenge) => (
                     <Line
-                      key={team.name}
-                      type='monotone'
-                      dataKey={team.name}
-                      stroke={team.color}
+                      key={challenge.key}
+                      type='stepAfter'
+                      dataKey={challenge.key}
+                      name={challenge.name}
+                      stroke={challenge.color}
                       strokeWidth={2}
                       dot={false}
                       activeDot={{ r: 6 }}
                       animationDuration={500}
+                      connectNulls
                     />
                   ))}
                 </LineChart>
@@ -364,9 +344,9 @@ const RealTimeProgress = ({ existingteams }: { existingteams: any[] }) => {
               </div>
 
               <div className='space-y-3'>
-                {topTeams.map((team, index) => (
+                {topChallenges.map((challenge, index) => (
                   <div
-                    key={team.name}
+                    key={challenge.key}
                     className='flex items-center gap-3 p-3 rounded-lg bg-secondary/50 hover:bg-secondary/70 transition-colors'
                   >
                     {/* Rank */}
@@ -382,33 +362,33 @@ const RealTimeProgress = ({ existingteams }: { existingteams: any[] }) => {
                       {index + 1}
                     </div>
 
-                    {/* Team Info */}
+                    {/* Challenge Info */}
                     <div className='flex-1 min-w-0'>
                       <div className='flex items-center gap-2'>
                         <div
                           className='w-3 h-3 rounded-full'
-                          style={{ backgroundColor: team.color }}
+                          style={{ backgroundColor: challenge.color }}
                           aria-hidden='true'
                         />
                         <p className='font-medium text-foreground truncate text-sm'>
-                          {team.name}
+                          {challenge.name}
                         </p>
                       </div>
                       <div className='w-full bg-secondary rounded-full h-2 mt-2'>
                         <div
                           className='h-2 rounded-full transition-all duration-500'
                           style={{
-                            width: `${team.progress}%`,
-                            backgroundColor: team.color,
+                            width: `${(challenge.progress / leaderCount) * 100}%`,
+                            backgroundColor: challenge.color,
                           }}
                         />
                       </div>
                     </div>
 
-                    {/* Progress */}
+                    {/* Registered teams */}
                     <div className='text-right'>
                       <p className='font-bold text-foreground text-sm'>
-                        {team.progress?.toFixed(1) || '0.0'}%
+                        {challenge.progress}
                       </p>
                     </div>
                   </div>
@@ -427,15 +407,17 @@ const RealTimeProgress = ({ existingteams }: { existingteams: any[] }) => {
                   <span className='text-sm text-muted-foreground'>
                     Équipes Actives
                   </span>
-                  <span className='font-bold text-primary'>{teams.length}</span>
+                  <span className='font-bold text-primary'>
+                    {existingteams.length}
+                  </span>
                 </div>
 
                 <div className='flex justify-between items-center'>
                   <span className='text-sm text-muted-foreground'>
-                    Temps Écoulé
+                    Dernière mise à jour
                   </span>
                   <span className='font-bold text-foreground'>
-                    {formatTime(currentTime)}
+                    {lastUpdate ? formatClock(lastUpdate.getTime() / 1000) : '—'}
                   </span>
                 </div>
 
@@ -444,7 +426,7 @@ const RealTimeProgress = ({ existingteams }: { existingteams: any[] }) => {
                     Leader Actuel
                   </span>
                   <span className='font-bold text-foreground truncate max-w-[120px]'>
-                    {topTeams[0]?.name.replace('Team ', '')}
+                    {topChallenges[0]?.name}
                   </span>
                 </div>
               </div>
@@ -12,9 +12,52 @@ import {
 import { useState, useEffect } from 'react';
 import { Input } from '@/components/ui/input';
 import { Search } from 'lucide-react';
-import { fetchTeams, fetchTeamById, Team } from '@/services/api';
+import {
+  EntityChange,
+  fetchChangeCursor,
+  fetchTeams,
+  streamTeamsDetails,
+  subscribeToChanges,
+  Team,
+} from '@/services/api';
 import RealTimeProgress from '@/components/RealTimeProgress';
 
+// Reload interval of the team list while the change feed is unavailable
+const POLL_INTERVAL_MS = 10000;
+
+// Apply one change of the change feed to the team list
+const applyTeamChange = (teams: Team[], change: EntityChange): Team[] => {
+  if (change.entity !== 'team') {
+    return teams;
+  }
+  if (change.op === 'removed') {
+    return teams.filter((team) => team.id !== change.id);
+  }
+  const fields = (change.fields ?? {}) as Partial<Team>;
+  if (!teams.some((team) => team.id === change.id)) {
+    // Only the principal team list adds teams; team pages scraped on demand
+    // (any team, principal or not) must not add them to the dashboard
+    if (change.op !== 'added' || change.kind !== 'team_list') {
+      return teams;
+    }
+    return [
+      ...teams,
+      {
+        id: change.id,
+        name: fields.name ?? '',
+        createdAt: new Date().toISOString(),
+        members: fields.members ?? [],
+        selectedchall: fields.selectedchall ?? [],
+        status: 'en_cours' as const,
+        defis: [],
+      },
+    ];
+  }
+  return teams.map((team) =>
+    team.id === change.id ? { ...team, ...fields } : team
+  );
+};
+
 const Home = () => {
   const [searchQuery, setSearchQuery] = useState('');
   const [teams, setTeams] = useState<Team[]>([]);
@@ -22,6 +65,7 @@ const Home = () => {
   const [error, setError] = useState<string | null>(null);
   const [loadingDetails, setLoadingDetails] = useState(false);
   const [isInitialLoad, setIsInitialLoad] = useState(true);
+  const [isPolling, setIsPolling] = useState(false);
 
   useEffect(() => {
     const loadTeams = async () => {
@@ -40,7 +84,7 @@ const Home = () => {
 
         // Start lazy loading member counts in the background
         setLoadingDetails(true);
-        loadTeamDetails(data);
+        loadTeamDetails();
       } catch (err) {
         setError(
           'Impossible de charger les équipes. Veuillez réessayer plus tard.'
@@ -51,61 +95,83 @@ const Home = () => {
       }
     };
 
-    const loadTeamDetails = async (initialTeams: Team[]) => {
-      const BATCH_SIZE = 10; // Load 10 teams at a time
-      const teamIds = initialTeams.map((t) => t.id);
-
-      for (let i = 0; i < teamIds.length; i += BATCH_SIZE) {
-        const batch = teamIds.slice(i, i + BATCH_SIZE);
-
-        // Fetch this batch in parallel
-        const batchPromises = batch.map(async (id) => {
-          try {
-            const teamDetails = await fetchTeamById(id);
-            return teamDetails;
-          } catch (error) {
-            console.error(`Failed to fetch team ${id}:`, error);
-            return null;
+    const loadTeamDetails = async () => {
+      try {
+        // Fill in each team's details as soon as the server streams it
+        // (without ids, the server streams every team of the dashboard)
+        await streamTeamsDetails(
+          null,
+          (teamDetail) => {
+            setTeams((prevTeams) =>
+              prevTeams.map((team) =>
+                team.id === teamDetail.id ? teamDetail : team
+              )
+            );
           }
-        });
-
-        const batchResults = await Promise.all(batchPromises);
+        );
+      } catch (error) {
+        console.error('Failed to fetch team details:', error);
+      } finally {
+        setLoadingDetails(false);
+      }
+    };
 
-        // Update teams with fetched details
-        setTeams((prevTeams) => {
-          const updatedTeams = [...prevTeams];
-          batchResults.forEach((teamDetail) => {
-            if (teamDetail) {
-              const index = updatedTeams.findIndex(
-                (t) => t.id === teamDetail.id
-              );
-              if (index !== -1) {
-                updatedTeams[index] = teamDetail;
-              }
-            }
-          });
-          return updatedTeams;
-        });
+    // Load everything once, then only apply what changed on the server.
+    // Without the change feed, reload everything every 10 seconds and try
+    // to get the feed back each time
+    let unsubscribe: (() => void) | null = null;
+    let pollTimer: ReturnType<typeof setTimeout> | null = null;
+    let cancelled = false;
 
-        // Small delay between batches to avoid overwhelming the API
-        if (i + BATCH_SIZE < teamIds.length) {
-          await new Promise((resolve) => setTimeout(resolve, 100));
-        }
+    const poll = () => {
+      if (cancelled) {
+        return;
       }
-
-      setLoadingDetails(false);
+      setIsPolling(true);
+      pollTimer = setTimeout(() => {
+        pollTimer = null;
+        start();
+      }, POLL_INTERVAL_MS);
     };
 
-    loadTeams();
+    const start = async () => {
+      let cursor: string | null = null;
+      try {
+        // Taken first, so changes made while loading are not missed
+        cursor = await fetchChangeCursor();
+      } catch (err) {
+        console.error('Failed to fetch change cursor:', err);
+      }
+      await loadTeams();
+      if (cancelled) {
+        return;
+      }
+      if (!cursor) {
+        poll();
+        return;
+      }
+      setIsPolling(false);
+      unsubscribe = subscribeToChanges(
+        cursor,
+        (change) => setTeams((prevTeams) => applyTeamChange(prevTeams, change)),
+        // Changes were missed: reload everything
+        () => loadTeams(),
+        () => {
+          unsubscribe = null;
+          poll();
+        }
+      );
+    };
 
-    // Refresh teams data every 10 seconds
-    const refreshInterval = setInterval(() => {
-      loadTeams();
-    }, 10000); // 10000ms = 10 seconds
+    start();
 
-    // Cleanup interval on component unmount
+    // Close the change feed and stop polling on component unmount
     return () => {
-      clearInterval(refreshInterval);
+      cancelled = true;
+      unsubscribe?.();
+      if (pollTimer) {
+        clearTimeout(pollTimer);
+      }
     };
   }, []);
   useEffect(() => {
@@ -245,6 +311,13 @@ const Home = () => {
             </div>
           </div>
 
+          {isPolling && !error && (
+            <p className='text-muted-foreground text-sm mb-4' role='status'>
+              Mises à jour en direct indisponibles, actualisation toutes les
+              10 secondes.
+            </p>
+          )}
+
           {isLoading && isInitialLoad ? (
             <div className='text-center py-12'>
               <div
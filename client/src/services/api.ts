@@ -43,6 +43,41 @@ export interface Challenge {
     status: string;
 }
 
+// Last ETag and parsed body per URL, to revalidate with If-None-Match
+const validatedResponses = new Map<string, { etag: string; data: unknown }>();
+
+/**
+ * GET a JSON resource, sending back the ETag of the last response
+ * On 304 Not Modified the previously parsed body is reused, so unchanged
+ * data is neither downloaded nor parsed again
+ * @param url Resource URL
+ * @returns Promise with the response and its parsed body (null if not ok)
+ */
+async function fetchJsonWithValidators<T>(
+    url: string
+): Promise<{ response: Response; data: T | null }> {
+    const cached = validatedResponses.get(url);
+    const response = await fetch(url, {
+        // Validators are handled here, keep the browser cache out of the way
+        cache: 'no-store',
+        headers: cached ? { 'If-None-Match': cached.etag } : {},
+    });
+
+    if (response.status === 304 && cached) {
+        return { response, data: cached.data as T };
+    }
+    if (!response.ok) {
+        return { response, data: null };
+    }
+
+    const data: T = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        validatedResponses.set(url, { etag, data });
+    }
+    return { response, data };
+}
+
 /**
  * Fetch teams from the API
  * @returns Promise with array of teams
@@ -53,14 +88,14 @@ export async function fetchTeams(): Promise<Team[]> {
             throw new Error('API_BASE_URL is not configured. Please create a .env file with VITE_API_BASE_URL');
         }
 
-        const response = await fetch(`${API_BASE_URL}/teams-principal`);
+        const { response, data } = await fetchJsonWithValidators<TeamsApiResponse>(
+            `${API_BASE_URL}/teams-principal`
+        );
 
-        if (!response.ok) {
+        if (!data) {
             throw new Error(`Failed to fetch teams: ${response.statusText}`);
         }
 
-        const data: TeamsApiResponse = await response.json();
-
         // Transform API data to match application Team interface
         // Status is static as requested
         return data.teams.map((team) => ({
@@ -92,17 +127,17 @@ export async function fetchTeamById(id: string): Promise<Team | null> {
             throw new Error('API_BASE_URL is not configured. Please create a .env file with VITE_API_BASE_URL');
         }
 
-        const response = await fetch(`${API_BASE_URL}/team/${id}`);
+        const { response, data } = await fetchJsonWithValidators<TeamApiResponse>(
+            `${API_BASE_URL}/team/${id}`
+        );
 
-        if (!response.ok) {
+        if (!data) {
             if (response.status === 404) {
                 return null;
             }
             throw new Error(`Failed to fetch team: ${response.statusText}`);
         }
 
-        const data: TeamApiResponse = await response.json();
-
         // Transform API data to match application Team interface
         // Mock data for specific team id 28
         if (id === '28') {
@@ -144,6 +179,71 @@ export async function fetchTeamById(id: string): Promise<Team | null> {
     }
 }
 
+/**
+ * Stream details of several teams over a single connection
+ * onTeam is called for every team as soon as the server has scraped it;
+ * teams whose page could not be scraped are skipped
+ * @param ids Team IDs, or null for every team of the principal challenge
+ * @param onTeam Callback receiving each team
+ */
+export async function streamTeamsDetails(
+    ids: string[] | null,
+    onTeam: (team: Team) => void
+): Promise<void> {
+    try {
+        if (!API_BASE_URL) {
+            throw new Error('API_BASE_URL is not configured. Please create a .env file with VITE_API_BASE_URL');
+        }
+
+        const query = ids ? `?${new URLSearchParams({ ids: ids.join(',') })}` : '';
+        const response = await fetch(`${API_BASE_URL}/teams/stream${query}`);
+
+        if (!response.ok || !response.body) {
+            throw new Error(`Failed to stream teams: ${response.statusText}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        const handleLine = (line: string) => {
+            if (!line.trim()) {
+                return;
+            }
+            const team: TeamApiResponse & { error?: string } = JSON.parse(line);
+            if (team.error) {
+                console.warn(`Failed to fetch team ${team.id}:`, team.error);
+                return;
+            }
+            onTeam({
+                id: team.id,
+                name: team.name,
+                createdAt: new Date().toISOString(),
+                members: team.members ?? [],
+                selectedchall: team.selectedchall ?? [],
+                status: 'en_cours' as const,
+                defis: [],
+            });
+        };
+
+        // NDJSON: one team per line, lines may be split across chunks
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop() ?? '';
+            lines.forEach(handleLine);
+        }
+        handleLine(buffer + decoder.decode());
+    } catch (error) {
+        console.error('Error streaming teams:', error);
+        throw error;
+    }
+}
+
 /**
  * Fetch a single challenge by ID
  * @param id Challenge ID
@@ -155,19 +255,151 @@ export async function fetchChallengeById(id: string): Promise<Challenge | null>
             throw new Error('API_BASE_URL is not configured. Please create a .env file with VITE_API_BASE_URL');
         }
 
-        const response = await fetch(`${API_BASE_URL}/challenge/${id}`);
+        const { response, data } = await fetchJsonWithValidators<Challenge>(
+            `${API_BASE_URL}/challenge/${id}`
+        );
 
-        if (!response.ok) {
+        if (!data) {
             if (response.status === 404) {
                 return null;
             }
             throw new Error(`Failed to fetch challenge: ${response.statusText}`);
         }
 
-        const data: Challenge = await response.json();
         return data;
     } catch (error) {
         console.error(`Error fetching challenge ${id}:`, error);
         throw error;
     }
 }
+
+// Change feed types
+export interface EntityChange {
+    version: number;
+    time: number;
+    entity: 'team' | 'challenge';
+    // Page the change was seen on: lists add and remove entities, pages only modify them
+    kind: 'team_list' | 'team' | 'challenges' | 'challenge';
+    id: string;
+    op: 'added' | 'removed' | 'modified';
+    // Fields that changed (all known fields for added entities), null when removed
+    fields: Record<string, unknown> | null;
+}
+
+export interface ChangesApiResponse {
+    cursor: string;
+    changes: EntityChange[];
+    more: boolean;
+    reset: boolean;
+}
+
+/**
+ * Fetch the current change feed cursor
+ * Take it before loading the full data, then follow the changes from it
+ * so nothing that happens in between is missed
+ * @returns Promise with the cursor
+ */
+export async function fetchChangeCursor(): Promise<string> {
+    if (!API_BASE_URL) {
+        throw new Error('API_BASE_URL is not configured. Please create a .env file with VITE_API_BASE_URL');
+    }
+
+    const response = await fetch(`${API_BASE_URL}/changes`, { cache: 'no-store' });
+    if (!response.ok) {
+        throw new Error(`Failed to fetch change cursor: ${response.statusText}`);
+    }
+    const data: ChangesApiResponse = await response.json();
+    return data.cursor;
+}
+
+/**
+ * Receive team and challenge changes pushed by the server after cursor
+ * onReset is called when the changes since cursor are no longer available:
+ * the full data must be reloaded. The browser reconnects on its own and
+ * resumes after the last received change; onError is called when it gives up
+ * (e.g. the server answered with an error), after the subscription is closed.
+ * @param cursor Cursor to follow the changes from
+ * @param onChange Callback receiving each change
+ * @param onReset Callback receiving the new cursor
+ * @param onError Callback called when the change feed is lost for good
+ * @returns Function closing the subscription
+ */
+export function subscribeToChanges(
+    cursor: string,
+    onChange: (change: EntityChange) => void,
+    onReset: (cursor: string) => void,
+    onError?: () => void
+): () => void {
+    const params = new URLSearchParams({ since: cursor });
+    const source = new EventSource(`${API_BASE_URL}/changes/stream?${params}`);
+
+    source.addEventListener('change', (event) => {
+        onChange(JSON.parse((event as MessageEvent).data));
+    });
+    source.addEventListener('reset', (event) => {
+        onReset(JSON.parse((event as MessageEvent).data).cursor);
+    });
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            console.error('Change feed connection lost');
+            source.close();
+            onError?.();
+            return;
+        }
+        console.warn('Change feed connection lost, reconnecting...');
+    };
+
+    return () => source.close();
+}
+
+// History types: one value per time bucket, null before the first recorded value
+export interface HistorySeries {
+    label: string | null;
+    min: Array<number | null>;
+    max: Array<number | null>;
+    last: Array<number | null>;
+}
+
+export interface HistoryApiResponse {
+    start: number;
+    end: number;
+    step: number;
+    series: Record<string, HistorySeries>;
+}
+
+/**
+ * Fetch the downsampled history of some series
+ * @param series Series names, * matching any characters (e.g. challenge:*:participants)
+ * @param options start / end (Unix seconds, or seconds relative to now when <= 0) and number of buckets
+ * @returns Promise with the bucket times and the values of every series
+ */
+export async function fetchHistory(
+    series: string[],
+    options: { start?: number; end?: number; points?: number } = {}
+): Promise<HistoryApiResponse> {
+    try {
+        if (!API_BASE_URL) {
+            throw new Error('API_BASE_URL is not configured. Please create a .env file with VITE_API_BASE_URL');
+        }
+
+        const params = new URLSearchParams({ series: series.join(',') });
+        Object.entries(options).forEach(([key, value]) => {
+            if (value !== undefined) {
+                params.set(key, String(value));
+            }
+        });
+
+        const { response, data } = await fetchJsonWithValidators<HistoryApiResponse>(
+            `${API_BASE_URL}/history?${params}`
+        );
+
+        if (!data) {
+            throw new Error(`Failed to fetch history: ${response.statusText}`);
+        }
+
+        return data;
+    } catch (error) {
+        console.error('Error fetching history:', error);
+        throw error;
+    }
+}
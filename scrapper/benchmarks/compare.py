@@ -0,0 +1,64 @@
+"""
+Benchmark Comparison
+Prints the change in throughput, latency, response size and parse time between two
+load_bench.py result files
+
+Usage (from the scrapper directory):
+    python benchmarks/compare.py baseline.json candidate.json
+"""
+
+import argparse
+import json
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline  {baseline['commit'][:10]}  {baseline['timestamp']}")
+    print(f"candidate {candidate['commit'][:10]}  {candidate['timestamp']}\n")
+
+    print(f"{'route':<40}{'rps':>20}{'p50':>20}{'p99':>20}{'bytes/req':>20}")
+    for route, after in candidate["routes"].items():
+        before = baseline["routes"].get(route)
+        if before is None:
+            continue
+        print(f"{route:<40}"
+              f"{after['rps']:>10.1f} {change(before['rps'], after['rps']):>9}"
+              f"{after['p50_ms']:>10.2f} {change(before['p50_ms'], after['p50_ms']):>9}"
+              f"{after['p99_ms']:>10.2f} {change(before['p99_ms'], after['p99_ms']):>9}"
+              + (f"{after['bytes_per_request']:>10} {change(before['bytes_per_request'], after['bytes_per_request']):>9}"
+                 if "bytes_per_request" in before and "bytes_per_request" in after else ""))
+
+    print(f"\n{'page':<28}{'engine':<8}{'p50 ms':>20}")
+    for page, engines in candidate["parse"].items():
+        for engine, after in engines.items():
+            before = baseline["parse"].get(page, {}).get(engine)
+            if not isinstance(after, dict) or before is None:
+                continue
+            print(f"{page:<28}{engine:<8}{after['p50_ms']:>10.3f} {change(before['p50_ms'], after['p50_ms']):>9}")
+
+    print()
+    for name, after in candidate.get("startup", {}).items():
+        before = baseline.get("startup", {}).get(name)
+        if before is not None:
+            print(f"{name:<36}{after:>10.1f} {change(before, after):>9}")
+
+    print(f"upstream requests: {baseline['upstream_requests']} -> {candidate['upstream_requests']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Extraction Pool Benchmark
+Extracts the fixture pages from concurrent tasks, first inline on the event
+loop and then through the extraction process pool, and compares pages/sec
+and event loop lag (how late a 1 ms timer fires while pages are parsed,
+i.e. how long every other request would be stalled)
+
+Usage (from the scrapper directory):
+    python benchmarks/extract_bench.py [--pages 400] [--concurrency 16]
+        [--processes 4] [--engine bs4] [--inline-max-bytes auto] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction_pool import ExtractionPool  # noqa: E402
+from scrapers import NuitDelInfoScraper  # noqa: E402
+from parse_bench import PAGES, load_fixture  # noqa: E402
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def measure_lag(stop: asyncio.Event, lags: list):
+    """Sleep 1 ms at a time, recording how late each wakeup is"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append((time.perf_counter() - start - 0.001) * 1000)
+
+
+async def run(pool: ExtractionPool, engine: str, pages: int, concurrency: int) -> dict:
+    scraper = NuitDelInfoScraper(engine)
+    fixtures = [(method, args, load_fixture(name)) for name, (method, args) in PAGES.items()]
+    await pool.start()
+    if pool.processes > 0:
+        # Let the workers start and the pool measure its overhead
+        for method, args, html in fixtures * 3:
+            await pool.extract(scraper, method, method, args, html)
+        await asyncio.sleep(1)
+
+    counter = iter(range(pages))
+    lags = []
+    stop = asyncio.Event()
+
+    async def worker():
+        for i in counter:
+            method, args, html = fixtures[i % len(fixtures)]
+            await pool.extract(scraper, method, method, args, html)
+
+    lag_task = asyncio.create_task(measure_lag(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await lag_task
+    stats = pool.stats()
+    await pool.stop()
+
+    lags.sort()
+    return {
+        "pages_per_second": round(pages / elapsed, 1),
+        "loop_lag_p50_ms": round(percentile(lags, 0.50), 3),
+        "loop_lag_p99_ms": round(percentile(lags, 0.99), 3),
+        "loop_lag_max_ms": round(lags[-1], 3) if lags else 0.0,
+        "inline": stats["inline"],
+        "offloaded": stats["offloaded"],
+        "inline_max_bytes": stats["inline_max_bytes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--engine", default="bs4", help="scraper extraction engine")
+    parser.add_argument("--inline-max-bytes", default="auto", help="pool size threshold, or auto")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    threshold = None if args.inline_max_bytes == "auto" else int(args.inline_max_bytes)
+    results = {
+        "config": vars(args),
+        "cpus": os.cpu_count(),
+        "inline": asyncio.run(run(ExtractionPool(0), args.engine, args.pages, args.concurrency)),
+        "pool": asyncio.run(run(ExtractionPool(args.processes, threshold), args.engine, args.pages, args.concurrency)),
+    }
+
+    print(f"{'':<10}{'pages/s':>10}{'lag p50':>10}{'lag p99':>10}{'lag max':>10}{'inline':>8}{'pool':>8}")
+    for mode in ("inline", "pool"):
+        r = results[mode]
+        print(f"{mode:<10}{r['pages_per_second']:>10.1f}{r['loop_lag_p50_ms']:>10.2f}{r['loop_lag_p99_ms']:>10.2f}"
+              f"{r['loop_lag_max_ms']:>10.2f}{r['inline']:>8}{r['offloaded']:>8}")
+    print(f"({args.processes} processes on {results['cpus']} CPUs, {args.engine} engine, "
+          f"pool threshold {results['pool']['inline_max_bytes']} bytes)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+End-to-end Load Benchmark
+Runs the API against the stand-in upstream server and measures requests/sec,
+p50/p95/p99 latency and response bytes on the wire (as sent, compressed
+when the API honours --accept-encoding) per route under concurrent load, plus parse time
+per page type, and how long the API takes from launch to its first data
+response with an empty snapshot database and after a restart. Results are written as JSON so runs on different commits can
+be compared with benchmarks/compare.py.
+
+Usage (from the scrapper directory):
+    python benchmarks/load_bench.py [--requests 500] [--concurrency 20]
+        [--latency-ms 50] [--jitter-ms 20] [--error-rate 0.0]
+        [--no-cache] [--scheduler] [--engine bs4] [--accept-encoding "gzip, br"]
+        [--output bench_results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRAPPER_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from parse_bench import bench as parse_bench, verify  # noqa: E402
+from stub_server import StubUpstream  # noqa: E402
+
+TEAM_IDS = [str(n) for n in range(1, 401)]
+CHALLENGE_IDS = [str(400 + n * 3) for n in range(60)]
+BATCH_IDS = TEAM_IDS[:50]
+
+# Route name -> function of the request number returning (method, path, JSON body)
+ROUTES = {
+    "GET /": lambda i: ("GET", "/", None),
+    "GET /teams-principal": lambda i: ("GET", "/teams-principal", None),
+    "GET /teams-principal?include=details": lambda i: ("GET", "/teams-principal?include=details", None),
+    "GET /team/{team_id}": lambda i: ("GET", f"/team/{TEAM_IDS[i % len(TEAM_IDS)]}", None),
+    "POST /teams/batch": lambda i: ("POST", "/teams/batch", {"ids": BATCH_IDS}),
+    "GET /teams/stream": lambda i: ("GET", f"/teams/stream?ids={','.join(BATCH_IDS)}", None),
+    "GET /challenges": lambda i: ("GET", "/challenges", None),
+    "GET /challenge/{challenge_id}": lambda i: ("GET", f"/challenge/{CHALLENGE_IDS[i % len(CHALLENGE_IDS)]}", None),
+}
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def run_route(session: aiohttp.ClientSession, base_url: str, route: str, requests: int, concurrency: int) -> dict:
+    """Send requests to one route from concurrency workers; returns latency stats"""
+    make_request = ROUTES[route]
+    latencies = []
+    errors = 0
+    received = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors, received
+        for i in counter:
+            method, path, body = make_request(i)
+            start = time.perf_counter()
+            try:
+                async with session.request(method, base_url + path, json=body) as response:
+                    received += len(await response.read())
+                    if response.status >= 400:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "bytes_per_request": round(received / requests) if requests else 0,
+    }
+
+
+async def wait_for_first_response(session: aiohttp.ClientSession, url: str, launched: float, timeout: float = 60) -> float:
+    """Poll url until it answers 200; returns milliseconds since the API process was launched"""
+    deadline = launched + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url) as response:
+                await response.read()
+                if response.status == 200:
+                    return round((time.monotonic() - launched) * 1000, 1)
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.02)
+    raise RuntimeError(f"API did not answer {url}")
+
+
+def launch_api(args, env) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.api_port), "--log-level", "warning"],
+        cwd=SCRAPPER_DIR,
+        env=env,
+    )
+
+
+def stop_api(api: subprocess.Popen):
+    api.terminate()
+    api.wait()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=SCRAPPER_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> dict:
+    stub = StubUpstream(args.latency_ms, args.jitter_ms, args.error_rate)
+    await stub.start(port=args.stub_port)
+
+    db_dir = tempfile.TemporaryDirectory()
+    env = {
+        **os.environ,
+        "NUITDELINFO_BASE_URL": f"http://127.0.0.1:{args.stub_port}",
+        "SNAPSHOT_DB_PATH": os.path.join(db_dir.name, "snapshots.db"),
+        # Kept with the snapshots, so a run never starts from the history of an earlier one
+        "HISTORY_PATH": os.path.join(db_dir.name, "history.bin"),
+        "LEADER_LOCK_PATH": os.path.join(db_dir.name, "snapshots.db.lock"),
+        "SCHEDULER_ENABLED": "True" if args.scheduler else "False",
+        "SCRAPER_ENGINE": args.engine,
+    }
+    if args.no_cache:
+        env.update(CACHE_TTL_TEAMS="0", CACHE_TTL_TEAM="0", CACHE_TTL_CHALLENGES="0", CACHE_TTL_CHALLENGE="0")
+
+    base_url = f"http://127.0.0.1:{args.api_port}"
+    first_url = base_url + "/teams-principal"
+    routes = {}
+    startup = {}
+    api = None
+    try:
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        # Bodies are counted as sent, so they are not decompressed
+        headers = {"Accept-Encoding": args.accept_encoding} if args.accept_encoding else {}
+        async with aiohttp.ClientSession(connector=connector, headers=headers, auto_decompress=False) as session:
+            launched = time.monotonic()
+            api = launch_api(args, env)
+            startup["cold_first_response_ms"] = await wait_for_first_response(session, first_url, launched)
+            for route in args.routes or ROUTES:
+                routes[route] = await run_route(session, base_url, route, args.requests, args.concurrency)
+                print(f"{route:<40}{routes[route]['rps']:>10.1f} rps  p50 {routes[route]['p50_ms']:>8.2f}  "
+                      f"p95 {routes[route]['p95_ms']:>8.2f}  p99 {routes[route]['p99_ms']:>8.2f} ms  "
+                      f"{routes[route]['bytes_per_request']:>9} B/req  errors {routes[route]['errors']}")
+            
+            # Restart on the snapshot database filled by the run above
+            stop_api(api)
+            launched = time.monotonic()
+            api = launch_api(args, env)
+            startup["warm_first_response_ms"] = await wait_for_first_response(session, first_url, launched)
+            print(f"first /teams-principal response after launch: cold {startup['cold_first_response_ms']} ms, "
+                  f"warm {startup['warm_first_response_ms']} ms")
+    finally:
+        if api is not None:
+            stop_api(api)
+        await stub.stop()
+        db_dir.cleanup()
+
+    return {
+        "upstream_requests": stub.requests,
+        "upstream_errors": stub.errors,
+        "startup": startup,
+        "routes": routes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50, help="upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="upstream latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream requests answered with 503")
+    parser.add_argument("--no-cache", action="store_true", help="disable the API response cache")
+    parser.add_argument("--scheduler", action="store_true", help="enable background refreshes")
+    parser.add_argument("--engine", default="bs4", help="scraper extraction engine")
+    parser.add_argument("--accept-encoding", default="gzip, br", help="Accept-Encoding request header (empty: none)")
+    parser.add_argument("--parse-iterations", type=int, default=100)
+    parser.add_argument("--routes", nargs="*", choices=list(ROUTES), help="only benchmark these routes")
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--api-port", type=int, default=8901)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    if not verify(["lxml"]):
+        sys.exit(1)
+    parse = parse_bench(("bs4", "lxml"), args.parse_iterations)
+    load = asyncio.run(run(args))
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "parse": parse,
+        **load,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Snapshot Memory Benchmark
+Builds a full-event snapshot (the principal team list, every team page and
+every challenge page) from the fixture pages, then compares the memory held
+by the scrape result dicts and by their compact records, and the time to
+serialize them back to JSON
+
+Each page is decoded from its own JSON document, like results parsed from
+separate pages, so the dicts share no strings.
+
+Usage (from the scrapper directory):
+    python benchmarks/memory_bench.py [--teams 2000] [--seed 1] [--json results.json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compact import StringPool, compact, expand  # noqa: E402
+from scrapers import NuitDelInfoScraper  # noqa: E402
+from parse_bench import load_fixture  # noqa: E402
+
+PRINCIPAL_ID = "174"
+
+
+def event_pages(teams: int, seed: int) -> list:
+    """JSON documents of every result of an event with that many teams"""
+    rng = random.Random(seed)
+    scraper = NuitDelInfoScraper("lxml")
+    challenges = scraper.extract_challenges(load_fixture("challenge_list.html"))["challenges"]
+    details = scraper.extract_challenge_details(load_fixture("challenge_details.html"))
+    principal = {"id": PRINCIPAL_ID, "name": "Défi de la nuit 2025"}
+
+    team_list = [{"id": str(i), "name": f"Équipe {rng.choice(['Code', 'Café', 'Pixel', 'Licorne'])} {i}"} for i in range(1, teams + 1)]
+    selected = {challenge["id"]: [] for challenge in challenges}
+    pages = [{"teams": team_list, "total": len(team_list), "status": "success"}]
+    for team in team_list:
+        chosen = [principal] + [{"id": c["id"], "name": c["name"]} for c in rng.sample(challenges, rng.randint(2, 5))]
+        for challenge in chosen[1:]:
+            selected[challenge["id"]].append(team)
+        pages.append({
+            "name": team["name"],
+            "members": [f"{rng.choice(['MARTIN', 'BERNARD', 'DUPONT', 'PETIT'])} Membre{team['id']}-{m}" for m in range(rng.randint(3, 6))],
+            "selectedchall": chosen,
+            "status": "success",
+        })
+    for challenge in [principal] + challenges:
+        pages.append({
+            **details,
+            "name": challenge["name"],
+            "teams": team_list if challenge is principal else selected[challenge["id"]],
+        })
+    return [json.dumps(page, ensure_ascii=False) for page in pages]
+
+
+def held_memory(build) -> tuple:
+    """(bytes still allocated by build() once it returns, its result)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+def serialize_seconds(values, expand_value) -> float:
+    start = time.perf_counter()
+    for value in values:
+        json.dumps(expand_value(value), ensure_ascii=False, separators=(",", ":"))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    pages = event_pages(args.teams, args.seed)
+    dict_bytes, dicts = held_memory(lambda: [json.loads(page) for page in pages])
+    del dicts
+    pool = StringPool(max_entries=10 ** 9)
+    compact_bytes, records = held_memory(lambda: [compact(json.loads(page), pool) for page in pages])
+
+    mismatches = sum(json.dumps(expand(record), ensure_ascii=False) != page for record, page in zip(records, pages))
+    dicts = [json.loads(page) for page in pages]
+    results = {
+        "config": vars(args),
+        "pages": len(pages),
+        "records": sum(record is not expand(record) for record in records),
+        "mismatches": mismatches,
+        "dict_bytes": dict_bytes,
+        "compact_bytes": compact_bytes,
+        "ratio": round(dict_bytes / compact_bytes, 2),
+        "pool": pool.stats(),
+        "serialize_dict_ms": round(serialize_seconds(dicts, lambda value: value) * 1000, 1),
+        "serialize_compact_ms": round(serialize_seconds(records, expand) * 1000, 1),
+    }
+
+    print(f"{results['pages']} pages ({args.teams} teams), {results['records']} stored as records, {mismatches} mismatches")
+    print(f"{'':<10}{'MiB':>10}{'serialize ms':>15}")
+    print(f"{'dicts':<10}{dict_bytes / 2 ** 20:>10.2f}{results['serialize_dict_ms']:>15.1f}")
+    print(f"{'compact':<10}{compact_bytes / 2 ** 20:>10.2f}{results['serialize_compact_ms']:>15.1f}")
+    print(f"compact records use {results['ratio']}x less memory")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
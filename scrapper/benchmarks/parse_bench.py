@@ -0,0 +1,98 @@
+"""
+Parse-time Benchmark
+Checks that every extraction engine returns identical data for the saved
+fixture pages, then times each engine per page type
+
+Usage (from the scrapper directory):
+    python benchmarks/parse_bench.py [--iterations 200] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers import NuitDelInfoScraper  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Fixture file -> (extract method, extra arguments)
+PAGES = {
+    "challenge_principal.html": ("extract_teams", ()),
+    "team_details.html": ("extract_team_details", ("28",)),
+    "challenge_list.html": ("extract_challenges", ()),
+    "challenge_details.html": ("extract_challenge_details", ()),
+}
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def verify(engines) -> bool:
+    """Compare every engine's output against bs4, key order included"""
+    ok = True
+    reference = NuitDelInfoScraper("bs4")
+    for name, (method, args) in PAGES.items():
+        html = load_fixture(name)
+        expected = json.dumps(getattr(reference, method)(html, *args), ensure_ascii=False)
+        for engine in engines:
+            actual = json.dumps(getattr(NuitDelInfoScraper(engine), method)(html, *args), ensure_ascii=False)
+            if actual != expected:
+                ok = False
+                print(f"MISMATCH {engine} {name}:\n  bs4:  {expected[:500]}\n  {engine}: {actual[:500]}")
+    return ok
+
+
+def bench(engines, iterations: int):
+    """Time each engine on each fixture; returns {page: {engine: stats}}"""
+    results = {}
+    for name, (method, args) in PAGES.items():
+        html = load_fixture(name)
+        results[name] = {"bytes": len(html.encode("utf-8"))}
+        for engine in engines:
+            extract = getattr(NuitDelInfoScraper(engine), method)
+            extract(html, *args)  # warm up
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                extract(html, *args)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name][engine] = {
+                "mean_ms": round(statistics.mean(timings), 4),
+                "p50_ms": round(timings[len(timings) // 2], 4),
+                "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 4),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    engines = NuitDelInfoScraper.ENGINES
+    if not verify([engine for engine in engines if engine != "bs4"]):
+        sys.exit(1)
+    print("All engines return identical data for every fixture\n")
+
+    results = bench(engines, args.iterations)
+    print(f"{'page':<28}{'bytes':>8}" + "".join(f"{engine + ' p50 ms':>16}" for engine in engines) + f"{'speedup':>10}")
+    for name, row in results.items():
+        speedup = row["bs4"]["p50_ms"] / row["lxml"]["p50_ms"]
+        print(f"{name:<28}{row['bytes']:>8}" + "".join(f"{row[engine]['p50_ms']:>16.3f}" for engine in engines) + f"{speedup:>9.1f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"iterations": args.iterations, "pages": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Fixture Recorder
+Saves real Nuit de l'Info pages into benchmarks/fixtures so the benchmarks
+can run offline against them
+
+Usage (from the scrapper directory):
+    python benchmarks/record.py [--team-id 28] [--challenge-id 494]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers import NuitDelInfoScraper, CHALLENGES_URL, team_url, challenge_url  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--team-id", default="28", help="team page to record")
+    parser.add_argument("--challenge-id", default="494", help="challenge detail page to record")
+    parser.add_argument("--principal-id", default="174", help="principal challenge page (team list) to record")
+    args = parser.parse_args()
+
+    pages = {
+        "challenge_principal.html": challenge_url(args.principal_id),
+        "team_details.html": team_url(args.team_id),
+        "challenge_list.html": CHALLENGES_URL,
+        "challenge_details.html": challenge_url(args.challenge_id),
+    }
+
+    scraper = NuitDelInfoScraper()
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    failed = False
+    for name, url in pages.items():
+        html = scraper.fetch_page(url)
+        if not html:
+            print(f"Failed to fetch {url}")
+            failed = True
+            continue
+        with open(os.path.join(FIXTURES_DIR, name), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"Saved {url} -> fixtures/{name} ({len(html)} chars)")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Stand-in Upstream Server
+Serves the fixture pages under the same paths as nuitdelinfo.com, with
+configurable latency and error injection
+
+Usage (from the scrapper directory):
+    python benchmarks/stub_server.py [--port 8900] [--latency-ms 50] [--jitter-ms 20] [--error-rate 0.01]
+
+Then start the API against it:
+    NUITDELINFO_BASE_URL=http://127.0.0.1:8900 python main.py
+"""
+
+import argparse
+import asyncio
+import os
+import random
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class StubUpstream:
+    """aiohttp application serving fixture pages"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        principal_id: str = "174",
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.principal_id = principal_id
+        self.pages = {}
+        for name in os.listdir(FIXTURES_DIR):
+            if name.endswith(".html"):
+                with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+                    self.pages[name] = f.read()
+
+        # Counters
+        self.requests = 0
+        self.errors = 0
+        self._runner = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/inscription/defis/liste", self._serve("challenge_list.html"))
+        app.router.add_get("/inscription/defis/{challenge_id}", self._challenge)
+        app.router.add_get("/inscription/equipes/{team_id}", self._serve("team_details.html"))
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8900):
+        """Serve in the running event loop"""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _serve(self, name: str):
+        async def handler(request: web.Request) -> web.Response:
+            return await self._respond(name)
+        return handler
+
+    async def _challenge(self, request: web.Request) -> web.Response:
+        if request.match_info["challenge_id"] == self.principal_id:
+            return await self._respond("challenge_principal.html")
+        return await self._respond("challenge_details.html")
+
+    async def _respond(self, name: str) -> web.Response:
+        self.requests += 1
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=503, text="Injected error")
+        return web.Response(body=self.pages[name], content_type="text/html", charset="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubUpstream(args.latency_ms, args.jitter_ms, args.error_rate)
+    web.run_app(stub.app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Response Cache
+In-process TTL cache with LRU eviction and single-flight request coalescing
+"""
+
+import asyncio
+import json
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def json_size(value: Any) -> int:
+    """Approximate size of value in bytes, as UTF-8 JSON"""
+    try:
+        return len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class CacheEntry:
+    """A cached value with its freshness and expiry times and approximate size in bytes"""
+
+    __slots__ = ("value", "fresh_until", "expires_at", "size")
+
+    def __init__(self, value: Any, fresh_until: float, expires_at: float, size: int):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.expires_at = expires_at
+        self.size = size
+
+
+class ResponseCache:
+    """
+    Cache for scraped results keyed by upstream URL
+
+    Entries are fresh for a per-call TTL (soft TTL). With a hard TTL they are
+    then kept as stale until the hard TTL: get_or_load returns a stale value
+    right away and reloads it in the background, so a failing reload leaves
+    the last good value in place. The least recently used entries are
+    evicted once the cache holds more than max_entries or max_bytes.
+    Concurrent misses for the same key share a single loader call.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = json_size,
+    ):
+        self.sizeof = sizeof
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('CACHE_MAX_ENTRIES', 2048))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv('CACHE_MAX_BYTES', 32 * 1024 * 1024))
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._bytes = 0
+
+        # Counters
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or not fresh"""
+        entry = self._lookup(key)
+        if entry is None or entry.fresh_until <= time.monotonic():
+            return None
+        return entry.value
+
+    def set(self, key: str, value: Any, ttl: float, hard_ttl: Optional[float] = None):
+        """
+        Store value under key, fresh for ttl seconds and kept as stale until
+        hard_ttl seconds (ttl <= 0 disables caching)
+        """
+        if ttl <= 0:
+            return
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {key}: {size} bytes exceeds cache limit")
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        now = time.monotonic()
+        self._entries[key] = CacheEntry(value, now + ttl, now + max(ttl, hard_ttl or 0), size)
+        self._bytes += size
+        self._evict()
+
+    def invalidate(self, key: str):
+        """Drop key from the cache"""
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self):
+        """Drop every cached entry"""
+        self._entries.clear()
+        self._bytes = 0
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float,
+        cacheable: Callable[[Any], bool] = lambda value: True,
+        hard_ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Return the cached value for key, calling loader on a miss
+
+        A stale value (past ttl, within hard_ttl) is returned as is and
+        reloaded in the background. If a load for the same key is already
+        running, wait for it instead of starting another one. Results
+        rejected by cacheable (e.g. error results) are returned to every
+        waiter but not stored.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            if entry.fresh_until > time.monotonic():
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self.refresh(key, loader, ttl, cacheable, hard_ttl)
+            return entry.value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            pending = self._start_load(key, loader, ttl, cacheable, hard_ttl)
+        return await asyncio.shield(pending)
+
+    def refresh(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float,
+        cacheable: Callable[[Any], bool] = lambda value: True,
+        hard_ttl: Optional[float] = None,
+    ):
+        """Start loading key in the background unless a load is already running"""
+        if key not in self._inflight:
+            self.refreshes += 1
+            self._start_load(key, loader, ttl, cacheable, hard_ttl)
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        """Return the fresh or stale entry for key, dropping it once past its hard TTL"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _start_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float,
+        cacheable: Callable[[Any], bool],
+        hard_ttl: Optional[float] = None,
+    ) -> asyncio.Future:
+        # The load runs in its own task so that a cancelled caller
+        # (e.g. a client that disconnected) does not cancel it for others
+        pending = asyncio.ensure_future(self._load(key, loader, ttl, cacheable, hard_ttl))
+        pending.add_done_callback(self._retrieve_exception)
+        self._inflight[key] = pending
+        return pending
+
+    async def _load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float,
+        cacheable: Callable[[Any], bool],
+        hard_ttl: Optional[float] = None,
+    ) -> Any:
+        try:
+            value = await loader()
+            if cacheable(value):
+                self.set(key, value, ttl, hard_ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _retrieve_exception(task: asyncio.Future):
+        # Avoid "exception was never retrieved" warnings when every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict:
+        """Return cache counters and current size"""
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "inflight": len(self._inflight),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
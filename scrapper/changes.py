@@ -0,0 +1,244 @@
+"""
+Change Feed
+Diffs every new scrape result against the previous result of the same page
+and records the teams and challenges that were added, removed or modified
+in a versioned change log, so clients can download only what changed
+
+Changes are identified by cursors "<epoch>:<version>". The epoch changes
+when the log starts over (a restart without a database, or a new database
+file), which tells clients holding an older cursor to reload everything.
+"""
+
+import asyncio
+import os
+import secrets
+import time
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Resource kinds: which entity each page describes and which fields are compared
+TEAM_LIST = "team_list"
+TEAM_PAGE = "team"
+CHALLENGE_LIST = "challenges"
+CHALLENGE_PAGE = "challenge"
+
+# kind -> (entity, compared fields, whether entities missing from a new result were removed)
+RESOURCE_KINDS = {
+    TEAM_LIST: ("team", ("name",), True),
+    TEAM_PAGE: ("team", ("name", "members", "selectedchall"), False),
+    CHALLENGE_LIST: ("challenge", ("name", "category", "thumbnail", "participants"), True),
+    CHALLENGE_PAGE: ("challenge", (
+        "name", "organizer", "theme", "prize", "description", "expectedElements", "submissionMode", "logo", "teams"
+    ), False),
+}
+
+
+def entities(kind: str, entity_id: Optional[str], result: Dict) -> Dict[str, Dict]:
+    """The entities in a scrape result, by ID, restricted to the compared fields"""
+    _, fields, _ = RESOURCE_KINDS[kind]
+    if kind == TEAM_LIST:
+        items = result.get("teams", [])
+    elif kind == CHALLENGE_LIST:
+        items = result.get("challenges", [])
+    else:
+        items = [{**result, "id": entity_id}]
+    return {
+        item["id"]: {field: item[field] for field in fields if field in item}
+        for item in items if item.get("id")
+    }
+
+
+def diff(kind: str, old: Optional[Dict[str, Dict]], new: Dict[str, Dict]) -> List[Dict]:
+    """
+    Changes from old to new entities: added and removed entities, and the
+    new value of every modified field; each change names the kind of page
+    it was seen on
+
+    Without old entities, list entries are all added and a page's entity
+    is modified with all its fields.
+    """
+    entity, _, removals = RESOURCE_KINDS[kind]
+    old = old or {}
+    changes = []
+    for entity_id, fields in new.items():
+        previous = old.get(entity_id)
+        if previous is None:
+            op = "added" if removals else "modified"
+            changes.append({"entity": entity, "kind": kind, "id": entity_id, "op": op, "fields": fields})
+            continue
+        modified = {field: value for field, value in fields.items() if previous.get(field) != value}
+        if modified:
+            changes.append({"entity": entity, "kind": kind, "id": entity_id, "op": "modified", "fields": modified})
+    if removals:
+        for entity_id in old.keys() - new.keys():
+            changes.append({"entity": entity, "kind": kind, "id": entity_id, "op": "removed", "fields": None})
+    return changes
+
+
+class ChangeLog:
+    """
+    Versioned log of entity changes, kept in memory or, with a database,
+    in its changes table (so every worker process serves the same versions)
+
+    observe() is fed every scrape result; the previous entities of each
+    page are kept in memory to diff against. With a database, changes are
+    written and read on its thread (see SnapshotDatabase.run), so observe()
+    must then be called from the event loop.
+    """
+
+    def __init__(self, database=None, max_entries: Optional[int] = None):
+        self.database = database
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('CHANGE_LOG_MAX_ENTRIES', 10000))
+        if database is not None:
+            self.epoch = database.setting("changes_epoch", secrets.token_hex(4))
+            self._oldest, self._latest = database.change_versions()
+        else:
+            self.epoch = secrets.token_hex(4)
+            self._oldest, self._latest = 1, 0
+        self._entries: Deque[Tuple[int, float, Dict]] = deque(maxlen=self.max_entries)
+        self._previous: Dict[str, Dict[str, Dict]] = {}
+        self._waiter: Optional[asyncio.Future] = None
+        # Database writes in progress
+        self._writes: Set[asyncio.Task] = set()
+
+        # Counters
+        self.recorded = 0
+        self.diff_seconds = 0.0
+
+    def observe(self, key: str, kind: str, entity_id: Optional[str], result: Dict, record: bool = True) -> int:
+        """
+        Diff a scrape result of the page key against the previous one and,
+        if record, log the changes; returns how many there were
+
+        Results loaded from the database (restored, or saved by another
+        worker that already logged them) only replace the previous result.
+        """
+        start = time.perf_counter()
+        new = entities(kind, entity_id, result)
+        changes = diff(kind, self._previous.get(key), new) if record else []
+        self._previous[key] = new
+        self.diff_seconds += time.perf_counter() - start
+        if changes:
+            self.append(changes)
+        return len(changes)
+
+    def append(self, changes: List[Dict]):
+        if self.database is not None:
+            task = asyncio.ensure_future(self._append_to_database(changes))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+            return
+        now = time.time()
+        for change in changes:
+            self._latest += 1
+            self._entries.append((self._latest, now, change))
+        self._recorded(len(changes))
+
+    async def _append_to_database(self, changes: List[Dict]):
+        try:
+            versions = await self.database.run(self._write, changes)
+        except Exception as e:
+            logger.error(f"Could not record {len(changes)} changes: {e}")
+            return
+        self._latest = max(self._latest, versions[-1])
+        self._recorded(len(changes))
+
+    def _write(self, changes: List[Dict]) -> List[int]:
+        """On the database thread: log changes, pruning the log every 100 versions"""
+        versions = self.database.append_changes(changes)
+        if versions[-1] % 100 < len(changes):
+            self.database.prune_changes(self.max_entries)
+        return versions
+
+    def _recorded(self, count: int):
+        self.recorded += count
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        self._waiter = None
+
+    def cursor(self, version: Optional[int] = None) -> str:
+        """Cursor of version, by default the latest one (as last read, see _versions)"""
+        return f"{self.epoch}:{self._latest if version is None else version}"
+
+    async def since(self, cursor: Optional[str], limit: int) -> Dict:
+        """
+        Changes after cursor, oldest first, at most limit of them
+
+        Returns {"cursor", "changes", "more", "reset"}. Without a cursor,
+        or when the changes after it are no longer available, there are
+        no changes and reset is true: the client should reload everything
+        and continue from the returned cursor.
+        """
+        if self.database is not None:
+            return await self.database.run(self._since, cursor, limit)
+        return self._since(cursor, limit)
+
+    def _since(self, cursor: Optional[str], limit: int) -> Dict:
+        version = self._parse(cursor)
+        if version is None:
+            # Other workers may have logged changes since this one last looked
+            self._versions()
+            return {"cursor": self.cursor(), "changes": [], "more": False, "reset": True}
+
+        if self.database is not None:
+            rows = self.database.changes_since(version, limit + 1)
+        else:
+            rows = [entry for entry in self._entries if entry[0] > version][:limit + 1]
+        more = len(rows) > limit
+        rows = rows[:limit]
+        changes = [{"version": row[0], "time": row[1], **row[2]} for row in rows]
+        return {
+            "cursor": self.cursor(rows[-1][0]) if rows else self.cursor(version),
+            "changes": changes,
+            "more": more,
+            "reset": False,
+        }
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait until changes are recorded by this process; False on timeout"""
+        if self._waiter is None or self._waiter.done():
+            self._waiter = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._waiter), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stats(self) -> Dict:
+        if self.database is not None:
+            oldest, latest = await self.database.run(self._versions)
+        else:
+            oldest, latest = self._versions()
+        return {
+            "cursor": self.cursor(),
+            "oldest_version": oldest,
+            "latest_version": latest,
+            "recorded": self.recorded,
+            "pages_tracked": len(self._previous),
+            "diff_ms": round(self.diff_seconds * 1000, 3),
+        }
+
+    def _versions(self) -> Tuple[int, int]:
+        if self.database is not None:
+            self._oldest, self._latest = self.database.change_versions()
+        elif self._entries:
+            self._oldest = self._entries[0][0]
+        else:
+            self._oldest = self._latest + 1
+        return self._oldest, self._latest
+
+    def _parse(self, cursor: Optional[str]) -> Optional[int]:
+        """Version of a cursor from this epoch whose following changes are all still logged"""
+        if not cursor:
+            return None
+        epoch, _, version = cursor.partition(":")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        version = int(version)
+        oldest, latest = self._versions()
+        if version > latest or version < oldest - 1:
+            return None
+        return version
@@ -0,0 +1,237 @@
+"""
+Compact Records
+Memory-efficient form of the team and challenge scrape results kept in
+memory: __slots__ records instead of dicts, integer IDs, and a single
+shared copy of every string and every (id, name) link
+
+Team pages repeat the names of the challenges they selected, and challenge
+pages (and the principal team list) repeat the names of their teams, so a
+full event holds thousands of identical {"id": ..., "name": ...} dicts.
+Here each distinct link is one tuple referenced by every record listing
+it. Records convert back to the exact scrape result dicts with to_json(),
+when a response is serialized; results of any other shape (errors,
+unexpected fields) are kept as they are.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Link IDs: canonical decimal IDs are stored as ints, anything else as is
+LinkId = Union[int, str, None]
+Link = Tuple[LinkId, Optional[str]]
+
+# Absent optional field (a challenge page without a logo)
+_MISSING = object()
+
+# Exact keys, in order, of the results stored as records
+_TEAM_KEYS = ["name", "members", "selectedchall", "status"]
+_CHALLENGE_KEYS = [
+    "name", "organizer", "theme", "prize", "description", "expectedElements", "submissionMode", "teams", "status"
+]
+_CHALLENGE_LOGO_KEYS = _CHALLENGE_KEYS[:-1] + ["logo", "status"]
+_TEAM_LIST_KEYS = ["teams", "total", "status"]
+_LINK_KEYS = ["id", "name"]
+
+
+class StringPool:
+    """
+    One shared copy of every string and link seen
+
+    Cleared once it holds max_entries distinct values: records built
+    before keep their copies, later ones share new ones.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('COMPACT_POOL_MAX_ENTRIES', 200000))
+        self._strings: Dict[str, str] = {}
+        self._links: Dict[Link, Link] = {}
+
+        # Counters
+        self.clears = 0
+
+    def string(self, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        shared = self._strings.get(value)
+        if shared is None:
+            self._make_room()
+            shared = self._strings[value] = value
+        return shared
+
+    def link(self, link_id: Optional[str], name: Optional[str]) -> Link:
+        key = (encode_id(link_id), self.string(name))
+        shared = self._links.get(key)
+        if shared is None:
+            self._make_room()
+            shared = self._links[key] = key
+        return shared
+
+    def links(self, items: List[Dict]) -> Tuple[Link, ...]:
+        return tuple(self.link(item["id"], item["name"]) for item in items)
+
+    def strings(self, values: List[str]) -> Tuple[str, ...]:
+        return tuple(self.string(value) for value in values)
+
+    def stats(self) -> Dict:
+        return {
+            "strings": len(self._strings),
+            "links": len(self._links),
+            "max_entries": self.max_entries,
+            "clears": self.clears,
+        }
+
+    def _make_room(self):
+        if len(self._strings) + len(self._links) >= self.max_entries:
+            self._strings.clear()
+            self._links.clear()
+            self.clears += 1
+
+
+def encode_id(value: Optional[str]) -> LinkId:
+    """An ID as an int when converting it back gives the same string"""
+    if isinstance(value, str) and value.isdigit() and value.isascii() and (value == "0" or value[0] != "0"):
+        return int(value)
+    return value
+
+
+def decode_id(value: LinkId) -> Optional[str]:
+    return str(value) if isinstance(value, int) else value
+
+
+def _links_json(links: Tuple[Link, ...]) -> List[Dict]:
+    return [{"id": decode_id(link_id), "name": name} for link_id, name in links]
+
+
+class TeamRecord:
+    """A scrape_team_details result"""
+
+    __slots__ = ("name", "members", "challenges")
+
+    def __init__(self, name: Optional[str], members: Tuple[str, ...], challenges: Tuple[Link, ...]):
+        self.name = name
+        self.members = members
+        self.challenges = challenges
+
+    def to_json(self) -> Dict:
+        return {
+            "name": self.name,
+            "members": list(self.members),
+            "selectedchall": _links_json(self.challenges),
+            "status": "success",
+        }
+
+
+class ChallengeRecord:
+    """A scrape_challenge_details result"""
+
+    __slots__ = (
+        "name", "organizer", "theme", "prize", "description", "expected_elements", "submission_mode", "teams", "logo"
+    )
+
+    def __init__(self, name, organizer, theme, prize, description, expected_elements, submission_mode, teams, logo=_MISSING):
+        self.name = name
+        self.organizer = organizer
+        self.theme = theme
+        self.prize = prize
+        self.description = description
+        self.expected_elements = expected_elements
+        self.submission_mode = submission_mode
+        self.teams = teams
+        self.logo = logo
+
+    def to_json(self) -> Dict:
+        result = {
+            "name": self.name,
+            "organizer": self.organizer,
+            "theme": self.theme,
+            "prize": self.prize,
+            "description": self.description,
+            "expectedElements": list(self.expected_elements) if self.expected_elements is not None else None,
+            "submissionMode": self.submission_mode,
+            "teams": _links_json(self.teams),
+        }
+        if self.logo is not _MISSING:
+            result["logo"] = self.logo
+        result["status"] = "success"
+        return result
+
+
+class TeamListRecord:
+    """A scrape_teams result (the teams of a challenge)"""
+
+    __slots__ = ("teams",)
+
+    def __init__(self, teams: Tuple[Link, ...]):
+        self.teams = teams
+
+    def to_json(self) -> Dict:
+        return {"teams": _links_json(self.teams), "total": len(self.teams), "status": "success"}
+
+
+Record = Union[TeamRecord, ChallengeRecord, TeamListRecord]
+RECORD_TYPES = (TeamRecord, ChallengeRecord, TeamListRecord)
+
+
+def _is_links(value: Any) -> bool:
+    return isinstance(value, list) and all(
+        type(item) is dict and list(item) == _LINK_KEYS
+        and (item["id"] is None or isinstance(item["id"], str)) and (item["name"] is None or isinstance(item["name"], str))
+        for item in value
+    )
+
+
+def _is_strings(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def _is_optional_string(value: Any) -> bool:
+    return value is None or isinstance(value, str)
+
+
+def compact(value: Any, pool: Optional[StringPool] = None) -> Any:
+    """
+    The record for a team page, challenge page or team list result, or
+    value itself when it has any other shape (or already is a record)
+    """
+    if type(value) is not dict or value.get("status") != "success":
+        return value
+    pool = pool if pool is not None else string_pool
+    keys = list(value)
+
+    if keys == _TEAM_KEYS:
+        if _is_optional_string(value["name"]) and _is_strings(value["members"]) and _is_links(value["selectedchall"]):
+            return TeamRecord(pool.string(value["name"]), pool.strings(value["members"]), pool.links(value["selectedchall"]))
+    elif keys == _CHALLENGE_KEYS or keys == _CHALLENGE_LOGO_KEYS:
+        strings = (value[key] for key in ("name", "organizer", "theme", "prize", "description", "submissionMode"))
+        expected = value["expectedElements"]
+        logo = value.get("logo", _MISSING)
+        if (
+            all(_is_optional_string(string) for string in strings)
+            and (expected is None or _is_strings(expected))
+            and (logo is _MISSING or _is_optional_string(logo))
+            and _is_links(value["teams"])
+        ):
+            return ChallengeRecord(
+                pool.string(value["name"]),
+                pool.string(value["organizer"]),
+                pool.string(value["theme"]),
+                pool.string(value["prize"]),
+                value["description"],
+                tuple(expected) if expected is not None else None,
+                pool.string(value["submissionMode"]),
+                pool.links(value["teams"]),
+                pool.string(logo) if logo is not _MISSING else _MISSING,
+            )
+    elif keys == _TEAM_LIST_KEYS:
+        if _is_links(value["teams"]) and value["total"] == len(value["teams"]):
+            return TeamListRecord(pool.links(value["teams"]))
+    return value
+
+
+def expand(value: Any) -> Any:
+    """The scrape result behind a value returned by compact()"""
+    return value.to_json() if isinstance(value, RECORD_TYPES) else value
+
+
+# Shared by every snapshot of this process
+string_pool = StringPool()
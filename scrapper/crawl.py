@@ -0,0 +1,375 @@
+"""
+Event Crawler
+Walks the whole event graph with NuitDelInfoScraper: the challenge list,
+every challenge page and every team page, and streams each scrape result
+to a JSON-lines file (or Parquet files) as soon as it is parsed
+
+Pages are discovered from the ones already crawled (challenge list ->
+challenges -> their teams -> the challenges those teams selected), and a
+deduplicated frontier makes sure each page is fetched exactly once, however
+many challenges list the same team. At most --concurrency pages are
+fetched at once, on top of the shared upstream rate limit.
+
+Progress is checkpointed every --checkpoint-interval seconds and when the
+crawl is interrupted: run again with --resume to continue from the last
+checkpoint. Results written after it are discarded and fetched again, so
+every page appears exactly once in the output.
+
+Usage (from the scrapper directory):
+    python crawl.py --output event.jsonl [--concurrency 8] [--resume]
+    python crawl.py --output event-parquet --format parquet
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Set
+
+from scraper_base import PRIORITY_BULK, fetch_priority, http_client, page_states
+from extraction_pool import extraction_pool
+from scrapers import CHALLENGES_URL, NuitDelInfoScraper, challenge_url, team_url
+from serialization import dumps
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:  # Parquet output is only available when installed
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+# Parquet part files written by ParquetWriter: part-00000.parquet, ...
+PART_FILE = re.compile(r"part-(\d+)\.parquet")
+
+# Page kinds: the challenge list, a challenge page, a team page
+CHALLENGES = "challenges"
+CHALLENGE = "challenge"
+TEAM = "team"
+
+
+def page_key(kind: str, page_id: Optional[str] = None) -> str:
+    """Frontier key of a page: "challenges", "challenge:494" or "team:28" """
+    return kind if page_id is None else f"{kind}:{page_id}"
+
+
+def page_url(key: str) -> str:
+    kind, _, page_id = key.partition(":")
+    if kind == CHALLENGE:
+        return challenge_url(page_id)
+    if kind == TEAM:
+        return team_url(page_id)
+    return CHALLENGES_URL
+
+
+def linked_keys(key: str, result: Dict) -> List[str]:
+    """Keys of the pages a scrape result links to"""
+    kind = key.partition(":")[0]
+    if kind == CHALLENGES:
+        links, target = result.get("challenges", []), CHALLENGE
+    elif kind == CHALLENGE:
+        links, target = result.get("teams", []), TEAM
+    else:
+        links, target = result.get("selectedchall", []), CHALLENGE
+    return [page_key(target, link["id"]) for link in links if link.get("id")]
+
+
+class JsonLinesWriter:
+    """
+    Appends one JSON record per line to a file
+
+    commit() flushes the file and returns its size; restore() truncates it
+    back to a committed size.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def open(self, state: Optional[Dict] = None):
+        if state is None:
+            self._file = open(self.path, "wb")
+            return
+        self._file = open(self.path, "r+b" if os.path.exists(self.path) else "wb")
+        self._file.truncate(state["bytes"])
+        self._file.seek(state["bytes"])
+
+    def write(self, record: Dict):
+        self._file.write(dumps(record) + b"\n")
+
+    def commit(self) -> Dict:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {"bytes": self._file.tell()}
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class ParquetWriter:
+    """
+    Writes records to a directory of Parquet part files
+
+    Rows are buffered and written as a row group every batch_rows records;
+    commit() writes the buffered rows and closes the current part, so
+    committed parts are complete files. restore() deletes the parts written
+    after the committed ones. The scrape result is stored as JSON text in
+    the data column.
+    """
+
+    def __init__(self, path: str, batch_rows: int = 1000):
+        if pyarrow is None:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.path = path
+        self.batch_rows = batch_rows
+        self.schema = pyarrow.schema([
+            ("type", pyarrow.string()),
+            ("id", pyarrow.string()),
+            ("url", pyarrow.string()),
+            ("fetched_at", pyarrow.float64()),
+            ("data", pyarrow.string()),
+        ])
+        self.parts = 0
+        self._rows: List[Dict] = []
+        self._writer = None
+
+    def open(self, state: Optional[Dict] = None):
+        os.makedirs(self.path, exist_ok=True)
+        self.parts = state["parts"] if state is not None else 0
+        # Parts past the checkpoint were written after it: they are written again
+        for name in os.listdir(self.path):
+            match = PART_FILE.fullmatch(name)
+            if match and int(match.group(1)) >= self.parts:
+                os.remove(os.path.join(self.path, name))
+
+    def write(self, record: Dict):
+        self._rows.append({**record, "data": dumps(record["data"]).decode("utf-8")})
+        if len(self._rows) >= self.batch_rows:
+            self._write_rows()
+
+    def commit(self) -> Dict:
+        self._write_rows()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self.parts += 1
+        return {"parts": self.parts}
+
+    def close(self):
+        # Uncommitted rows are dropped: they are crawled again on resume
+        if self._writer is not None:
+            self._writer.close()
+
+    def _write_rows(self):
+        if not self._rows:
+            return
+        if self._writer is None:
+            path = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+            self._writer = parquet.ParquetWriter(path, self.schema)
+        self._writer.write_table(pyarrow.Table.from_pylist(self._rows, schema=self.schema))
+        self._rows = []
+
+
+class Crawler:
+    """
+    Crawls every page reachable from the challenge list, writing each
+    scrape result to writer
+
+    The frontier holds the key of every page discovered so far; done holds
+    the pages whose results are committed to the output. A checkpoint saves
+    both with the writer's committed state, and resuming re-queues the pages
+    that were discovered but not done.
+    """
+
+    def __init__(
+        self,
+        writer,
+        checkpoint_path: str,
+        concurrency: int = 8,
+        checkpoint_interval: float = 30,
+        engine: Optional[str] = None
+    ):
+        self.writer = writer
+        self.checkpoint_path = checkpoint_path
+        self.concurrency = concurrency
+        self.checkpoint_interval = checkpoint_interval
+        self.scraper = NuitDelInfoScraper(engine)
+
+        self.frontier: Set[str] = set()
+        self.done: Set[str] = set()
+        # Written since the last checkpoint
+        self._written: Set[str] = set()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._last_checkpoint = 0.0
+
+        # Counters
+        self.fetched = {CHALLENGES: 0, CHALLENGE: 0, TEAM: 0}
+        self.failed: Dict[str, str] = {}
+        self.duplicates = 0
+        self.elapsed = 0.0
+
+    def load_checkpoint(self) -> Optional[Dict]:
+        """Restore the frontier and counters from the checkpoint; returns the writer state"""
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"{self.checkpoint_path}: unsupported checkpoint version {checkpoint.get('version')}")
+        self.frontier = set(checkpoint["frontier"])
+        self.done = set(checkpoint["done"])
+        self.fetched.update(checkpoint["fetched"])
+        self.duplicates = checkpoint["duplicates"]
+        self.elapsed = checkpoint["elapsed"]
+        return checkpoint["output"]
+
+    def checkpoint(self):
+        """Commit the output, then save the frontier (atomically replaces the previous checkpoint)"""
+        output = self.writer.commit()
+        self.done |= self._written
+        self._written = set()
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "output": output,
+            "frontier": sorted(self.frontier),
+            "done": sorted(self.done),
+            "fetched": self.fetched,
+            "duplicates": self.duplicates,
+            "elapsed": self.elapsed + time.monotonic() - self._started,
+        }
+        temporary = f"{self.checkpoint_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(temporary, self.checkpoint_path)
+        self._last_checkpoint = time.monotonic()
+        logger.info(
+            f"Checkpoint: {len(self.done)} pages done, {len(self.frontier) - len(self.done)} pending, "
+            f"{len(self.failed)} failed"
+        )
+
+    async def run(self, resume: bool = False) -> Dict:
+        """Crawl until the frontier is exhausted; returns the summary"""
+        state = self.load_checkpoint() if resume else None
+        self.writer.open(state)
+        self._started = self._last_checkpoint = time.monotonic()
+        if state is None:
+            self.frontier = {page_key(CHALLENGES)}
+        for key in sorted(self.frontier - self.done):
+            self._queue.put_nowait(key)
+
+        # Every page is fetched once: keeping its validators and result would only use memory
+        page_states.enabled = False
+        await http_client.start()
+        await extraction_pool.start()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        try:
+            await self._queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.checkpoint()
+            self.writer.close()
+            await http_client.close()
+            await extraction_pool.stop()
+        return self.summary()
+
+    def summary(self) -> Dict:
+        elapsed = self.elapsed + time.monotonic() - self._started
+        return {
+            "pages": len(self.done),
+            "fetched": self.fetched,
+            "failed": self.failed,
+            "pending": len(self.frontier) - len(self.done) - len(self.failed),
+            "duplicates_skipped": self.duplicates,
+            "seconds": round(elapsed, 1),
+            "pages_per_second": round(len(self.done) / elapsed, 1) if elapsed else None,
+        }
+
+    async def _worker(self):
+        fetch_priority.set(PRIORITY_BULK)
+        while True:
+            key = await self._queue.get()
+            try:
+                await self._crawl(key)
+            finally:
+                self._queue.task_done()
+
+    async def _crawl(self, key: str):
+        kind, _, page_id = key.partition(":")
+        try:
+            if kind == CHALLENGES:
+                result = await self.scraper.scrape_challenges_async()
+            elif kind == CHALLENGE:
+                result = await self.scraper.scrape_challenge_details_async(page_id)
+            else:
+                result = await self.scraper.scrape_team_details_async(page_id)
+        except Exception as e:
+            result = {"error": str(e)}
+        if "error" in result:
+            self.failed[key] = result["error"]
+            logger.warning(f"Failed to crawl {key}: {result['error']}")
+            return
+
+        # Discover before writing: a checkpoint never marks a page done before its links are in the frontier
+        for linked in linked_keys(key, result):
+            if linked in self.frontier:
+                self.duplicates += 1
+            else:
+                self.frontier.add(linked)
+                self._queue.put_nowait(linked)
+        self.writer.write({
+            "type": kind,
+            "id": page_id or None,
+            "url": page_url(key),
+            "fetched_at": time.time(),
+            "data": result,
+        })
+        self.fetched[kind] += 1
+        self._written.add(key)
+        if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="JSON-lines file, or directory of Parquet parts")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default="jsonl")
+    parser.add_argument("--concurrency", type=int, default=8, help="pages fetched at once")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--checkpoint-interval", type=float, default=30, help="seconds between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="rows per Parquet row group")
+    parser.add_argument("--engine", choices=NuitDelInfoScraper.ENGINES, help="extraction engine (default: SCRAPER_ENGINE)")
+    args = parser.parse_args()
+
+    if args.format == "parquet":
+        try:
+            writer = ParquetWriter(args.output, args.batch_rows)
+        except RuntimeError as e:
+            parser.error(str(e))
+    else:
+        writer = JsonLinesWriter(args.output)
+    checkpoint_path = args.checkpoint or f"{args.output.rstrip('/')}.checkpoint"
+    if args.resume and not os.path.exists(checkpoint_path):
+        parser.error(f"no checkpoint to resume from: {checkpoint_path}")
+
+    crawler = Crawler(writer, checkpoint_path, args.concurrency, args.checkpoint_interval, args.engine)
+    try:
+        summary = asyncio.run(crawler.run(resume=args.resume))
+    except KeyboardInterrupt:
+        print(f"Interrupted: run again with --resume to continue from {checkpoint_path}")
+        sys.exit(130)
+    print(json.dumps(summary, indent=2))
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
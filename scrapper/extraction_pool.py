@@ -0,0 +1,216 @@
+"""
+Extraction Process Pool
+Runs the CPU-bound extraction step of the scrapers (raw HTML in, plain dicts
+out) in worker processes, so parsing a large page does not hold the GIL
+and stall every other request handled by the event loop
+
+Small pages are still extracted inline, since sending the HTML and the result
+between processes would cost more than parsing them. The size threshold is
+either fixed (EXTRACT_INLINE_MAX_BYTES) or derived from the measured
+round-trip overhead of the pool and the measured parse speed.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest measurement in the overhead and parse speed averages
+_SMOOTHING = 0.2
+
+# Scrapers built in a worker process, by (class, options)
+_scrapers: Dict[Tuple, Any] = {}
+
+
+def _ping():
+    """Round trip to a worker process"""
+    return None
+
+
+def _extract(cls: type, options: Tuple, method: str, args: Tuple, html: str) -> Tuple[Dict, float, float]:
+    """
+    Runs in a worker process: extract html with cls(**options).method
+
+    Returns (result, parse seconds, extraction seconds).
+    """
+    key = (cls, options)
+    scraper = _scrapers.get(key)
+    if scraper is None:
+        scraper = _scrapers[key] = cls(**dict(options))
+    start = time.perf_counter()
+    with metrics.parse_timer() as parse_seconds:
+        result = getattr(scraper, method)(html, *args)
+    return result, parse_seconds[0], time.perf_counter() - start
+
+
+def _average(current: Optional[float], value: float) -> float:
+    return value if current is None else current + _SMOOTHING * (value - current)
+
+
+class ExtractionPool:
+    """
+    Process pool for scraper extract_* methods, with inline extraction of
+    pages below a size threshold
+
+    Disabled (everything inline) with 0 processes. Until the pool has been
+    warmed up and a page has been parsed, the automatic threshold keeps
+    extraction inline.
+    """
+
+    def __init__(self, processes: Optional[int] = None, inline_max_bytes: Optional[int] = None):
+        self.processes = processes if processes is not None else int(os.getenv('EXTRACT_PROCESSES', 0))
+        if inline_max_bytes is None:
+            setting = os.getenv('EXTRACT_INLINE_MAX_BYTES', 'auto')
+            inline_max_bytes = None if setting == 'auto' else int(setting)
+        # None: automatic threshold
+        self.inline_max_bytes = inline_max_bytes
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self._overhead: Optional[float] = None
+        self._seconds_per_byte: Optional[float] = None
+        self._in_flight = 0
+
+        # Counters
+        self.inline = 0
+        self.offloaded = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def start(self):
+        """Start the worker processes (in the background); no-op with 0 processes"""
+        if self.processes <= 0 or self._executor is not None:
+            return
+        self._executor = self._create_executor()
+        self._warm_up_task = asyncio.create_task(self._warm_up(self._executor))
+
+    async def stop(self):
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            self._warm_up_task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def threshold(self) -> Optional[int]:
+        """Largest page size (characters) extracted inline; None while unknown"""
+        if self.inline_max_bytes is not None:
+            return self.inline_max_bytes
+        if self._overhead is None or not self._seconds_per_byte:
+            return None
+        return int(self._overhead / self._seconds_per_byte)
+
+    def should_offload(self, size: int) -> bool:
+        """Whether a page of size characters is worth sending to the pool"""
+        if self._executor is None:
+            return False
+        threshold = self.threshold()
+        return threshold is not None and size > threshold
+
+    async def extract(self, scraper, kind: str, method: str, args: Tuple, html: str) -> Dict:
+        """
+        Run scraper.method(html, *args), in the pool when the page is large
+        enough; kind names the extraction in the metrics
+        """
+        size = len(html)
+        if self.should_offload(size):
+            executor = self._executor
+            try:
+                return await self._extract_in_pool(executor, scraper, kind, method, args, html)
+            except BrokenProcessPool as e:
+                # A worker died: extract this page inline. Every page in flight
+                # on the broken pool fails; only the first one replaces it.
+                self.failures += 1
+                if self._executor is executor:
+                    logger.error(f"Extraction pool broken, restarting it: {e}")
+                    self._restart()
+
+        start = time.perf_counter()
+        with metrics.measure_extraction(kind):
+            result = getattr(scraper, method)(html, *args)
+        self._seconds_per_byte = _average(self._seconds_per_byte, (time.perf_counter() - start) / max(size, 1))
+        self.inline += 1
+        return result
+
+    def stats(self) -> Dict:
+        threshold = self.threshold()
+        return {
+            "processes": self.processes if self.enabled else 0,
+            "inline_max_bytes": threshold,
+            "automatic_threshold": self.inline_max_bytes is None,
+            "inline": self.inline,
+            "offloaded": self.offloaded,
+            "in_flight": self._in_flight,
+            "failures": self.failures,
+            "overhead_ms": round(self._overhead * 1000, 3) if self._overhead is not None else None,
+            "parse_ms_per_100kb": round(self._seconds_per_byte * 100_000_000, 3) if self._seconds_per_byte else None,
+        }
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn: same behaviour on every platform, and no fork of a process running threads
+        return ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+
+    def _restart(self):
+        """Replace the pool with a new one, measuring its overhead again (pages stay inline until then)"""
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._create_executor()
+        self._overhead = None
+        self._warm_up_task = asyncio.create_task(self._warm_up(self._executor))
+
+    async def _extract_in_pool(self, executor: ProcessPoolExecutor, scraper, kind: str, method: str, args: Tuple, html: str) -> Dict:
+        loop = asyncio.get_running_loop()
+        options = tuple(sorted(scraper.extraction_options().items()))
+        queued = self._in_flight >= self.processes
+        start = time.perf_counter()
+        self._in_flight += 1
+        try:
+            result, parse_seconds, elapsed = await loop.run_in_executor(
+                executor, _extract, type(scraper), options, method, args, html
+            )
+        finally:
+            self._in_flight -= 1
+        total = time.perf_counter() - start
+
+        metrics.observe_extraction(kind, parse_seconds, elapsed)
+        metrics.record_timing("pool", total - elapsed)
+        # Time spent queued behind other pages is not overhead
+        if not queued:
+            self._overhead = _average(self._overhead, total - elapsed)
+        self._seconds_per_byte = _average(self._seconds_per_byte, elapsed / max(len(html), 1))
+        self.offloaded += 1
+        return result
+
+    async def _warm_up(self, executor: ProcessPoolExecutor):
+        """Start every worker process of executor, then measure the round-trip overhead"""
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*(loop.run_in_executor(executor, _ping) for _ in range(self.processes)))
+            for _ in range(5):
+                start = time.perf_counter()
+                await loop.run_in_executor(executor, _ping)
+                self._overhead = _average(self._overhead, time.perf_counter() - start)
+        except BrokenProcessPool as e:
+            logger.error(f"Extraction pool failed to start: {e}")
+            return
+        logger.info(f"Extraction pool started: {self.processes} processes, round trip {self._overhead * 1000:.2f} ms")
+
+
+# Shared by all scrapers; started and stopped with the API
+extraction_pool = ExtractionPool()
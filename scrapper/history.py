@@ -0,0 +1,438 @@
+"""
+Time-series History
+Records how scraped values evolve (the participant count of every
+challenge, the member count of every team, the number of teams) and
+answers downsampled queries over any time range
+
+Only changes are recorded: a value holds until the next point of its
+series. Each series keeps its latest points in memory in two typed arrays
+(times and values), dropping the oldest past a fixed size. Points are also
+appended to an on-disk segment, so history survives restarts and ranges
+older than the in-memory points can still be queried.
+
+The segment is a sequence of self-contained columnar blocks: the series
+names used by the block, then the series index, time and value of every
+point as packed arrays. Each block is written with a single append, so
+several worker processes can share the file. The offsets of the blocks
+holding each series are indexed, so a query only reads those blocks.
+Compaction rewrites the segment with one block per series, without the
+points older than the retention period.
+"""
+
+import asyncio
+import os
+import struct
+import sys
+import threading
+import time
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from fnmatch import fnmatchcase
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends and compaction are not locked against each other
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"PODHIST1"
+# Block header: point count, series name count, names length in bytes
+_BLOCK = struct.Struct("<III")
+_NAME_LENGTH = struct.Struct("<H")
+# Series index within a block: 32-bit unsigned
+_INDEX_TYPE = "I" if array("I").itemsize == 4 else "L"
+# Bytes per point: series index, time, value
+_POINT_SIZE = 4 + 8 + 8
+
+
+def _packed(values: array) -> bytes:
+    """Array bytes in little-endian order, whatever the machine order"""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpacked(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _block(names: List[str], ids: array, times: array, values: array) -> bytes:
+    """Encoded block of points; ids index names"""
+    encoded = b"".join(_NAME_LENGTH.pack(len(name)) + name for name in (name.encode("utf-8") for name in names))
+    return _BLOCK.pack(len(times), len(names), len(encoded)) + encoded + _packed(ids) + _packed(times) + _packed(values)
+
+
+def _names(data: bytes, count: int) -> List[str]:
+    names = []
+    position = 0
+    for _ in range(count):
+        (length,) = _NAME_LENGTH.unpack_from(data, position)
+        position += _NAME_LENGTH.size
+        names.append(data[position:position + length].decode("utf-8"))
+        position += length
+    return names
+
+
+class Series:
+    """Times and values of a series' latest changes, oldest first"""
+
+    __slots__ = ("times", "values", "dropped")
+
+    def __init__(self):
+        self.times = array("d")
+        self.values = array("q")
+        # Whether older points were dropped from memory (they are on disk)
+        self.dropped = False
+
+    def append(self, timestamp: float, value: int, max_points: int) -> bool:
+        """Add a point if value changed and timestamp is not older than the last point"""
+        if self.times and (timestamp < self.times[-1] or self.values[-1] == value):
+            return False
+        self.times.append(timestamp)
+        self.values.append(value)
+        # Drop in chunks, so dropping costs O(1) per point on average
+        if len(self.times) > max_points + max_points // 4:
+            excess = len(self.times) - max_points
+            del self.times[:excess]
+            del self.values[:excess]
+            self.dropped = True
+        return True
+
+    def first_time(self) -> Optional[float]:
+        return self.times[0] if self.times else None
+
+
+def downsample(times, values, start: float, end: float, step: float, now: float) -> Dict[str, List]:
+    """
+    Min, max and last value of a step series per bucket of step seconds
+    from start to end; buckets before the first point or after now are null
+
+    The value in effect when a bucket starts (the last point before it)
+    counts towards the bucket, so a value that did not change shows as a
+    flat line rather than a gap.
+    """
+    buckets = max(1, int(-(-(end - start) // step)))
+    mins: List[Optional[int]] = [None] * buckets
+    maxs: List[Optional[int]] = [None] * buckets
+    lasts: List[Optional[int]] = [None] * buckets
+
+    i = bisect_right(times, start) - 1
+    current = values[i] if i >= 0 else None
+    i += 1
+    n = len(times)
+    for bucket in range(buckets):
+        bucket_start = start + bucket * step
+        if bucket_start > now:
+            break
+        bucket_end = bucket_start + step
+        low = high = current
+        while i < n and times[i] < bucket_end:
+            current = values[i]
+            low = current if low is None or current < low else low
+            high = current if high is None or current > high else high
+            i += 1
+        mins[bucket], maxs[bucket], lasts[bucket] = low, high, current
+    return {"min": mins, "max": maxs, "last": lasts}
+
+
+class History:
+    """
+    Series of integer values by name, in memory and, with a path, in an
+    append-only segment file
+
+    record() buffers the points to write; flush() appends them to the
+    segment as one block. The segment is only read and written from worker
+    threads, one at a time.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_points: Optional[int] = None, retention: Optional[float] = None):
+        self.path = path if path is not None else os.getenv('HISTORY_PATH', 'history.bin')
+        self.max_points = max_points if max_points is not None else int(os.getenv('HISTORY_MEMORY_POINTS', 4096))
+        self.retention = retention if retention is not None else float(os.getenv('HISTORY_RETENTION', 30 * 86400))
+        self._series: Dict[str, Series] = {}
+        self._pending: List[Tuple[str, float, int]] = []
+
+        # Offsets of the segment blocks holding each series, for the first
+        # _indexed bytes of the segment file _inode
+        self._offsets: Dict[str, List[int]] = {}
+        self._indexed = 0
+        self._inode: Optional[int] = None
+        # Segment file and size right after the last compaction
+        self._compacted: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+        # Counters
+        self.recorded = 0
+        self.flushes = 0
+        self.write_errors = 0
+        self.disk_reads = 0
+        self.compactions = 0
+        self.compacted_points = 0
+
+    def record(self, name: str, timestamp: float, value: int, persist: bool = True) -> bool:
+        """
+        Add value to series name at timestamp (unless unchanged); persist
+        False keeps it in memory only (another process wrote it to disk)
+        """
+        series = self._series.get(name)
+        if series is None:
+            series = self._series[name] = Series()
+        if not series.append(timestamp, value, self.max_points):
+            return False
+        self.recorded += 1
+        if persist and self.path:
+            self._pending.append((name, timestamp, value))
+        return True
+
+    def names(self, patterns: Iterable[str]) -> List[str]:
+        """Series names matching any of patterns ("*" matches any run of characters)"""
+        patterns = list(patterns)
+        exact = [name for name in patterns if "*" not in name and "?" not in name and name in self._series]
+        globs = [pattern for pattern in patterns if "*" in pattern or "?" in pattern]
+        found = set(exact)
+        if globs:
+            found.update(name for name in self._series if any(fnmatchcase(name, glob) for glob in globs))
+        return sorted(found)
+
+    async def query(self, names: List[str], start: float, end: float, step: float) -> Dict[str, Dict[str, List]]:
+        """Downsampled series (see downsample) by name"""
+        now = time.time()
+        results = {}
+        older: List[str] = []
+        for name in names:
+            series = self._series[name]
+            first = series.first_time()
+            if series.dropped and first is not None and start < first:
+                older.append(name)
+            else:
+                results[name] = downsample(series.times, series.values, start, end, step, now)
+        if older:
+            # Part of the range is only on disk: merge it with the points in memory
+            on_disk = await asyncio.to_thread(self._read_points, set(older), end)
+            for name in older:
+                series = self._series[name]
+                times, values = on_disk.get(name, (array("d"), array("q")))
+                cut = bisect_left(times, series.first_time())
+                times = times[:cut] + series.times
+                values = values[:cut] + series.values
+                results[name] = downsample(times, values, start, end, step, now)
+        return results
+
+    async def load(self) -> int:
+        """Load the points saved in the segment into memory; returns how many"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        start = time.perf_counter()
+        count = 0
+        for name, (times, values) in (await asyncio.to_thread(self._read_points, None, float("inf"))).items():
+            series = self._series.setdefault(name, Series())
+            if len(times) > self.max_points:
+                # Only the latest points are kept in memory
+                times, values = times[-self.max_points:], values[-self.max_points:]
+                series.dropped = True
+            for timestamp, value in zip(times, values):
+                if series.append(timestamp, value, self.max_points):
+                    count += 1
+        logger.info(f"Loaded {count} history points from {self.path} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return count
+
+    async def flush(self) -> int:
+        """Append the pending points to the segment as one block; returns how many"""
+        if not self._pending or not self.path:
+            return 0
+        pending, self._pending = self._pending, []
+        return await asyncio.to_thread(self._append, pending)
+
+    async def compact(self) -> int:
+        """
+        Rewrite the segment without the points older than retention seconds,
+        except the last one of each series (the value in effect since);
+        returns how many points were dropped
+        """
+        if not self.path or self.retention <= 0 or not os.path.exists(self.path):
+            return 0
+        try:
+            return await asyncio.to_thread(self._compact, time.time() - self.retention)
+        except OSError as e:
+            logger.error(f"Could not compact history segment {self.path}: {e}")
+            return 0
+
+    def stats(self) -> Dict:
+        return {
+            "series": len(self._series),
+            "points_in_memory": sum(len(series.times) for series in self._series.values()),
+            "recorded": self.recorded,
+            "pending": len(self._pending),
+            "path": self.path or None,
+            "segment_bytes": os.path.getsize(self.path) if self.path and os.path.exists(self.path) else 0,
+            "retention": self.retention,
+            "flushes": self.flushes,
+            "write_errors": self.write_errors,
+            "disk_reads": self.disk_reads,
+            "compactions": self.compactions,
+            "compacted_points": self.compacted_points,
+        }
+
+    def _append(self, pending: List[Tuple[str, float, int]]) -> int:
+        indexes: Dict[str, int] = {}
+        ids, times, values = array(_INDEX_TYPE), array("d"), array("q")
+        for name, timestamp, value in pending:
+            ids.append(indexes.setdefault(name, len(indexes)))
+            times.append(timestamp)
+            values.append(value)
+        block = _block(list(indexes), ids, times, values)
+
+        try:
+            with self._lock:
+                fd = self._open_for_append()
+                try:
+                    if os.fstat(fd).st_size == 0:
+                        os.write(fd, _MAGIC)
+                    os.write(fd, block)
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            self.write_errors += 1
+            logger.error(f"Could not write {len(pending)} history points to {self.path}: {e}")
+            return 0
+        self.flushes += 1
+        return len(pending)
+
+    def _open_for_append(self) -> int:
+        """The segment, opened for appending and locked against compaction by another process"""
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            if fcntl is None:
+                return fd
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            # Replaced by a compaction while waiting for the lock
+            os.close(fd)
+
+    def _compact(self, cutoff: float) -> int:
+        with self._lock, open(self.path, "rb") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            status = os.fstat(f.fileno())
+            if os.stat(self.path).st_ino != status.st_ino or (status.st_ino, status.st_size) == self._compacted:
+                # Just compacted by another process, or unchanged since the last compaction
+                return 0
+            dropped = 0
+            kept: Dict[str, Tuple[array, array]] = {}
+            for name, (times, values) in self._points(f, None, float("inf")).items():
+                first = max(0, bisect_left(times, cutoff) - 1)
+                dropped += first
+                kept[name] = (times[first:], values[first:])
+
+            temporary = self.path + ".compact"
+            offsets: Dict[str, List[int]] = {}
+            with open(temporary, "wb") as out:
+                out.write(_MAGIC)
+                for name, (times, values) in kept.items():
+                    offsets[name] = [out.tell()]
+                    out.write(_block([name], array(_INDEX_TYPE, [0]) * len(times), times, values))
+                out.flush()
+                os.fsync(out.fileno())
+                size = out.tell()
+                inode = os.fstat(out.fileno()).st_ino
+            os.replace(temporary, self.path)
+            self._offsets, self._indexed, self._inode = offsets, size, inode
+            self._compacted = (inode, size)
+        self.compactions += 1
+        self.compacted_points += dropped
+        logger.info(f"Compacted {self.path}: dropped {dropped} points older than {self.retention:.0f} seconds")
+        return dropped
+
+    def _read_points(self, names: Optional[set], end: float) -> Dict[str, Tuple[array, array]]:
+        """Points of the named series (None: all) up to end, from the segment, sorted by time"""
+        with self._lock:
+            self.disk_reads += 1
+            try:
+                with open(self.path, "rb") as f:
+                    return self._points(f, names, end)
+            except OSError as e:
+                logger.error(f"Could not read history segment {self.path}: {e}")
+                return {}
+
+    def _points(self, f: BinaryIO, names: Optional[set], end: float) -> Dict[str, Tuple[array, array]]:
+        self._update_index(f)
+        if names is None:
+            offsets = sorted({offset for series_offsets in self._offsets.values() for offset in series_offsets})
+        else:
+            offsets = sorted({offset for name in names for offset in self._offsets.get(name, ())})
+        points: Dict[str, List[Tuple[float, int]]] = {}
+        for offset in offsets:
+            block_names, ids, times, values = self._read_block(f, offset)
+            for index, timestamp, value in zip(ids, times, values):
+                name = block_names[index]
+                if (names is None or name in names) and timestamp <= end:
+                    points.setdefault(name, []).append((timestamp, value))
+        result = {}
+        for name, series_points in points.items():
+            series_points.sort()
+            result[name] = (array("d", (t for t, _ in series_points)), array("q", (v for _, v in series_points)))
+        return result
+
+    def _update_index(self, f: BinaryIO):
+        """
+        Index the blocks of the segment (open as f) appended since the last
+        call; a truncated last block (interrupted write) is ignored
+        """
+        status = os.fstat(f.fileno())
+        if status.st_ino != self._inode or status.st_size < self._indexed:
+            # Another segment file (compacted by another process): index it from the start
+            self._offsets, self._indexed, self._inode = {}, 0, status.st_ino
+        if self._indexed == 0:
+            f.seek(0)
+            if f.read(len(_MAGIC)) != _MAGIC:
+                if status.st_size:
+                    logger.error(f"{self.path} is not a history segment")
+                return
+            self._indexed = len(_MAGIC)
+
+        offset = self._indexed
+        while offset + _BLOCK.size <= status.st_size:
+            f.seek(offset)
+            count, name_count, names_length = _BLOCK.unpack(f.read(_BLOCK.size))
+            block_end = offset + _BLOCK.size + names_length + count * _POINT_SIZE
+            if block_end > status.st_size:
+                logger.warning(f"Ignoring truncated block at the end of {self.path}")
+                break
+            for name in _names(f.read(names_length), name_count):
+                self._offsets.setdefault(name, []).append(offset)
+            offset = block_end
+        self._indexed = offset
+
+    @staticmethod
+    def _read_block(f: BinaryIO, offset: int) -> Tuple[List[str], array, array, array]:
+        f.seek(offset)
+        count, name_count, names_length = _BLOCK.unpack(f.read(_BLOCK.size))
+        names = _names(f.read(names_length), name_count)
+        ids = _unpacked(_INDEX_TYPE, f.read(4 * count))
+        times = _unpacked("d", f.read(8 * count))
+        values = _unpacked("q", f.read(8 * count))
+        return names, ids, times, values
+
+
+def resolve_range(start: Optional[float], end: Optional[float], default_span: float) -> Tuple[float, float]:
+    """
+    Absolute (start, end) from query parameters: values of zero or less
+    are relative to now (start=-3600: one hour ago)
+    """
+    now = time.time()
+    end = now if end is None else (now + end if end <= 0 else end)
+    start = end - default_span if start is None else (now + start if start <= 0 else start)
+    return start, end
+
@@ -0,0 +1,307 @@
+"""
+Data Index
+In-memory indexes over the scraped teams, members and challenges, kept up
+to date from every stored scrape result, so lookups and name searches are
+answered without scraping
+
+Team / challenge links come from two kinds of pages: a team page lists
+the challenges the team selected, and a challenge page (or the principal
+team list) lists its teams. Links are kept per source page, so a page
+that is scraped again replaces exactly the links it contributed.
+"""
+
+import time
+import unicodedata
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Optional, Set, Tuple
+
+# Search result kinds
+TEAM = "team"
+CHALLENGE = "challenge"
+MEMBER = "member"
+
+# (kind, id): a team / challenge ID, or a normalized member name
+Entry = Tuple[str, str]
+
+
+def normalize(text: str) -> str:
+    """Case- and accent-insensitive form of text used for every lookup"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    """
+    Substring search over names: a trigram index for queries of three or
+    more characters, and a scan of every name for shorter ones (which match
+    too many names for an index to narrow them down much)
+    """
+
+    def __init__(self):
+        self._names: Dict[Entry, str] = {}
+        self._trigrams: DefaultDict[str, Set[Entry]] = defaultdict(set)
+
+    def set(self, entry: Entry, name: Optional[str]):
+        """Index entry under name, replacing its previous name"""
+        normalized = normalize(name) if name else ""
+        previous = self._names.get(entry)
+        if previous == normalized:
+            return
+        if previous is not None:
+            self.remove(entry)
+        if not normalized:
+            return
+        self._names[entry] = normalized
+        for trigram in trigrams(normalized):
+            self._trigrams[trigram].add(entry)
+
+    def remove(self, entry: Entry):
+        normalized = self._names.pop(entry, None)
+        if normalized is None:
+            return
+        for trigram in trigrams(normalized):
+            entries = self._trigrams.get(trigram)
+            if entries is not None:
+                entries.discard(entry)
+                if not entries:
+                    del self._trigrams[trigram]
+
+    def search(self, query: str) -> List[Entry]:
+        """Entries whose name contains the normalized query"""
+        query = normalize(query)
+        if not query:
+            return []
+        if len(query) < 3:
+            return [entry for entry, name in self._names.items() if query in name]
+
+        candidates: Optional[Set[Entry]] = None
+        # Smallest posting lists first, so the intersection shrinks quickly
+        for trigram in sorted(trigrams(query), key=lambda t: len(self._trigrams.get(t, ()))):
+            entries = self._trigrams.get(trigram)
+            if not entries:
+                return []
+            candidates = set(entries) if candidates is None else candidates & entries
+            if not candidates:
+                return []
+        return [entry for entry in candidates if query in self._names[entry]]
+
+    def name(self, entry: Entry) -> Optional[str]:
+        return self._names.get(entry)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class DataIndex:
+    """
+    Teams, challenges and members by ID / name, the links between them and
+    a name search over all three
+
+    Fed with scrape results through the update_* methods; every lookup is a
+    few dictionary accesses.
+    """
+
+    def __init__(self):
+        self.teams: Dict[str, Dict] = {}
+        self.challenges: Dict[str, Dict] = {}
+        # Normalized member name -> display name and team IDs
+        self._member_names: Dict[str, str] = {}
+        self._member_teams: DefaultDict[str, Set[str]] = defaultdict(set)
+        # Links listed by team pages / by challenge pages, both directions
+        self._team_page_links: Dict[str, Set[str]] = {}
+        self._challenge_page_links: Dict[str, Set[str]] = {}
+        self._teams_by_team_pages: DefaultDict[str, Set[str]] = defaultdict(set)
+        self._challenges_by_challenge_pages: DefaultDict[str, Set[str]] = defaultdict(set)
+        self.names = NameIndex()
+
+        # Counters
+        self.updates = 0
+        self.update_seconds = 0.0
+        self.searches = 0
+
+    # Updates
+
+    def update_team_list(self, challenge_id: str, teams: Iterable[Dict]):
+        """Index a challenge's team list (the principal challenge page)"""
+        self._timed(self._set_challenge_teams, challenge_id, teams)
+
+    def update_team(self, team_id: str, result: Dict):
+        """Index a scrape_team_details result"""
+        self._timed(self._update_team, team_id, result)
+
+    def update_challenges(self, challenges: Iterable[Dict]):
+        """Index the challenge list"""
+        self._timed(self._update_challenges, challenges)
+
+    def update_challenge(self, challenge_id: str, result: Dict):
+        """Index a scrape_challenge_details result"""
+        self._timed(self._update_challenge, challenge_id, result)
+
+    # Lookups
+
+    def team(self, team_id: str) -> Optional[Dict]:
+        return self.teams.get(team_id)
+
+    def challenge(self, challenge_id: str) -> Optional[Dict]:
+        return self.challenges.get(challenge_id)
+
+    def challenge_teams(self, challenge_id: str) -> List[Dict]:
+        """Teams linked to a challenge by its page or by their own pages"""
+        team_ids = self._challenge_page_links.get(challenge_id, set()) | self._teams_by_team_pages.get(challenge_id, set())
+        return self._summaries(self.teams, team_ids)
+
+    def team_challenges(self, team_id: str) -> List[Dict]:
+        """Challenges linked to a team by its page or by the challenge pages"""
+        challenge_ids = self._team_page_links.get(team_id, set()) | self._challenges_by_challenge_pages.get(team_id, set())
+        return self._summaries(self.challenges, challenge_ids)
+
+    def member(self, name: str) -> Optional[Dict]:
+        """A member (case- and accent-insensitive name) and their teams"""
+        key = normalize(name)
+        if key not in self._member_names:
+            return None
+        return {
+            "name": self._member_names[key],
+            "teams": self._summaries(self.teams, self._member_teams[key]),
+        }
+
+    def search(self, query: str, limit: int = 20, kinds: Optional[Set[str]] = None) -> List[Dict]:
+        """
+        Teams, challenges and members whose name contains query, exact
+        matches first, then names starting with it, then shortest names
+        """
+        self.searches += 1
+        normalized = normalize(query)
+        matches = [entry for entry in self.names.search(query) if kinds is None or entry[0] in kinds]
+
+        def rank(entry: Entry):
+            name = self.names.name(entry)
+            return (name != normalized, not name.startswith(normalized), len(name), name)
+
+        results = []
+        for kind, key in sorted(matches, key=rank)[:limit]:
+            if kind == MEMBER:
+                results.append({"type": MEMBER, "name": self._member_names[key], "teams": sorted(self._member_teams[key])})
+            else:
+                record = self.teams[key] if kind == TEAM else self.challenges[key]
+                results.append({"type": kind, "id": key, "name": record.get("name")})
+        return results
+
+    def stats(self) -> Dict:
+        return {
+            "teams": len(self.teams),
+            "challenges": len(self.challenges),
+            "members": len(self._member_names),
+            "names": len(self.names),
+            "updates": self.updates,
+            "update_ms": round(self.update_seconds * 1000, 3),
+            "searches": self.searches,
+        }
+
+    # Internals
+
+    def _timed(self, update, *args):
+        start = time.perf_counter()
+        update(*args)
+        self.update_seconds += time.perf_counter() - start
+        self.updates += 1
+
+    def _team_record(self, team_id: str) -> Dict:
+        record = self.teams.get(team_id)
+        if record is None:
+            record = self.teams[team_id] = {"id": team_id, "name": None, "members": None}
+        return record
+
+    def _challenge_record(self, challenge_id: str) -> Dict:
+        record = self.challenges.get(challenge_id)
+        if record is None:
+            record = self.challenges[challenge_id] = {"id": challenge_id, "name": None}
+        return record
+
+    def _set_team_name(self, team_id: str, name: Optional[str]):
+        record = self._team_record(team_id)
+        if name and record["name"] != name:
+            record["name"] = name
+            self.names.set((TEAM, team_id), name)
+
+    def _set_challenge_name(self, challenge_id: str, name: Optional[str]):
+        record = self._challenge_record(challenge_id)
+        if name and record["name"] != name:
+            record["name"] = name
+            self.names.set((CHALLENGE, challenge_id), name)
+
+    def _update_team(self, team_id: str, result: Dict):
+        self._set_team_name(team_id, result.get("name"))
+        record = self.teams[team_id]
+
+        members = [member for member in result.get("members", []) if member]
+        for member in record["members"] or []:
+            key = normalize(member)
+            teams = self._member_teams.get(key)
+            if teams is not None:
+                teams.discard(team_id)
+                if not teams:
+                    del self._member_teams[key]
+                    del self._member_names[key]
+                    self.names.remove((MEMBER, key))
+        for member in members:
+            key = normalize(member)
+            if key not in self._member_names:
+                self._member_names[key] = member
+                self.names.set((MEMBER, key), member)
+            self._member_teams[key].add(team_id)
+        record["members"] = members
+
+        challenge_ids = set()
+        for challenge in result.get("selectedchall", []):
+            if challenge.get("id"):
+                challenge_ids.add(challenge["id"])
+                self._set_challenge_name(challenge["id"], challenge.get("name"))
+        self._replace_links(team_id, challenge_ids, self._team_page_links, self._teams_by_team_pages)
+
+    def _update_challenges(self, challenges: Iterable[Dict]):
+        for challenge in challenges:
+            if not challenge.get("id"):
+                continue
+            self._set_challenge_name(challenge["id"], challenge.get("name"))
+            record = self.challenges[challenge["id"]]
+            for field in ("category", "thumbnail", "participants"):
+                if field in challenge:
+                    record[field] = challenge[field]
+
+    def _update_challenge(self, challenge_id: str, result: Dict):
+        self._set_challenge_name(challenge_id, result.get("name"))
+        record = self.challenges[challenge_id]
+        for field in ("organizer", "theme", "prize"):
+            if result.get(field) is not None:
+                record[field] = result[field]
+        self._set_challenge_teams(challenge_id, result.get("teams", []))
+
+    def _set_challenge_teams(self, challenge_id: str, teams: Iterable[Dict]):
+        self._challenge_record(challenge_id)
+        team_ids = set()
+        for team in teams:
+            if team.get("id"):
+                team_ids.add(team["id"])
+                self._set_team_name(team["id"], team.get("name"))
+        self._replace_links(challenge_id, team_ids, self._challenge_page_links, self._challenges_by_challenge_pages)
+
+    @staticmethod
+    def _replace_links(source: str, targets: Set[str], links: Dict[str, Set[str]], reverse: DefaultDict[str, Set[str]]):
+        for target in links.get(source, set()) - targets:
+            reverse[target].discard(source)
+            if not reverse[target]:
+                del reverse[target]
+        for target in targets:
+            reverse[target].add(source)
+        links[source] = targets
+
+    @staticmethod
+    def _summaries(records: Dict[str, Dict], ids: Iterable[str]) -> List[Dict]:
+        summaries = [{"id": record_id, "name": records[record_id]["name"]} for record_id in ids if record_id in records]
+        summaries.sort(key=lambda summary: (summary["name"] is None, summary["name"] or "", summary["id"]))
+        return summaries
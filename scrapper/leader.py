@@ -0,0 +1,101 @@
+"""
+Leader Election
+Picks one process among the API workers sharing a lock file to run the
+background work that must not be multiplied by the number of workers
+(the refresh scheduler)
+
+The leader holds an exclusive, non-blocking lock on the file for as long as
+it runs. The operating system releases the lock when the process exits, so
+another worker takes over at its next attempt even if the leader crashed.
+"""
+
+import asyncio
+import os
+import socket
+import logging
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+def process_id() -> str:
+    """Identifies this process among the workers: host:pid"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaderElection:
+    """Exclusive lock on path, retried every interval seconds until acquired"""
+
+    def __init__(self, path: str, interval: Optional[float] = None):
+        self.path = path
+        self.interval = interval if interval is not None else float(os.getenv('LEADER_RETRY_INTERVAL', 5))
+        self.is_leader = False
+        self._file = None
+        self._task: Optional[asyncio.Task] = None
+
+    def try_acquire(self) -> bool:
+        """Take the lock if no other process holds it"""
+        if self.is_leader:
+            return True
+        file = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            file.close()
+            return False
+
+        file.seek(0)
+        file.truncate()
+        file.write(process_id() + "\n")
+        file.flush()
+        self._file = file
+        self.is_leader = True
+        return True
+
+    def start(self, on_elected: Callable):
+        """Campaign in the background; on_elected (sync or async) runs once this process leads"""
+        self._task = asyncio.create_task(self._campaign(on_elected))
+
+    async def stop(self):
+        """Stop campaigning and give up the lock"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+        self.is_leader = False
+
+    def stats(self) -> Dict:
+        return {
+            "process": process_id(),
+            "leader": self.is_leader,
+            "lock_path": self.path,
+        }
+
+    async def _campaign(self, on_elected: Callable):
+        while not self.try_acquire():
+            await asyncio.sleep(self.interval)
+        logger.info(f"Process {process_id()} elected leader ({self.path})")
+        result = on_elected()
+        if asyncio.iscoroutine(result):
+            await result
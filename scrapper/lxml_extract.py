@@ -0,0 +1,605 @@
+"""
+Fast lxml Extraction Engine
+Extracts Nuit de l'Info pages with precompiled XPath expressions instead of
+BeautifulSoup trees. Every function returns exactly what the matching
+NuitDelInfoScraper.extract_* method returns with the bs4 engine.
+
+ChallengeListParser and ChallengeDetailsParser extract the two largest
+pages incrementally, from chunks of HTML fed while the page downloads.
+"""
+
+import re
+import time
+from lxml import etree
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import metrics
+
+
+def _has_class(cls: str) -> str:
+    """XPath predicate matching elements whose class list contains cls (like bs4 class_=cls)"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+# Precompiled expressions, named after the bs4 calls they replace
+_FIND_PANEL_INFO = etree.XPath(f"descendant::div[{_has_class('panel-info')}]")
+_FIND_PANEL_PANEL_INFO = etree.XPath("descendant::div[normalize-space(@class) = 'panel panel-info']")
+_FIND_PANEL_HEADING = etree.XPath(f"descendant::div[{_has_class('panel-heading')}]")
+_FIND_PANEL_BODY = etree.XPath(f"descendant::div[{_has_class('panel-body')}]")
+_FIND_LIST_GROUP_DIV = etree.XPath(f"descendant::div[{_has_class('list-group')}]")
+_FIND_LIST_GROUP_UL = etree.XPath(f"descendant::ul[{_has_class('list-group')}]")
+_FIND_LIST_GROUP_LINKS = etree.XPath(f"descendant::a[{_has_class('list-group-item')}]")
+_FIND_LIST_GROUP_ITEMS = etree.XPath(f"descendant::li[{_has_class('list-group-item')}]")
+_FIND_DEFI_LIST = etree.XPath(f"descendant::div[{_has_class('defiList')}]")
+_FIND_DEFIS = etree.XPath(f"descendant::div[{_has_class('defi')}]")
+_FIND_TITLE = etree.XPath(f"descendant::div[{_has_class('title')}]")
+_FIND_THUMBNAIL = etree.XPath(f"descendant::div[{_has_class('thumbnail')}]")
+_FIND_PARTICIPANTS = etree.XPath(f"descendant::div[{_has_class('participants')}]")
+_FIND_COUNT = etree.XPath(f"descendant::div[{_has_class('count')}]")
+_FIND_ALERT_INFO = etree.XPath(f"descendant::div[{_has_class('alert-info')}]")
+_FIND_ALERT_WARNING = etree.XPath(f"descendant::div[{_has_class('alert-warning')}]")
+_FIND_A = etree.XPath("descendant::a")
+_FIND_IMG = etree.XPath("descendant::img")
+_FIND_H1 = etree.XPath("descendant::h1")
+_FIND_H2 = etree.XPath("descendant::h2")
+_FIND_H4 = etree.XPath("descendant::h4")
+_FIND_P = etree.XPath("descendant::p")
+_FIND_SPAN = etree.XPath("descendant::span")
+_FIND_LI = etree.XPath("descendant::li")
+# bs4 find_next searches everything after the start tag, descendants included
+_FIND_NEXT_UL = etree.XPath("(descendant::ul | following::ul)[1]")
+_FIND_NEXT_P = etree.XPath("(descendant::p | following::p)[1]")
+
+# Tags whose strings bs4 keeps out of their ancestors' text
+_STRING_CONTAINERS = frozenset(("script", "style", "template", "rt", "rp"))
+
+_parser = etree.HTMLParser(recover=True)
+
+
+def parse(html: str) -> Optional[etree._Element]:
+    """Parse an HTML document, returning None for an empty one"""
+    start = time.perf_counter()
+    try:
+        return _parse(html)
+    finally:
+        metrics.observe_parse(time.perf_counter() - start)
+
+
+def _parse(html: str) -> Optional[etree._Element]:
+    try:
+        return etree.fromstring(html, _parser)
+    except ValueError:
+        # str input with an XML encoding declaration
+        return etree.fromstring(html.encode('utf-8'), etree.HTMLParser(recover=True, encoding='utf-8'))
+
+
+def _first(xpath: etree.XPath, element) -> Optional[etree._Element]:
+    if element is None:
+        return None
+    found = xpath(element)
+    return found[0] if found else None
+
+
+def _strings(element: etree._Element, root: bool = True) -> Iterator[str]:
+    """Text strings under element in document order, like bs4's Tag.strings"""
+    if not root and element.tag in _STRING_CONTAINERS:
+        return
+    if element.text:
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str):
+            yield from _strings(child, False)
+        if child.tail:
+            yield child.tail
+
+
+def _text(element: etree._Element) -> str:
+    """bs4 Tag.text"""
+    return ''.join(_strings(element))
+
+
+def _text_stripped(element: etree._Element) -> str:
+    """bs4 Tag.get_text(strip=True)"""
+    return ''.join(text.strip() for text in _strings(element) if text.strip())
+
+
+def _string(element: etree._Element) -> Optional[str]:
+    """bs4 Tag.string: the only string below element, or None"""
+    children = len(element) + sum(1 for child in element if child.tail)
+    if element.text:
+        children += 1
+    if children != 1:
+        return None
+    if element.text:
+        return element.text
+    child = element[0]
+    if isinstance(child.tag, str):
+        return _string(child)
+    # Comments and processing instructions are strings for bs4
+    return child.text
+
+
+def _find_h2_containing(element: etree._Element, text: str) -> Optional[etree._Element]:
+    for h2 in _FIND_H2(element):
+        string = _string(h2)
+        if string and text in string:
+            return h2
+    return None
+
+
+def _id_link(link: etree._Element) -> Dict:
+    href = link.get('href', '')
+    return {
+        "id": href.split('/')[-1] if href else None,
+        "name": _text(link).strip()
+    }
+
+
+def _id_links(list_group: etree._Element) -> List[Dict]:
+    return [_id_link(link) for link in _FIND_LIST_GROUP_LINKS(list_group)]
+
+
+def extract_teams(html: str) -> Dict:
+    """Extract the team list from a challenge page"""
+    root = parse(html)
+
+    panel = _first(_FIND_PANEL_INFO, root)
+    if panel is None:
+        return {"error": "Panel not found", "teams": []}
+
+    list_group = _first(_FIND_LIST_GROUP_DIV, panel)
+    if list_group is None:
+        return {"error": "List group not found", "teams": []}
+
+    teams = _id_links(list_group)
+    return {
+        "teams": teams,
+        "total": len(teams),
+        "status": "success"
+    }
+
+
+def extract_team_details(html: str, team_id: str) -> Dict:
+    """Extract members and selected challenges from a team page"""
+    root = parse(html)
+
+    panel = _first(_FIND_PANEL_PANEL_INFO, root)
+    if panel is None:
+        return {"error": "Panel not found", "team_id": team_id}
+
+    name = None
+    h1 = _first(_FIND_H1, _first(_FIND_PANEL_HEADING, panel))
+    if h1 is not None:
+        name = _text(h1).strip()
+
+    members = []
+    selected_challenges = []
+    panel_body = _first(_FIND_PANEL_BODY, panel)
+    if panel_body is not None:
+        member_list = _first(_FIND_LIST_GROUP_UL, panel_body)
+        if member_list is not None:
+            members = [_text(item).strip() for item in _FIND_LIST_GROUP_ITEMS(member_list)]
+
+        challenge_div = _first(_FIND_LIST_GROUP_DIV, panel_body)
+        if challenge_div is not None:
+            selected_challenges = _id_links(challenge_div)
+
+    return {
+        "name": name,
+        "members": members,
+        "selectedchall": selected_challenges,
+        "status": "success"
+    }
+
+
+def extract_challenges(html: str) -> Dict:
+    """Extract the challenge list from the challenge list page"""
+    root = parse(html)
+
+    defi_list = _first(_FIND_DEFI_LIST, root)
+    if defi_list is None:
+        return {"error": "Challenge list not found", "challenges": []}
+
+    challenges = [_challenge(defi) for defi in _FIND_DEFIS(defi_list)]
+    return {
+        "challenges": challenges,
+        "total": len(challenges),
+        "status": "success"
+    }
+
+
+def _challenge(defi: etree._Element) -> Dict:
+    """A challenge of the challenge list from its defi div"""
+    challenge = {}
+
+    title_div = _first(_FIND_TITLE, defi)
+    if title_div is not None:
+        link = _first(_FIND_A, title_div)
+        if link is not None:
+            link_text = _text(link).strip()
+            challenge['name'] = link_text
+            href = link.get('href', '')
+            challenge['id'] = href.split('/')[-1] if href else None
+
+        category_text = _text_stripped(title_div)
+        if link is not None:
+            category_text = category_text.replace(link_text, '').strip()
+        challenge['category'] = category_text if category_text else None
+
+    img = _first(_FIND_IMG, _first(_FIND_THUMBNAIL, defi))
+    if img is not None:
+        challenge['thumbnail'] = img.get('src', None)
+
+    count_div = _first(_FIND_COUNT, _first(_FIND_PARTICIPANTS, defi))
+    if count_div is not None:
+        try:
+            challenge['participants'] = int(_text(count_div).strip())
+        except ValueError:
+            challenge['participants'] = 0
+
+    return challenge
+
+
+def extract_challenge_details(html: str) -> Dict:
+    """Extract challenge details and participating teams from a challenge page"""
+    root = parse(html)
+    panels = _FIND_PANEL_INFO(root) if root is not None else []
+    challenge_data = _empty_challenge_details()
+
+    # First panel: logo
+    if len(panels) > 0:
+        _logo_panel(panels[0], challenge_data)
+
+    # Second panel: organizer name
+    if len(panels) > 1:
+        _organizer_panel(panels[1], challenge_data)
+
+    # Third panel: challenge details
+    if len(panels) > 2:
+        details_panel = panels[2]
+        _details_panel(details_panel, challenge_data)
+
+        expected_h2 = _find_h2_containing(details_panel, _EXPECTED_HEADING)
+        if expected_h2 is not None:
+            next_ul = _first(_FIND_NEXT_UL, expected_h2)
+            if next_ul is not None:
+                _expected_elements(next_ul, challenge_data)
+
+        submission_h2 = _find_h2_containing(details_panel, _SUBMISSION_HEADING)
+        if submission_h2 is not None:
+            next_p = _first(_FIND_NEXT_P, submission_h2)
+            if next_p is not None:
+                _submission_mode(next_p, challenge_data)
+
+    # Fourth panel: participating teams
+    if len(panels) > 3:
+        list_group = _first(_FIND_LIST_GROUP_DIV, panels[3])
+        if list_group is not None:
+            challenge_data['teams'] = _id_links(list_group)
+
+    return {
+        **challenge_data,
+        "status": "success"
+    }
+
+
+# Headings of the details panel followed by the expected elements list and the submission mode
+_EXPECTED_HEADING = 'Elements attendus'
+_SUBMISSION_HEADING = 'Mode de restitution'
+
+
+def _empty_challenge_details() -> Dict:
+    return {
+        "name": None,
+        "organizer": None,
+        "theme": None,
+        "prize": None,
+        "description": None,
+        "expectedElements": None,
+        "submissionMode": None,
+        "teams": []
+    }
+
+
+def _logo_panel(panel: etree._Element, challenge_data: Dict):
+    img = _first(_FIND_IMG, panel)
+    if img is not None:
+        challenge_data['logo'] = img.get('src', None)
+
+
+def _organizer_panel(panel: etree._Element, challenge_data: Dict):
+    organizer_span = _first(_FIND_SPAN, _first(_FIND_H1, panel))
+    if organizer_span is not None:
+        challenge_data['organizer'] = _text(organizer_span).strip()
+
+
+def _details_panel(details_panel: etree._Element, challenge_data: Dict):
+    """Name, theme, prize and description (the expected elements and submission mode follow headings)"""
+    h2 = _first(_FIND_H2, details_panel)
+    if h2 is not None:
+        name_text = _text(h2).strip()
+        if name_text.startswith("Le défi:"):
+            name_text = name_text.replace("Le défi:", "").strip()
+        challenge_data['name'] = name_text
+
+    theme_alert = _first(_FIND_ALERT_INFO, details_panel)
+    if theme_alert is not None:
+        theme_h4 = _FIND_H4(theme_alert)
+        if len(theme_h4) > 1:
+            challenge_data['theme'] = _text(theme_h4[1]).strip()
+
+    prize_alert = _first(_FIND_ALERT_WARNING, details_panel)
+    if prize_alert is not None:
+        prize_h4 = _FIND_H4(prize_alert)
+        if len(prize_h4) > 1:
+            challenge_data['prize'] = _text_stripped(prize_h4[1])
+
+    paragraph = _first(_FIND_P, details_panel)
+    if paragraph is not None:
+        challenge_data['description'] = _text_stripped(paragraph)
+
+
+def _expected_elements(ul: etree._Element, challenge_data: Dict):
+    challenge_data['expectedElements'] = [_text_stripped(li) for li in _FIND_LI(ul)]
+
+
+def _submission_mode(p: etree._Element, challenge_data: Dict):
+    challenge_data['submissionMode'] = _text_stripped(p)
+
+
+# Streaming extraction: pull parsers fed with chunks of a page as it downloads.
+# Entries are extracted with the functions above as soon as their element is
+# complete, then removed from the tree, so memory stays bounded by the page
+# chrome rather than the length of the list. Results match extract_challenges
+# and extract_challenge_details exactly.
+
+_CLASS_SEPARATOR = re.compile(r"[ \t\r\n]+")
+# Last opening tag of an element whose content is raw text
+_RAW_TEXT_START = re.compile(r"<(?:script|style)[\s>]", re.IGNORECASE)
+_RAW_TEXT_END = re.compile(r"</(?:script|style)", re.IGNORECASE)
+
+
+def _feedable(buffer: str) -> int:
+    """
+    Length of the start of buffer that can be fed to libxml2: up to the last
+    '>' outside a script or style element. The HTML push parser crashes or
+    builds a different tree when a chunk ends inside a tag or raw text.
+    """
+    end = buffer.rfind('>') + 1
+    last_start = None
+    for last_start in _RAW_TEXT_START.finditer(buffer, 0, end):
+        pass
+    if last_start is not None and not _RAW_TEXT_END.search(buffer, last_start.end(), end):
+        end = buffer.rfind('>', 0, last_start.start()) + 1
+    return end
+
+
+def _has_class_name(element: etree._Element, cls: str) -> bool:
+    """Python twin of the _has_class XPath predicate"""
+    classes = element.get('class')
+    return classes is not None and cls in classes and cls in _CLASS_SEPARATOR.split(classes)
+
+
+def _drop_processed(element: etree._Element):
+    """Empty element and remove its previous siblings (all complete and extracted)"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+class _StreamParser:
+    """
+    Incremental parser base: feed() text chunks, then close() returns the
+    extracted result
+
+    Subclasses handle the start / end events of tags.
+    """
+
+    tags: Tuple[str, ...] = ()
+
+    def __init__(self):
+        self._parser = etree.HTMLPullParser(events=("start", "end"), tag=self.tags, recover=True)
+        # Time spent in feed() and close(), and the part of it inside libxml2
+        self.elapsed = 0.0
+        self.parse_seconds = 0.0
+        # The result, once closed
+        self.extracted: Optional[Dict] = None
+        # Text after the last tag boundary, fed with the next chunk
+        self._unfed = ""
+
+    def feed(self, data: str):
+        if not data:
+            return
+        start = time.perf_counter()
+        data = self._unfed + data
+        end = _feedable(data)
+        self._unfed = data[end:]
+        if end:
+            self._parser.feed(data[:end])
+        parsed = time.perf_counter()
+        self._handle_events()
+        self.parse_seconds += parsed - start
+        self.elapsed += time.perf_counter() - start
+
+    def close(self) -> Dict:
+        start = time.perf_counter()
+        try:
+            if self._unfed:
+                self._parser.feed(self._unfed)
+                self._unfed = ""
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            # Empty document: nothing to extract from
+            pass
+        parsed = time.perf_counter()
+        self._handle_events()
+        self.extracted = self.result()
+        self.parse_seconds += parsed - start
+        self.elapsed += time.perf_counter() - start
+        return self.extracted
+
+    def _handle_events(self):
+        for event, element in self._parser.read_events():
+            if event == "start":
+                self.start(element)
+            else:
+                self.end(element)
+
+    def start(self, element: etree._Element):
+        pass
+
+    def end(self, element: etree._Element):
+        pass
+
+    def result(self) -> Dict:
+        raise NotImplementedError
+
+
+class ChallengeListParser(_StreamParser):
+    """Incremental extract_challenges: each defi is extracted when it closes"""
+
+    tags = ("div",)
+
+    def __init__(self):
+        super().__init__()
+        self._list: Optional[etree._Element] = None
+        self._list_closed = False
+        # defi divs open inside the list: nested ones are extracted with the outermost
+        self._open_defis = 0
+        self.challenges: List[Dict] = []
+
+    def start(self, element: etree._Element):
+        if self._list is None:
+            if _has_class_name(element, 'defiList'):
+                self._list = element
+        elif not self._list_closed and _has_class_name(element, 'defi'):
+            self._open_defis += 1
+
+    def end(self, element: etree._Element):
+        if self._list is None or self._list_closed:
+            return
+        if element is self._list:
+            self._list_closed = True
+        elif _has_class_name(element, 'defi'):
+            self._open_defis -= 1
+            if self._open_defis == 0:
+                self.challenges.extend(_challenge(defi) for defi in [element] + _FIND_DEFIS(element))
+                _drop_processed(element)
+
+    def result(self) -> Dict:
+        if self._list is None:
+            return {"error": "Challenge list not found", "challenges": []}
+        return {
+            "challenges": self.challenges,
+            "total": len(self.challenges),
+            "status": "success"
+        }
+
+
+class ChallengeDetailsParser(_StreamParser):
+    """
+    Incremental extract_challenge_details: the first three panels are
+    extracted when they close, team links one by one
+
+    The expected elements list and submission mode are the first ul / p
+    after their heading, which may come after the details panel: when the
+    panel holds none, the next ul / p to open is used once it closes.
+    """
+
+    tags = ("div", "a", "ul", "p")
+
+    def __init__(self):
+        super().__init__()
+        self.challenge_data = _empty_challenge_details()
+        self._panels = 0
+        # Index of each open panel-info div
+        self._open_panels: Dict[etree._Element, int] = {}
+        self._teams_panel: Optional[etree._Element] = None
+        self._team_list: Optional[etree._Element] = None
+        self._team_list_closed = False
+        # Team links in document order; open ones wait for their end tag
+        self._teams: List[Optional[Dict]] = []
+        self._open_links: List[Tuple[etree._Element, int]] = []
+        # tag -> apply(element) waiting for the next element of that tag
+        self._pending: Dict[str, Callable] = {}
+        self._candidates: Dict[str, etree._Element] = {}
+
+    def start(self, element: etree._Element):
+        tag = element.tag
+        if tag in self._pending and tag not in self._candidates:
+            self._candidates[tag] = element
+        if tag == "div":
+            if _has_class_name(element, 'panel-info'):
+                self._open_panels[element] = self._panels
+                if self._panels == 3:
+                    self._teams_panel = element
+                self._panels += 1
+            if (
+                self._team_list is None and self._teams_panel is not None
+                and self._teams_panel in self._open_panels and _has_class_name(element, 'list-group')
+            ):
+                self._team_list = element
+        elif tag == "a" and self._team_list is not None and not self._team_list_closed:
+            if _has_class_name(element, 'list-group-item'):
+                self._open_links.append((element, len(self._teams)))
+                self._teams.append(None)
+
+    def end(self, element: etree._Element):
+        tag = element.tag
+        if self._candidates.get(tag) is element:
+            del self._candidates[tag]
+            self._pending.pop(tag)(element)
+        if tag == "div":
+            index = self._open_panels.pop(element, None)
+            if index is not None and index < 3:
+                self._end_panel(index, element)
+            if element is self._team_list:
+                self._team_list_closed = True
+        elif tag == "a" and self._open_links and self._open_links[-1][0] is element:
+            _, slot = self._open_links.pop()
+            self._teams[slot] = _id_link(element)
+            # Keep links while an earlier panel or a pending ul / p may still look at them
+            if not self._open_links and not self._candidates and not any(i < 3 for i in self._open_panels.values()):
+                _drop_processed(element)
+
+    def _end_panel(self, index: int, panel: etree._Element):
+        data = self.challenge_data
+        if index == 0:
+            _logo_panel(panel, data)
+        elif index == 1:
+            _organizer_panel(panel, data)
+        else:
+            _details_panel(panel, data)
+            self._follow_heading(panel, _EXPECTED_HEADING, _FIND_NEXT_UL, "ul", _expected_elements)
+            self._follow_heading(panel, _SUBMISSION_HEADING, _FIND_NEXT_P, "p", _submission_mode)
+
+    def _follow_heading(self, panel: etree._Element, heading: str, find_next: etree.XPath, tag: str, apply: Callable):
+        h2 = _find_h2_containing(panel, heading)
+        if h2 is None:
+            return
+        # The tree may already hold part of what follows the panel: only trust matches inside it
+        found = _first(find_next, h2)
+        if found is not None and any(ancestor is panel for ancestor in found.iterancestors()):
+            apply(found, self.challenge_data)
+        else:
+            self._pending[tag] = lambda element: apply(element, self.challenge_data)
+
+    def result(self) -> Dict:
+        if self._team_list is not None:
+            self.challenge_data['teams'] = [team for team in self._teams if team is not None]
+        return {
+            **self.challenge_data,
+            "status": "success"
+        }
+
+
+def stream_extract(parser: _StreamParser, html: str, chunk_size: int = 16384) -> Dict:
+    """Run a streaming parser over a whole page, chunk_size characters at a time"""
+    try:
+        for offset in range(0, len(html), chunk_size):
+            parser.feed(html[offset:offset + chunk_size])
+        return parser.close()
+    finally:
+        metrics.observe_parse(parser.parse_seconds)
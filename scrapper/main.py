@@ -3,14 +3,35 @@ FastAPI REST API Server for Web Scraping
 Provides endpoints to scrape various websites
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
 import logging
+import math
+import secrets
+import time
 from dotenv import load_dotenv
 import os
 
-from scrapers import NuitDelInfoScraper
+from cache import ResponseCache
+from changes import CHALLENGE_LIST, CHALLENGE_PAGE, TEAM_LIST, TEAM_PAGE, ChangeLog
+from extraction_pool import extraction_pool
+from history import History, resolve_range
+from index import CHALLENGE, MEMBER, TEAM, DataIndex
+from leader import LeaderElection, process_id
+from metrics import HTTP_SERIALIZE_SECONDS, MetricsMiddleware, record_timing, registry
+from profiler import ProfilerMiddleware, profiler
+from resilience import BREAKER_STATES, PERCENTILES, upstream_guard
+from scheduler import RefreshScheduler
+from scraper_base import PRIORITY_BULK, fetch_priority, http_client, page_states, upstream_limiter
+from scrapers import NuitDelInfoScraper, CHALLENGES_URL, team_url, challenge_url
+from serialization import BodyCache, EncodedBody, dumps, negotiate
+from snapshot import Snapshot, SnapshotStore, open_snapshot_database
 
 # Load environment variables
 load_dotenv()
@@ -19,11 +40,637 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# URL of the principal challenge page
+PRINCIPAL_CHALLENGE_URL = challenge_url("174")
+
+# The principal challenge page is also served by /challenge/174, so its
+# team list needs its own cache / snapshot key
+PRINCIPAL_TEAMS_KEY = f"teams:{PRINCIPAL_CHALLENGE_URL}"
+
+# Cache TTLs per endpoint (seconds)
+CACHE_TTL_TEAMS = float(os.getenv("CACHE_TTL_TEAMS", 15))
+CACHE_TTL_TEAM = float(os.getenv("CACHE_TTL_TEAM", 60))
+CACHE_TTL_CHALLENGES = float(os.getenv("CACHE_TTL_CHALLENGES", 30))
+CACHE_TTL_CHALLENGE = float(os.getenv("CACHE_TTL_CHALLENGE", 60))
+
+# Past its TTL, the last good result is still served (and refreshed in the
+# background) until it is this old (seconds), including while upstream fails
+CACHE_HARD_TTL = float(os.getenv("CACHE_HARD_TTL", 3600))
+
+# Cache-Control header per endpoint
+CACHE_CONTROL_TEAMS = os.getenv("CACHE_CONTROL_TEAMS", "public, max-age=5")
+CACHE_CONTROL_TEAM = os.getenv("CACHE_CONTROL_TEAM", "public, max-age=30")
+CACHE_CONTROL_CHALLENGES = os.getenv("CACHE_CONTROL_CHALLENGES", "public, max-age=30")
+CACHE_CONTROL_CHALLENGE = os.getenv("CACHE_CONTROL_CHALLENGE", "public, max-age=60")
+CACHE_CONTROL_INDEX = os.getenv("CACHE_CONTROL_INDEX", "public, max-age=5")
+
+# Response bodies of at least this many bytes are compressed for clients
+# sending Accept-Encoding: gzip (or br, when brotli is installed)
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", 1024))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", 6))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", 5))
+
+# Search results per /search request
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", 100))
+
+# Changes per /changes response, and seconds between keep-alive comments on /changes/stream
+CHANGES_PAGE_SIZE = int(os.getenv("CHANGES_PAGE_SIZE", 500))
+CHANGES_HEARTBEAT = float(os.getenv("CHANGES_HEARTBEAT", 15))
+
+# /history: default time range (seconds before end), buckets and series per response
+HISTORY_DEFAULT_SPAN = float(os.getenv("HISTORY_DEFAULT_SPAN", 86400))
+HISTORY_DEFAULT_POINTS = int(os.getenv("HISTORY_DEFAULT_POINTS", 120))
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", 1000))
+HISTORY_MAX_SERIES = int(os.getenv("HISTORY_MAX_SERIES", 1000))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", 5))
+HISTORY_COMPACT_INTERVAL = float(os.getenv("HISTORY_COMPACT_INTERVAL", 3600))
+CACHE_CONTROL_HISTORY = os.getenv("CACHE_CONTROL_HISTORY", "public, max-age=10")
+
+# Bulk team details
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 10))
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", 500))
+
+# Background refresh intervals per resource (seconds)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "True").lower() == "true"
+REFRESH_INTERVAL_TEAMS = float(os.getenv("REFRESH_INTERVAL_TEAMS", 30))
+REFRESH_INTERVAL_TEAM = float(os.getenv("REFRESH_INTERVAL_TEAM", 300))
+REFRESH_INTERVAL_CHALLENGES = float(os.getenv("REFRESH_INTERVAL_CHALLENGES", 60))
+REFRESH_INTERVAL_CHALLENGE = float(os.getenv("REFRESH_INTERVAL_CHALLENGE", 600))
+
+# Background snapshots older than this are stale: they are served while the
+# resource is scraped on demand in the background
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", 900))
+
+# Worker processes started by `python main.py`. With more than one, the
+# workers share scrape results through the snapshot database: one of them
+# (the leader) runs the background refreshes, and a page missing from the
+# database is fetched by a single worker while the others wait for its result
+WORKERS = max(1, int(os.getenv("WORKERS", 1)))
+MULTI_WORKER = WORKERS > 1
+LEADER_LOCK_PATH = os.getenv("LEADER_LOCK_PATH", "snapshots.db.lock")
+SNAPSHOT_SYNC_INTERVAL = float(os.getenv("SNAPSHOT_SYNC_INTERVAL", 1))
+SHARED_FETCH_LEASE = float(os.getenv("SHARED_FETCH_LEASE", 30))
+SHARED_FETCH_FAILURE_TTL = float(os.getenv("SHARED_FETCH_FAILURE_TTL", 5))
+
+# Token required by the /admin endpoints; they are disabled when empty
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Materialized results kept fresh by the background scheduler, saved to
+# SNAPSHOT_DB_PATH together with on-demand results so restarts start warm
+snapshots = SnapshotStore(open_snapshot_database(), max_age=SNAPSHOT_MAX_AGE)
+scheduler = RefreshScheduler(snapshots)
+leader = LeaderElection(LEADER_LOCK_PATH)
+
+# Shared cache of on-demand scrape results, keyed by upstream URL
+cache = ResponseCache(sizeof=lambda snapshot: snapshot.size)
+
+# Encoded /teams-principal, /team, /challenges and /challenge bodies, per scrape result
+response_bodies = BodyCache()
+
+# Teams, challenges and members indexed from every stored scrape result
+data_index = DataIndex()
+
+# Added / removed / modified teams and challenges, diffed from every scrape result
+change_log = ChangeLog(snapshots.database)
+
+# Participants per challenge, members per team and number of teams over time
+history = History()
+
+# Counters and gauges of the shared components, read when /metrics is scraped
+registry.counter(
+    "podium_cache_lookups_total", "Response cache lookups by result", ("result",),
+    lambda: {"hit": cache.hits, "stale": cache.stale_hits, "miss": cache.misses, "coalesced": cache.coalesced}
+)
+registry.gauge("podium_cache_entries", "Entries in the response cache", function=lambda: len(cache))
+registry.gauge("podium_cache_bytes", "Approximate size of the response cache", function=lambda: cache.bytes)
+registry.gauge("podium_upstream_in_flight", "Upstream requests in flight", function=lambda: upstream_limiter.in_flight)
+registry.gauge("podium_upstream_waiting", "Upstream requests waiting for the rate limiter", function=lambda: upstream_limiter.waiting)
+registry.counter("podium_upstream_requests_total", "Upstream HTTP requests sent", function=lambda: http_client.requests)
+registry.counter(
+    "podium_upstream_connections_total", "Upstream connections acquired from the pool", ("result",),
+    lambda: {"created": http_client.connections_created, "reused": http_client.connections_reused}
+)
+registry.counter("podium_upstream_throttled_total", "Upstream 429 responses", function=lambda: upstream_limiter.throttled)
+registry.counter(
+    "podium_upstream_hedges_total", "Hedged upstream requests by outcome", ("result",),
+    lambda: {"sent": upstream_guard.hedges, "won": upstream_guard.hedge_wins, "denied": upstream_guard.hedges_denied}
+)
+registry.gauge(
+    "podium_upstream_latency_seconds", "Percentiles of recent successful upstream requests per host", ("host", "quantile"),
+    lambda: {
+        (host, str(p / 100)): state.latency.percentile(p)
+        for host, state in upstream_guard.hosts().items() if len(state.latency) for p in PERCENTILES
+    }
+)
+registry.gauge(
+    "podium_upstream_breaker_state", "Circuit breaker state per host (0 closed, 1 half open, 2 open)", ("host",),
+    lambda: {host: BREAKER_STATES[state.breaker.state] for host, state in upstream_guard.hosts().items()}
+)
+registry.counter(
+    "podium_upstream_breaker_rejections_total", "Upstream fetches failed fast by an open circuit breaker", ("host",),
+    lambda: {host: state.breaker.rejected for host, state in upstream_guard.hosts().items()}
+)
+registry.counter(
+    "podium_conditional_fetch_total", "Fetches of already-seen pages by outcome", ("result",),
+    lambda: {"not_modified": page_states.not_modified, "unchanged": page_states.unchanged_bodies, "parsed": page_states.parsed}
+)
+registry.counter(
+    "podium_refreshes_total", "Background refreshes by outcome", ("result",),
+    lambda: {"ok": scheduler.refreshed, "failed": scheduler.failures}
+)
+registry.counter(
+    "podium_extractions_total", "Page extractions by where they ran", ("mode",),
+    lambda: {"inline": extraction_pool.inline, "pool": extraction_pool.offloaded}
+)
+registry.gauge("podium_extraction_pool_in_flight", "Extractions running or queued in the process pool", function=lambda: extraction_pool.in_flight)
+registry.counter(
+    "podium_response_bodies_total", "Encoded response body lookups by result", ("result",),
+    lambda: {"hit": response_bodies.hits, "miss": response_bodies.misses}
+)
+registry.gauge("podium_snapshots", "Stored snapshots", function=lambda: len(snapshots))
+registry.gauge("podium_leader", "1 when this worker runs the background refreshes", function=lambda: int(leader.is_leader or not MULTI_WORKER))
+
+# Time from startup to the first data response, reported by /startup/stats
+startup = {"started": None, "restored": 0, "first_response_ms": None, "first_response_path": None}
+
+
+def is_cacheable(snapshot: Snapshot) -> bool:
+    """Only successful scrape results are cached"""
+    return not snapshot.is_error()
+
+
+async def load_resource(key: str, scrape: Callable[[], Awaitable[Dict]], ttl: float) -> Snapshot:
+    """
+    Return the background (or restored) snapshot for key, otherwise scrape
+    it (or reuse a cached / in-flight scrape)
+    
+    Results past their TTL are stale-while-revalidate: they are returned
+    right away, marked stale, while the resource is scraped again in the
+    background. A failed scrape leaves the last good result in place, so it
+    keeps being served until it is CACHE_HARD_TTL old.
+    """
+    async def load() -> Snapshot:
+        if shared_fetch:
+            return await load_shared(key, scrape, ttl)
+        snapshot = Snapshot(await scrape(), max_age=ttl)
+        if is_cacheable(snapshot):
+            snapshots.persist(key, snapshot)
+        return snapshot
+    
+    shared_fetch = MULTI_WORKER and snapshots.database is not None
+
+    snapshot = snapshots.get(key)
+    if snapshot is not None and snapshot.age() <= CACHE_HARD_TTL:
+        if snapshot.is_stale():
+            cache.refresh(key, load, ttl=ttl, cacheable=is_cacheable, hard_ttl=CACHE_HARD_TTL)
+        return snapshot
+    
+    return await cache.get_or_load(key, load, ttl=ttl, cacheable=is_cacheable, hard_ttl=CACHE_HARD_TTL)
+
+
+async def load_shared(key: str, scrape: Callable[[], Awaitable[Dict]], ttl: float) -> Snapshot:
+    """
+    Scrape key once for all worker processes
+    
+    A result another worker saved less than ttl ago is returned as is.
+    Otherwise the worker that takes the lease on key scrapes it, and the
+    others poll the database for its result; they scrape the page themselves
+    if it has not appeared when the lease expires. A failed scrape is
+    returned to the waiters, and to every worker asking for key during the
+    next SHARED_FETCH_FAILURE_TTL seconds, instead of being retried by each.
+    """
+    database = snapshots.database
+    owner = process_id()
+    deadline = time.monotonic() + SHARED_FETCH_LEASE
+    while True:
+        saved = await snapshots.saved(key)
+        if saved is not None and saved.age() <= ttl:
+            return saved.with_max_age(ttl)
+        if await database.run(database.try_lease, key, owner, SHARED_FETCH_LEASE) or time.monotonic() >= deadline:
+            break
+        failure = await database.run(database.lease_failure, key)
+        if failure is not None:
+            return Snapshot(failure, max_age=ttl)
+        await asyncio.sleep(0.05)
+    
+    try:
+        snapshot = Snapshot(await scrape(), max_age=ttl)
+    except Exception as e:
+        database.submit(database.fail_lease, key, owner, {"error": str(e)}, SHARED_FETCH_FAILURE_TTL)
+        raise
+    except BaseException:
+        # Cancelled: another worker can take over right away
+        database.submit(database.release_lease, key, owner)
+        raise
+    if is_cacheable(snapshot):
+        snapshots.persist(key, snapshot)
+        # Queued after the save of the result, so waiters find it when the lease is gone
+        database.submit(database.release_lease, key, owner)
+    else:
+        # Waiters, and the workers asking for key for a while, get this failure instead of scraping
+        database.submit(database.fail_lease, key, owner, snapshot.value, SHARED_FETCH_FAILURE_TTL)
+    return snapshot
+
+
+async def sync_snapshots():
+    """Pick up the results saved by the other workers every SNAPSHOT_SYNC_INTERVAL seconds"""
+    while True:
+        await asyncio.sleep(SNAPSHOT_SYNC_INTERVAL)
+        try:
+            await snapshots.sync()
+        except Exception as e:
+            logger.error(f"Snapshot sync failed: {e}")
+
+
+async def start_refreshes():
+    schedule_refreshes()
+    await scheduler.start()
+
+
+async def load_teams() -> Snapshot:
+    """Load the principal challenge team list"""
+    return await load_resource(
+        PRINCIPAL_TEAMS_KEY,
+        lambda: NuitDelInfoScraper().scrape_teams_async(PRINCIPAL_CHALLENGE_URL),
+        CACHE_TTL_TEAMS
+    )
+
+
+async def load_team_details(team_id: str) -> Snapshot:
+    """Load a team page"""
+    return await load_resource(
+        team_url(team_id),
+        lambda: NuitDelInfoScraper().scrape_team_details_async(team_id),
+        CACHE_TTL_TEAM
+    )
+
+
+async def load_challenges() -> Snapshot:
+    """Load the challenge list"""
+    return await load_resource(
+        CHALLENGES_URL,
+        lambda: NuitDelInfoScraper().scrape_challenges_async(),
+        CACHE_TTL_CHALLENGES
+    )
+
+
+async def load_challenge_details(challenge_id: str) -> Snapshot:
+    """Load a challenge page"""
+    return await load_resource(
+        challenge_url(challenge_id),
+        lambda: NuitDelInfoScraper().scrape_challenge_details_async(challenge_id),
+        CACHE_TTL_CHALLENGE
+    )
+
+
+def resource_kind(key: str) -> Optional[Tuple[str, Optional[str]]]:
+    """(kind, entity ID) of the page behind a snapshot key, see changes.RESOURCE_KINDS"""
+    if key == PRINCIPAL_TEAMS_KEY:
+        return TEAM_LIST, PRINCIPAL_CHALLENGE_URL.rsplit("/", 1)[-1]
+    if key == CHALLENGES_URL:
+        return CHALLENGE_LIST, None
+    if key.startswith(team_url("")):
+        return TEAM_PAGE, key[len(team_url("")):]
+    if key.startswith(challenge_url("")):
+        return CHALLENGE_PAGE, key[len(challenge_url("")):]
+    return None
+
+
+def on_snapshot(key: str, snapshot: Snapshot, origin: str):
+    """Add a stored scrape result to data_index and diff it into change_log"""
+    response_bodies.invalidate(key)
+    result = snapshot.value
+    kind = resource_kind(key)
+    if "error" in result or kind is None:
+        return
+    kind, entity_id = kind
+    
+    if kind == TEAM_LIST:
+        data_index.update_team_list(entity_id, result.get("teams", []))
+    elif kind == CHALLENGE_LIST:
+        data_index.update_challenges(result.get("challenges", []))
+    elif kind == TEAM_PAGE:
+        data_index.update_team(entity_id, result)
+    else:
+        data_index.update_challenge(entity_id, result)
+    
+    # Results from the database were logged by the process that scraped them
+    change_log.observe(key, kind, entity_id, result, record=origin in ("put", "persist"))
+    if origin != "restore":
+        record_history(kind, entity_id, result, snapshot.fetched_at, persist=origin in ("put", "persist"))
+
+
+def record_history(kind: str, entity_id: Optional[str], result: Dict, fetched_at: float, persist: bool):
+    """Record the tracked values of a scrape result in history (see /history)"""
+    if kind == TEAM_LIST:
+        history.record("event:teams", fetched_at, len(result.get("teams", [])), persist)
+    elif kind == CHALLENGE_LIST:
+        for challenge in result.get("challenges", []):
+            if challenge.get("id") and isinstance(challenge.get("participants"), int):
+                history.record(f"challenge:{challenge['id']}:participants", fetched_at, challenge["participants"], persist)
+    elif kind == TEAM_PAGE:
+        history.record(f"team:{entity_id}:members", fetched_at, len(result.get("members", [])), persist)
+
+
+def history_label(name: str) -> Optional[str]:
+    """Name of the team / challenge a history series is about"""
+    kind, _, rest = name.partition(":")
+    entity_id = rest.partition(":")[0]
+    if kind == "team":
+        record = data_index.team(entity_id)
+    elif kind == "challenge":
+        record = data_index.challenge(entity_id)
+    else:
+        return None
+    return record["name"] if record else None
+
+
+async def flush_history():
+    """
+    Append the recorded history points to disk every HISTORY_FLUSH_INTERVAL
+    seconds, and drop the points older than HISTORY_RETENTION every
+    HISTORY_COMPACT_INTERVAL seconds
+    """
+    compacted_at = None
+    while True:
+        await asyncio.sleep(HISTORY_FLUSH_INTERVAL)
+        await history.flush()
+        # With several workers, the one running the refreshes compacts the shared segment
+        if (leader.is_leader or not MULTI_WORKER) and (compacted_at is None or time.monotonic() - compacted_at >= HISTORY_COMPACT_INTERVAL):
+            compacted_at = time.monotonic()
+            await history.compact()
+
+
+snapshots.add_listener(on_snapshot)
+
+
+def schedule_refreshes():
+    """
+    Register the list pages with the background scheduler; each successful
+    list refresh registers the team and challenge pages it links to
+    """
+    scheduler.add(
+        PRINCIPAL_TEAMS_KEY,
+        lambda: NuitDelInfoScraper().scrape_teams_async(PRINCIPAL_CHALLENGE_URL),
+        REFRESH_INTERVAL_TEAMS,
+        on_success=schedule_team_refreshes
+    )
+    scheduler.add(
+        CHALLENGES_URL,
+        lambda: NuitDelInfoScraper().scrape_challenges_async(),
+        REFRESH_INTERVAL_CHALLENGES,
+        on_success=schedule_challenge_refreshes
+    )
+
+
+def schedule_team_refreshes(result: Dict):
+    """Register every team of the principal challenge for background refresh"""
+    for team in result.get("teams", []):
+        if team.get("id"):
+            scheduler.add(
+                team_url(team["id"]),
+                lambda team_id=team["id"]: NuitDelInfoScraper().scrape_team_details_async(team_id),
+                REFRESH_INTERVAL_TEAM
+            )
+
+
+def schedule_challenge_refreshes(result: Dict):
+    """Register every challenge for background refresh"""
+    for challenge in result.get("challenges", []):
+        if challenge.get("id"):
+            scheduler.add(
+                challenge_url(challenge["id"]),
+                lambda challenge_id=challenge["id"]: NuitDelInfoScraper().scrape_challenge_details_async(challenge_id),
+                REFRESH_INTERVAL_CHALLENGE
+            )
+
+
+def etag_matches(if_none_match: Optional[str], etags: List[str]) -> bool:
+    """Whether an If-None-Match header matches one of etags (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") in etags for tag in candidates)
+
+
+def encode_body(request: Request, payload: Dict) -> EncodedBody:
+    """Serialize payload, timing it for the metrics and Server-Timing"""
+    start = time.perf_counter()
+    body = EncodedBody(dumps(payload))
+    elapsed = time.perf_counter() - start
+    HTTP_SERIALIZE_SECONDS.observe(elapsed, request.scope["route"].path if "route" in request.scope else request.url.path)
+    record_timing("serialize", elapsed)
+    return body
+
+
+def json_response(request: Request, payload: Dict, cache_control: str, snapshot: Optional[Snapshot] = None) -> Response:
+    """
+    Serialize payload with a strong ETag computed from the body
+    
+    Answers 304 Not Modified without a body when the client's If-None-Match
+    already holds that ETag.
+    """
+    return encoded_response(request, encode_body(request, payload), cache_control, snapshot)
+
+
+def snapshot_response(
+    request: Request,
+    key: str,
+    snapshot: Snapshot,
+    build: Callable[[Dict], Dict],
+    cache_control: str
+) -> Response:
+    """
+    Like json_response for the payload build(snapshot.value), but the body
+    is encoded once per scrape result of key and reused until it changes
+    """
+    body = response_bodies.get(key, snapshot.data)
+    if body is None:
+        body = encode_body(request, build(snapshot.value))
+        response_bodies.put(key, snapshot.data, body)
+    return encoded_response(request, body, cache_control, snapshot)
+
+
+def encoded_response(request: Request, body: EncodedBody, cache_control: str, snapshot: Optional[Snapshot] = None) -> Response:
+    """
+    Send body, compressed when the client accepts it, or 304 Not Modified
+    when its If-None-Match holds the ETag of any variant of body
+    """
+    encoding = None
+    if body.compressible(RESPONSE_COMPRESS_MIN_BYTES):
+        encoding = negotiate(request.headers.get("accept-encoding"))
+    start = time.perf_counter()
+    content, etag = body.variant(encoding, RESPONSE_GZIP_LEVEL, RESPONSE_BROTLI_QUALITY)
+    if encoding is not None:
+        record_timing("compress", time.perf_counter() - start)
+    
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if snapshot is not None:
+        headers.update(snapshot.headers())
+    if startup["first_response_ms"] is None:
+        record_first_response(request)
+    
+    if etag_matches(request.headers.get("if-none-match"), body.etags()):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content, media_type="application/json", headers=headers)
+
+
+def record_first_response(request: Request):
+    """Remember how long after startup the first data response was served"""
+    if startup["started"] is None:
+        return
+    startup["first_response_ms"] = round((time.monotonic() - startup["started"]) * 1000, 3)
+    startup["first_response_path"] = request.url.path
+    logger.info(f"First response ({request.url.path}) served {startup['first_response_ms']} ms after startup")
+
+
+def teams_response(result: Dict) -> Dict:
+    """Shape a scrape_teams result for API responses"""
+    return {"teams": result.get("teams", [])}
+
+
+def challenges_response(result: Dict) -> Dict:
+    """Shape a scrape_challenges result for API responses"""
+    return {"challenges": result.get("challenges", [])}
+
+
+def team_details_response(result: Dict) -> Dict:
+    """Shape a scrape_team_details result for API responses"""
+    return {
+        "members": result.get("members", []),
+        "selectedchall": result.get("selectedchall", []),
+        "name": result.get("name", "")
+    }
+
+
+async def load_team_details_safe(team_id: str) -> Dict:
+    """Like load_team_details, but unexpected exceptions become an error result"""
+    try:
+        return (await load_team_details(team_id)).value
+    except Exception as e:
+        logger.error(f"Error scraping team {team_id}: {e}")
+        return {"error": str(e), "team_id": team_id}
+
+
+async def load_team_details_batch(team_ids: List[str]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+    """
+    Scrape several team pages concurrently (at most BATCH_CONCURRENCY at once)
+    
+    Returns (details by team ID, error message by team ID) so that one
+    failing team does not fail the whole batch
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    details: Dict[str, Dict] = {}
+    errors: Dict[str, str] = {}
+    
+    async def load_one(team_id: str):
+        fetch_priority.set(PRIORITY_BULK)
+        async with semaphore:
+            result = await load_team_details_safe(team_id)
+        if "error" in result:
+            errors[team_id] = result["error"]
+        else:
+            details[team_id] = team_details_response(result)
+    
+    await asyncio.gather(*(load_one(team_id) for team_id in team_ids))
+    return details, errors
+
+
+async def stream_team_details(team_ids: List[str]) -> AsyncIterator[str]:
+    """
+    Scrape several team pages and yield one NDJSON line per team as soon as
+    its page is parsed, in completion order
+    
+    At most BATCH_CONCURRENCY pages are fetched at once, and finished
+    results wait in a queue of the same size: when the client reads slowly
+    the queue fills up and workers stop starting new fetches until it drains.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=BATCH_CONCURRENCY)
+    pending_ids = iter(team_ids)
+    
+    async def worker():
+        fetch_priority.set(PRIORITY_BULK)
+        # Workers share the iterator, so each ID is fetched exactly once
+        for team_id in pending_ids:
+            # Every ID gets a line, or the response would wait for it forever
+            try:
+                result = await load_team_details_safe(team_id)
+                if "error" in result:
+                    line = {"id": team_id, "error": result["error"]}
+                else:
+                    line = {"id": team_id, **team_details_response(result)}
+            except Exception as e:
+                logger.error(f"Error streaming team {team_id}: {e}")
+                line = {"id": team_id, "error": str(e)}
+            await queue.put(line)
+    
+    workers = [asyncio.create_task(worker()) for _ in range(min(BATCH_CONCURRENCY, len(team_ids)))]
+    try:
+        for _ in range(len(team_ids)):
+            line = await queue.get()
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    finally:
+        # Stop fetching if the client went away before the end
+        for task in workers:
+            task.cancel()
+
+
+class TeamBatchRequest(BaseModel):
+    """Body of POST /teams/batch"""
+    ids: List[str]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Restore saved snapshots, open the shared upstream connection pool and
+    run background refreshes for the lifetime of the app
+    
+    Restored snapshots are served right away; the search index and change
+    log are rebuilt from them in the background. With several workers,
+    only the elected leader runs the refreshes and every worker keeps
+    syncing the snapshots the others save.
+    """
+    startup["started"] = time.monotonic()
+    await history.load()
+    startup["restored"] = await snapshots.restore()
+    replay_task = asyncio.create_task(snapshots.replay())
+    await http_client.start()
+    await extraction_pool.start()
+    sync_task = None
+    history_task = asyncio.create_task(flush_history())
+    if MULTI_WORKER and snapshots.database is None:
+        logger.warning("WORKERS > 1 without SNAPSHOT_DB_PATH: every worker scrapes and refreshes on its own")
+    if MULTI_WORKER and snapshots.database is not None:
+        sync_task = asyncio.create_task(sync_snapshots())
+        if SCHEDULER_ENABLED:
+            leader.start(start_refreshes)
+    elif SCHEDULER_ENABLED:
+        await start_refreshes()
+    yield
+    replay_task.cancel()
+    if sync_task is not None:
+        sync_task.cancel()
+    history_task.cancel()
+    await history.flush()
+    await leader.stop()
+    await scheduler.stop()
+    await http_client.close()
+    await extraction_pool.stop()
+    if snapshots.database is not None:
+        snapshots.database.close()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Podium Web Scraper API",
     description="REST API for web scraping operations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -33,8 +680,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Age", "X-Snapshot-Time", "X-Stale", "Server-Timing"],
 )
 
+# Per-route latency histograms and the Server-Timing header
+app.add_middleware(MetricsMiddleware)
+
+# Marks requests sampled by the profiler (not installed when admin endpoints are disabled)
+if ADMIN_TOKEN:
+    app.add_middleware(ProfilerMiddleware, profiler=profiler)
+
 
 # API Endpoints
 @app.get("/")
@@ -48,34 +703,38 @@ async def root():
 
 
 @app.get("/teams-principal")
-async def get_teams_principal():
+async def get_teams_principal(request: Request, include: Optional[str] = None):
     """
     Scrape teams participating in the principal challenge
     
     Returns a JSON with the list of teams: {"teams": ["team1", "team2", ...]}
+    
+    With ?include=details every team also carries its members and selected
+    challenges, and teams whose page failed are listed in "errors":
+    {"teams": [{"id": "1", "name": "...", "members": [...], "selectedchall": [...]}, ...],
+     "errors": {"2": "Failed to fetch page"}}
     """
     try:
         logger.info("Fetching teams from Nuit de l'Info principal challenge")
         
-        # URL of the challenge page
-        url = "https://www.nuitdelinfo.com/inscription/defis/174"
-        
-        # Create scraper instance
-        scraper = NuitDelInfoScraper()
+        snapshot = await load_teams()
         
-        # Scrape teams
-        result = scraper.scrape_teams(url)
-        
-        if "error" in result:
+        if snapshot.is_error():
             raise HTTPException(
                 status_code=500,
-                detail=f"Failed to scrape teams: {result.get('error')}"
+                detail=f"Failed to scrape teams: {snapshot.data.get('error')}"
             )
         
-        logger.info(f"Successfully scraped {result.get('total', 0)} teams")
+        if include == "details":
+            teams = snapshot.value.get("teams", [])
+            details, errors = await load_team_details_batch([team["id"] for team in teams if team.get("id")])
+            return json_response(request, {
+                "teams": [{**team, **details.get(team["id"], {}), "name": team["name"]} for team in teams],
+                "errors": errors
+            }, CACHE_CONTROL_TEAMS, snapshot)
         
         # Return only the teams list as requested
-        return {"teams": result.get("teams", [])}
+        return snapshot_response(request, PRINCIPAL_TEAMS_KEY, snapshot, teams_response, CACHE_CONTROL_TEAMS)
         
     except Exception as e:
         logger.error(f"Error in /teams-principal endpoint: {e}")
@@ -86,7 +745,7 @@ async def get_teams_principal():
 
 
 @app.get("/team/{team_id}")
-async def get_team_details(team_id: str):
+async def get_team_details(team_id: str, request: Request):
     """
     Scrape details of a specific team
     
@@ -103,26 +762,16 @@ async def get_team_details(team_id: str):
     try:
         logger.info(f"Fetching team details for team ID: {team_id}")
         
-        # Create scraper instance
-        scraper = NuitDelInfoScraper()
-        
-        # Scrape team details
-        result = scraper.scrape_team_details(team_id)
+        snapshot = await load_team_details(team_id)
         
-        if "error" in result:
+        if snapshot.is_error():
             raise HTTPException(
                 status_code=404,
-                detail=f"Team not found or failed to scrape: {result.get('error')}"
+                detail=f"Team not found or failed to scrape: {snapshot.data.get('error')}"
             )
         
-        logger.info(f"Successfully scraped team {team_id}: {len(result.get('members', []))} members, {len(result.get('selectedchall', []))} challenges")
-        
         # Return team details
-        return {
-            "members": result.get("members", []),
-            "selectedchall": result.get("selectedchall", []),
-            "name": result.get("name", "")
-        }
+        return snapshot_response(request, team_url(team_id), snapshot, team_details_response, CACHE_CONTROL_TEAM)
         
     except HTTPException:
         raise
@@ -134,8 +783,72 @@ async def get_team_details(team_id: str):
         )
 
 
+@app.post("/teams/batch")
+async def get_teams_batch(request: TeamBatchRequest):
+    """
+    Scrape details of several teams in one request
+    
+    Body: {"ids": ["1", "2", ...]}
+    
+    Returns the details of every team that could be scraped, plus a
+    per-ID error for the ones that could not:
+    {
+        "teams": [{"id": "1", "name": "...", "members": [...], "selectedchall": [...]}, ...],
+        "errors": {"2": "Failed to fetch page"}
+    }
+    """
+    # Drop duplicates while keeping the requested order
+    team_ids = list(dict.fromkeys(request.ids))
+    if len(team_ids) > BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many team IDs: {len(team_ids)} (max {BATCH_MAX_IDS})"
+        )
+    
+    logger.info(f"Fetching team details for {len(team_ids)} teams")
+    details, errors = await load_team_details_batch(team_ids)
+    logger.info(f"Batch done: {len(details)} teams scraped, {len(errors)} failed")
+    
+    return {
+        "teams": [{"id": team_id, **details[team_id]} for team_id in team_ids if team_id in details],
+        "errors": errors
+    }
+
+
+@app.get("/teams/stream")
+async def stream_teams(ids: Optional[str] = None):
+    """
+    Stream details of several teams as NDJSON, one line per team in the
+    order their pages finish parsing
+    
+    ids is a comma-separated list of at most BATCH_MAX_IDS team IDs; when
+    omitted, every team of the principal challenge is streamed. Each line is either
+    {"id": "1", "name": "...", "members": [...], "selectedchall": [...]}
+    or {"id": "2", "error": "Failed to fetch page"}.
+    """
+    if ids:
+        # Drop duplicates while keeping the requested order
+        team_ids = list(dict.fromkeys(team_id.strip() for team_id in ids.split(",") if team_id.strip()))
+        if len(team_ids) > BATCH_MAX_IDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many team IDs: {len(team_ids)} (max {BATCH_MAX_IDS})"
+            )
+    else:
+        result = (await load_teams()).value
+        if "error" in result:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to scrape teams: {result.get('error')}"
+            )
+        team_ids = [team["id"] for team in result.get("teams", []) if team.get("id")]
+    
+    logger.info(f"Streaming team details for {len(team_ids)} teams")
+    return StreamingResponse(stream_team_details(team_ids), media_type="application/x-ndjson")
+
+
 @app.get("/challenges")
-async def get_challenges():
+async def get_challenges(request: Request):
     """
     Scrape all available challenges
     
@@ -156,22 +869,16 @@ async def get_challenges():
     try:
         logger.info("Fetching all challenges from Nuit de l'Info")
         
-        # Create scraper instance
-        scraper = NuitDelInfoScraper()
-        
-        # Scrape challenges
-        result = scraper.scrape_challenges()
+        snapshot = await load_challenges()
         
-        if "error" in result:
+        if snapshot.is_error():
             raise HTTPException(
                 status_code=500,
-                detail=f"Failed to scrape challenges: {result.get('error')}"
+                detail=f"Failed to scrape challenges: {snapshot.data.get('error')}"
             )
         
-        logger.info(f"Successfully scraped {result.get('total', 0)} challenges")
-        
         # Return challenges list
-        return {"challenges": result.get("challenges", [])}
+        return snapshot_response(request, CHALLENGES_URL, snapshot, challenges_response, CACHE_CONTROL_CHALLENGES)
         
     except HTTPException:
         raise
@@ -184,7 +891,7 @@ async def get_challenges():
 
 
 @app.get("/challenge/{challenge_id}")
-async def get_challenge_details(challenge_id: str):
+async def get_challenge_details(challenge_id: str, request: Request):
     """
     Scrape details of a specific challenge
     
@@ -193,22 +900,16 @@ async def get_challenge_details(challenge_id: str):
     try:
         logger.info(f"Fetching challenge details for challenge ID: {challenge_id}")
         
-        # Create scraper instance
-        scraper = NuitDelInfoScraper()
+        snapshot = await load_challenge_details(challenge_id)
         
-        # Scrape challenge details
-        result = scraper.scrape_challenge_details(challenge_id)
-        
-        if "error" in result:
+        if snapshot.is_error():
             raise HTTPException(
                 status_code=404,
-                detail=f"Challenge not found or failed to scrape: {result.get('error')}"
+                detail=f"Challenge not found or failed to scrape: {snapshot.data.get('error')}"
             )
         
-        logger.info(f"Successfully scraped challenge {challenge_id}")
-        
         # Return challenge details
-        return result
+        return snapshot_response(request, challenge_url(challenge_id), snapshot, lambda result: result, CACHE_CONTROL_CHALLENGE)
         
     except HTTPException:
         raise
@@ -220,17 +921,372 @@ async def get_challenge_details(challenge_id: str):
         )
 
 
+@app.get("/search")
+async def search(request: Request, q: str, type: Optional[str] = None, limit: int = 20):
+    """
+    Search teams, challenges and members by name (case- and accent-insensitive substring)
+    
+    ?type=team,challenge,member restricts the kinds of results. Answered
+    from the index of already scraped pages, without scraping:
+    {"query": "...", "results": [{"type": "team", "id": "1", "name": "..."},
+     {"type": "member", "name": "...", "teams": ["1"]}, ...]}
+    """
+    kinds = None
+    if type:
+        kinds = {kind.strip() for kind in type.split(",") if kind.strip()}
+        unknown = kinds - {TEAM, CHALLENGE, MEMBER}
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown result type: {', '.join(sorted(unknown))}")
+    
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+    results = data_index.search(q, limit, kinds)
+    return json_response(request, {"query": q, "results": results, "total": len(results)}, CACHE_CONTROL_INDEX)
+
+
+@app.get("/challenge/{challenge_id}/teams")
+async def get_challenge_teams(challenge_id: str, request: Request):
+    """
+    Teams participating in a challenge, from the index
+    
+    Includes teams listed on the challenge page and teams whose own page
+    lists the challenge. A challenge that is not indexed yet is scraped once.
+    """
+    if data_index.challenge(challenge_id) is None:
+        snapshot = await load_challenge_details(challenge_id)
+        if snapshot.is_error():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Challenge not found or failed to scrape: {snapshot.data.get('error')}"
+            )
+    
+    teams = data_index.challenge_teams(challenge_id)
+    return json_response(
+        request,
+        {"challenge": data_index.challenge(challenge_id), "teams": teams, "total": len(teams)},
+        CACHE_CONTROL_INDEX
+    )
+
+
+@app.get("/team/{team_id}/challenges")
+async def get_team_challenges(team_id: str, request: Request):
+    """Challenges a team takes part in, from the index"""
+    if data_index.team(team_id) is None:
+        raise HTTPException(status_code=404, detail=f"Team {team_id} is not indexed")
+    
+    challenges = data_index.team_challenges(team_id)
+    return json_response(request, {"team_id": team_id, "challenges": challenges, "total": len(challenges)}, CACHE_CONTROL_INDEX)
+
+
+@app.get("/member/{name}")
+async def get_member(name: str, request: Request):
+    """
+    Teams of a member, by name (case- and accent-insensitive), from the index
+    
+    Only members of already scraped team pages are known.
+    """
+    member = data_index.member(name)
+    if member is None:
+        raise HTTPException(status_code=404, detail=f"Member {name} not found")
+    return json_response(request, member, CACHE_CONTROL_INDEX)
+
+
+@app.get("/index/stats")
+async def get_index_stats():
+    """Indexed teams, challenges, members and names, and time spent updating the index"""
+    return data_index.stats()
+
+
+@app.get("/changes")
+async def get_changes(request: Request, since: Optional[str] = None, limit: Optional[int] = None):
+    """
+    Teams and challenges added, removed or modified after the cursor since
+    
+    Returns {"cursor": "...", "changes": [{"version": 12, "time": ..., "entity": "team",
+    "kind": "team_list", "id": "1", "op": "added" | "removed" | "modified", "fields": {...}}],
+    "more": false,
+    "reset": false}. Modified entries only carry the fields that changed.
+    Pass the returned cursor as since on the next call; "more" means
+    another page is ready. Without since (or when it is too old to be
+    served) "reset" is true: reload the full data, then continue from the
+    returned cursor.
+    """
+    limit = max(1, min(limit or CHANGES_PAGE_SIZE, CHANGES_PAGE_SIZE))
+    return json_response(request, await change_log.since(since, limit), "no-cache")
+
+
+@app.get("/changes/stream")
+async def stream_changes(request: Request, since: Optional[str] = None):
+    """
+    Server-Sent Events push of the /changes feed
+    
+    Every change is one "change" event whose id is its cursor, so a
+    reconnecting EventSource resumes with Last-Event-ID. A "reset" event
+    (data: {"cursor": ...}) means the client must reload the full data.
+    """
+    cursor = request.headers.get("last-event-id") or since
+    # Other workers' changes are only noticed by polling the database
+    poll_interval = min(CHANGES_HEARTBEAT, SNAPSHOT_SYNC_INTERVAL) if MULTI_WORKER else CHANGES_HEARTBEAT
+    
+    async def events() -> AsyncIterator[str]:
+        nonlocal cursor
+        idle = 0.0
+        yield "retry: 3000\n\n"
+        while True:
+            page = await change_log.since(cursor, CHANGES_PAGE_SIZE)
+            if page["reset"] and cursor is not None:
+                yield f"event: reset\nid: {page['cursor']}\ndata: {json.dumps({'cursor': page['cursor']})}\n\n"
+            for change in page["changes"]:
+                data = json.dumps(change, ensure_ascii=False, separators=(",", ":"))
+                yield f"event: change\nid: {change_log.cursor(change['version'])}\ndata: {data}\n\n"
+            cursor = page["cursor"]
+            if page["more"]:
+                continue
+            if await request.is_disconnected():
+                return
+            if await change_log.wait(poll_interval):
+                idle = 0.0
+                continue
+            idle += poll_interval
+            if idle >= CHANGES_HEARTBEAT:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/changes/stats")
+async def get_change_stats():
+    """Change log versions, recorded changes and time spent diffing"""
+    return await change_log.stats()
+
+
+@app.get("/history")
+async def get_history(
+    request: Request,
+    series: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    step: Optional[float] = None,
+    points: Optional[int] = None
+):
+    """
+    Downsampled history of the tracked values
+    
+    series is a comma-separated list of series names, where * matches any
+    characters: challenge:{id}:participants, team:{id}:members and
+    event:teams (e.g. series=challenge:*:participants). start and end are
+    Unix times, or seconds relative to now when zero or negative
+    (start=-3600: the last hour); the default range is the last
+    HISTORY_DEFAULT_SPAN seconds, and ranges go back HISTORY_RETENTION seconds
+    at most. The range is split into buckets of step seconds (default: the
+    range divided by points).
+    
+    Returns {"start": ..., "end": ..., "step": ..., "series": {"challenge:494:participants":
+    {"label": "Chat'bruti", "min": [...], "max": [...], "last": [...]}}}, with one
+    value per bucket, or null before the first recorded value.
+    """
+    if any(value is not None and not math.isfinite(value) for value in (start, end, step)):
+        raise HTTPException(status_code=422, detail="start, end and step must be finite numbers")
+    start, end = resolve_range(start, end, HISTORY_DEFAULT_SPAN)
+    if history.retention > 0:
+        # Older points are dropped from disk
+        start = max(start, time.time() - history.retention)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    span = end - start
+    if step is None:
+        step = span / max(1, min(points or HISTORY_DEFAULT_POINTS, HISTORY_MAX_POINTS))
+    step = max(step, span / HISTORY_MAX_POINTS, 1.0)
+    # Buckets aligned on multiples of step stay the same from one request to the next
+    start = math.floor(start / step) * step
+    end = math.ceil(end / step) * step
+    
+    names = history.names(name.strip() for name in series.split(",") if name.strip())
+    if len(names) > HISTORY_MAX_SERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many series: {len(names)} (max {HISTORY_MAX_SERIES})"
+        )
+    
+    results = await history.query(names, start, end, step)
+    return json_response(request, {
+        "start": start,
+        "end": end,
+        "step": step,
+        "series": {name: {"label": history_label(name), **results[name]} for name in names},
+    }, CACHE_CONTROL_HISTORY)
+
+
+@app.get("/history/stats")
+async def get_history_stats():
+    """Recorded series and points, and the size of the history segment on disk"""
+    return history.stats()
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Cache counters for monitoring
+    
+    Returns hits, misses, coalesced loads, evictions and current size, and
+    the same for the encoded response bodies under "responses"
+    """
+    return {**cache.stats(), "responses": response_bodies.stats()}
+
+
+@app.get("/scheduler/stats")
+async def get_scheduler_stats():
+    """
+    Background refresh counters for monitoring
+    
+    Returns registered resources, refreshes, failures and snapshot ages,
+    and with several workers whether this one is the leader running them
+    """
+    if MULTI_WORKER:
+        return {**scheduler.stats(), "worker": leader.stats()}
+    return scheduler.stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus metrics
+    
+    Upstream latency per URL pattern, limiter waits and retries, parse and
+    extract time per scrape method, API latency per route, cache lookups
+    and in-flight upstream requests, in the text exposition format
+    """
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/startup/stats")
+async def get_startup_stats():
+    """
+    Warm start timing for monitoring
+    
+    Returns how many snapshots were restored from disk, how long loading
+    them took (restore_ms) and, separately, how long rebuilding the index
+    and change log from them took (replay_ms, done in the background), and
+    how long after startup the first data response was served
+    """
+    return {
+        "restored": startup["restored"],
+        "restore_ms": snapshots.restore_ms,
+        "replay_ms": snapshots.replay_ms,
+        "first_response_ms": startup["first_response_ms"],
+        "first_response_path": startup["first_response_path"],
+        "uptime": round(time.monotonic() - startup["started"], 1) if startup["started"] is not None else None,
+    }
+
+
+@app.get("/http/stats")
+async def get_http_stats():
+    """
+    Upstream connection pool, conditional fetch and rate limiter counters for monitoring
+    
+    Returns request count, connections created / reused, the reuse ratio,
+    how many fetches were answered with 304 or had an unchanged body, the
+    rate limiter's in-flight requests, waits per priority and retries, how
+    many pages were extracted inline or in the process pool, the hedge
+    rate, and per upstream host the latency percentiles, hedge delay and
+    circuit breaker state
+    """
+    return {
+        **http_client.stats(),
+        **page_states.stats(),
+        "rate_limit": upstream_limiter.stats(),
+        "extraction": extraction_pool.stats(),
+        **upstream_guard.stats(),
+    }
+
+
+def require_admin(request: Request):
+    """Reject requests without the X-Admin-Token header matching ADMIN_TOKEN"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.post("/admin/profiler/start")
+async def start_profiler(
+    request: Request,
+    seconds: float = 30,
+    sample_rate: Optional[float] = None,
+    interval_ms: Optional[float] = None,
+    include_idle: bool = False
+):
+    """
+    Start the sampling profiler (admin only)
+    
+    Samples the server's stack every interval_ms for seconds, discarding
+    the previous profile. With sample_rate (0-1) only that fraction of
+    requests is profiled. Time spent waiting for I/O is left out unless
+    include_idle is set.
+    """
+    require_admin(request)
+    if seconds <= 0:
+        raise HTTPException(status_code=400, detail="seconds must be positive")
+    if sample_rate is not None and not 0 < sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="sample_rate must be between 0 and 1")
+    if interval_ms is not None and interval_ms < 1:
+        raise HTTPException(status_code=400, detail="interval_ms must be at least 1")
+    
+    profiler.start(seconds, sample_rate, interval_ms / 1000 if interval_ms else None, include_idle)
+    return profiler.stats()
+
+
+@app.post("/admin/profiler/stop")
+async def stop_profiler(request: Request):
+    """Stop the sampling profiler, keeping the collected profile (admin only)"""
+    require_admin(request)
+    profiler.stop()
+    return profiler.stats()
+
+
+@app.get("/admin/profiler")
+async def get_profiler_stats(request: Request):
+    """Profiler state and sample counts (admin only)"""
+    require_admin(request)
+    return profiler.stats()
+
+
+@app.get("/admin/profiler/collapsed")
+async def download_profile(request: Request):
+    """
+    Download the collected profile as collapsed stacks (admin only)
+    
+    One "frame;frame;frame count" line per distinct stack, readable by
+    flamegraph.pl, speedscope and inferno
+    """
+    require_admin(request)
+    filename = time.strftime("podium-%Y%m%d-%H%M%S.folded", time.gmtime(profiler.started_at or time.time()))
+    return Response(
+        profiler.collapsed(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     
     host = os.getenv("API_HOST", "0.0.0.0")
     port = int(os.getenv("API_PORT", 8000))
-    debug = os.getenv("DEBUG", "True").lower() == "true"
+    debug = os.getenv("DEBUG", "False").lower() == "true"
+    
+    if MULTI_WORKER and debug:
+        logger.warning("DEBUG auto-reload runs a single worker; WORKERS is ignored")
     
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
         reload=debug,
+        workers=1 if debug else WORKERS,
         log_level="info"
     )
\ No newline at end of file
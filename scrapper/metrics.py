@@ -0,0 +1,288 @@
+"""
+Metrics
+Prometheus-style counters, gauges and histograms rendered in the text
+exposition format, plus per-request stage timings for Server-Timing
+"""
+
+import contextvars
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+# Latency buckets (seconds) from 1 ms to 30 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: a named metric with label names"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self.samples()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """
+    Monotonic count per label values
+
+    With function, the values are read from it at render time instead
+    (a number, or a dict of label values to numbers), which costs nothing
+    on the hot path.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), function: Optional[Callable] = None):
+        super().__init__(name, help, labels)
+        self.function = function
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        if self.function is None:
+            return self._values
+        result = self.function()
+        if isinstance(result, dict):
+            return {key if isinstance(key, tuple) else (key,): value for key, value in result.items()}
+        return {(): result}
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in self.values().items()
+        ]
+
+
+class Gauge(Counter):
+    """Current value per label values (set directly, or read from function at render time)"""
+
+    type = "gauge"
+
+    def set(self, *label_values: str, value: float):
+        self._values[label_values] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets, per label values"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (last is +Inf), sum]
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total[0]!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The set of metrics served by /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = (), function: Optional[Callable] = None) -> Counter:
+        return self.register(Counter(name, help, labels, function))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = (), function: Optional[Callable] = None) -> Gauge:
+        return self.register(Gauge(name, help, labels, function))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Upstream
+UPSTREAM_REQUEST_SECONDS = registry.histogram(
+    "podium_upstream_request_seconds", "Upstream fetch latency per attempt, until the body is read", ("pattern", "status")
+)
+UPSTREAM_WAIT_SECONDS = registry.histogram(
+    "podium_upstream_wait_seconds", "Time spent waiting for the upstream rate limiter", ("priority",)
+)
+UPSTREAM_RETRIES = registry.counter(
+    "podium_upstream_retries_total", "Upstream fetch retries", ("pattern",)
+)
+
+# Scraping
+SCRAPE_PARSE_SECONDS = registry.histogram(
+    "podium_scrape_parse_seconds", "HTML parsing time per scrape method", ("method",)
+)
+SCRAPE_EXTRACT_SECONDS = registry.histogram(
+    "podium_scrape_extract_seconds", "Data extraction time per scrape method, parsing excluded", ("method",)
+)
+
+# API
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "podium_http_request_seconds", "API response time per route, until the response is fully sent", ("method", "route", "status")
+)
+HTTP_SERIALIZE_SECONDS = registry.histogram(
+    "podium_http_serialize_seconds", "JSON serialization time of API responses", ("route",)
+)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def url_pattern(url: str) -> str:
+    """URL path with numeric segments replaced by {id}, e.g. /inscription/equipes/{id}"""
+    return _ID_SEGMENT.sub("/{id}", urlsplit(url).path) or "/"
+
+
+# Stage durations of the current API request, for the Server-Timing header;
+# tasks started while handling the request share the same dict
+request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar('request_timings', default=None)
+
+# Parse time of the extraction running in the current task
+_parse_seconds: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar('parse_seconds', default=None)
+
+
+def record_timing(stage: str, seconds: float):
+    """Add seconds to stage in the current request's timings, if any"""
+    timings = request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def observe_parse(seconds: float):
+    """Called by the HTML parsers with the time one parse took"""
+    parse_seconds = _parse_seconds.get()
+    if parse_seconds is not None:
+        parse_seconds[0] += seconds
+
+
+@contextmanager
+def parse_timer() -> Iterator[List[float]]:
+    """Collect, in the yielded one-item list, the parse time of the HTML parsers called in the block"""
+    parse_seconds = [0.0]
+    token = _parse_seconds.set(parse_seconds)
+    try:
+        yield parse_seconds
+    finally:
+        _parse_seconds.reset(token)
+
+
+def observe_extraction(method: str, parse_seconds: float, elapsed: float):
+    """Record an extraction that took elapsed seconds, parse_seconds of them parsing HTML"""
+    SCRAPE_PARSE_SECONDS.observe(parse_seconds, method)
+    SCRAPE_EXTRACT_SECONDS.observe(elapsed - parse_seconds, method)
+    record_timing("parse", parse_seconds)
+    record_timing("extract", elapsed - parse_seconds)
+
+
+@contextmanager
+def measure_extraction(method: str) -> Iterator[None]:
+    """Time an extraction, split into HTML parsing and data extraction"""
+    start = time.perf_counter()
+    with parse_timer() as parse_seconds:
+        try:
+            yield
+        finally:
+            observe_extraction(method, parse_seconds[0], time.perf_counter() - start)
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    """Server-Timing header value: each stage and the total, in milliseconds"""
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request per route and adding a
+    Server-Timing header with the stages recorded while handling it
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        token = request_timings.set(timings)
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                header = server_timing(timings, time.perf_counter() - start).encode("latin-1")
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status[0])
+            )
@@ -0,0 +1,197 @@
+"""
+Sampling Profiler
+Periodically samples the event loop thread's Python stack from a background
+thread and aggregates the stacks in the collapsed format read by
+flamegraph.pl, speedscope and similar tools
+
+Nothing runs until a profile is started: a time window profiles everything,
+and a sample rate profiles only while a sampled request is being handled.
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames meaning the event loop is waiting for I/O
+_IDLE_FUNCTIONS = frozenset(("select", "poll", "epoll", "control"))
+
+
+def _frame_name(code) -> str:
+    path = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Collapsed stack samples of one thread, taken every interval seconds"""
+
+    def __init__(self):
+        self.interval = float(os.getenv('PROFILER_INTERVAL_MS', 5)) / 1000
+        self.max_seconds = float(os.getenv('PROFILER_MAX_SECONDS', 300))
+        self.max_stacks = int(os.getenv('PROFILER_MAX_STACKS', 20000))
+
+        # Fraction of requests to profile; 0 when not sampling requests
+        self.sample_rate = 0.0
+        self.mode = "window"
+        self.include_idle = False
+        self._stacks: Counter = Counter()
+        # The sampling thread adds to _stacks while requests read it
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._target: Optional[int] = None
+        self._deadline = 0.0
+        self._active_requests = 0
+
+        # Counters
+        self.samples = 0
+        self.idle_samples = 0
+        self.profiled_requests = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(
+        self,
+        seconds: float,
+        sample_rate: Optional[float] = None,
+        interval: Optional[float] = None,
+        include_idle: bool = False,
+    ):
+        """
+        Profile the calling thread (the event loop) for seconds, discarding
+        the previous profile
+
+        With sample_rate, only that fraction of requests is profiled, and
+        stacks are sampled while at least one of them is in progress.
+        """
+        self.stop()
+        with self._lock:
+            self._stacks.clear()
+        self.samples = self.idle_samples = self.profiled_requests = 0
+        self.interval = interval if interval is not None else self.interval
+        self.include_idle = include_idle
+        self._target = threading.get_ident()
+        self._deadline = time.monotonic() + min(seconds, self.max_seconds)
+        self._active_requests = 0
+        self.started_at = time.time()
+        self.stopped_at = None
+        self.sample_rate = sample_rate or 0.0
+        self.mode = "requests" if sample_rate else "window"
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Profiler started for {min(seconds, self.max_seconds)}s "
+            f"(interval={self.interval * 1000}ms, sample_rate={self.sample_rate or 'all'})"
+        )
+
+    def stop(self):
+        """Stop sampling; the collected profile is kept"""
+        self.sample_rate = 0.0
+        if self._thread is not None:
+            self._stop.set()
+            if self._thread is not threading.current_thread():
+                self._thread.join()
+            self._thread = None
+            self.stopped_at = time.time()
+            logger.info(f"Profiler stopped ({self.samples} samples)")
+
+    def should_profile(self) -> bool:
+        """Whether to profile the request about to be handled (only called while sampling requests)"""
+        return random.random() < self.sample_rate
+
+    def begin_request(self):
+        self._active_requests += 1
+        self.profiled_requests += 1
+
+    def end_request(self):
+        self._active_requests -= 1
+
+    def collapsed(self) -> str:
+        """Aggregated stacks, one "frame;frame;frame count" line each"""
+        with self._lock:
+            stacks = self._stacks.copy()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            distinct_stacks = len(self._stacks)
+        return {
+            "running": self.running,
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "distinct_stacks": distinct_stacks,
+            "profiled_requests": self.profiled_requests,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "remaining": round(max(0.0, self._deadline - time.monotonic()), 1) if self.running else 0.0,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if time.monotonic() >= self._deadline:
+                self.sample_rate = 0.0
+                self.stopped_at = time.time()
+                logger.info(f"Profiler window ended ({self.samples} samples)")
+                return
+            if self.sample_rate and not self._active_requests:
+                continue
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self._sample(frame)
+            del frame
+
+    def _sample(self, frame):
+        if not self.include_idle and frame.f_code.co_name in _IDLE_FUNCTIONS:
+            self.idle_samples += 1
+            return
+        names = []
+        while frame is not None:
+            names.append(_frame_name(frame.f_code))
+            frame = frame.f_back
+        stack = ";".join(reversed(names))
+        with self._lock:
+            if stack not in self._stacks and len(self._stacks) >= self.max_stacks:
+                stack = "[other stacks]"
+            self._stacks[stack] += 1
+            self.samples += 1
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware marking sampled requests for the profiler; a single
+    attribute check per request when not sampling
+    """
+
+    def __init__(self, app, profiler: SamplingProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if not self.profiler.sample_rate or scope["type"] != "http" or not self.profiler.should_profile():
+            await self.app(scope, receive, send)
+            return
+
+        self.profiler.begin_request()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end_request()
+
+
+# Profiler of the event loop thread, controlled through the /admin/profiler endpoints
+profiler = SamplingProfiler()
@@ -0,0 +1,212 @@
+"""
+Upstream Resilience
+Hedged requests and per-host circuit breakers for upstream fetches
+
+Hedging: when a fetch has not answered after a high percentile of the
+host's recent latencies (HEDGE_PERCENTILE), a second identical request is
+sent and the first response wins, so one stuck connection costs a few
+hundred milliseconds instead of REQUEST_TIMEOUT. Hedges are limited to a
+fraction of requests (HEDGE_MAX_RATIO), so a slow upstream does not get
+twice the traffic.
+
+Circuit breaker: after BREAKER_FAILURE_THRESHOLD consecutive failed
+attempts (connection errors, timeouts, 5xx) a host's breaker opens and
+fetches fail immediately for BREAKER_OPEN_SECONDS, letting the callers
+serve their last good result. Then one probe request is let through:
+success closes the breaker, failure opens it again.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+BREAKER_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class LatencyTracker:
+    """Latencies of the latest successful requests to a host"""
+
+    def __init__(self, window: int):
+        self._samples: deque = deque(maxlen=window)
+        self._sorted: Optional[list] = None
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+        self._sorted = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank percentile of the window, None without samples"""
+        if not self._samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+        rank = max(0, min(len(self._sorted) - 1, int(len(self._sorted) * p / 100 + 0.5) - 1))
+        return self._sorted[rank]
+
+    def stats(self) -> Dict:
+        return {
+            "samples": len(self._samples),
+            **{f"p{p}_ms": round(self.percentile(p) * 1000, 1) if self._samples else None for p in PERCENTILES},
+        }
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker counting consecutive failures"""
+
+    def __init__(self, failure_threshold: int, open_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_sent_at: Optional[float] = None
+        # Blocking fetches report from other threads
+        self._lock = threading.Lock()
+
+        # Counters
+        self.opens = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (False: fail fast)"""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probe_sent_at = None
+            # Half open: one probe at a time (another one if it never reported back)
+            if self.state == HALF_OPEN and (self._probe_sent_at is None or now - self._probe_sent_at >= self.open_seconds):
+                self._probe_sent_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and 0 < self.failure_threshold <= self.failures):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self.opens += 1
+
+    def stats(self) -> Dict:
+        retry_in = self.open_seconds - (time.monotonic() - self._opened_at) if self.state == OPEN else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "rejected": self.rejected,
+            "retry_in": round(max(0.0, retry_in), 3),
+        }
+
+
+class HostState:
+    """Latency window and circuit breaker of one upstream host"""
+
+    __slots__ = ("latency", "breaker")
+
+    def __init__(self, window: int, failure_threshold: int, open_seconds: float):
+        self.latency = LatencyTracker(window)
+        self.breaker = CircuitBreaker(failure_threshold, open_seconds)
+
+
+class UpstreamGuard:
+    """
+    Hedging policy and per-host state shared by every scraper instance
+
+    hedge_delay() gives how long a fetch waits before it is hedged;
+    try_hedge() spends the hedge budget, which grows by HEDGE_MAX_RATIO
+    per request sent.
+    """
+
+    def __init__(self):
+        self.hedging = os.getenv('HEDGE_ENABLED', 'True').lower() == 'true'
+        self.percentile = float(os.getenv('HEDGE_PERCENTILE', 95))
+        self.min_delay = float(os.getenv('HEDGE_MIN_DELAY', 0.05))
+        self.min_samples = int(os.getenv('HEDGE_MIN_SAMPLES', 20))
+        self.max_ratio = float(os.getenv('HEDGE_MAX_RATIO', 0.1))
+        self.window = int(os.getenv('LATENCY_WINDOW', 256))
+        self.failure_threshold = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+        self.open_seconds = float(os.getenv('BREAKER_OPEN_SECONDS', 30))
+        self._hosts: Dict[str, HostState] = {}
+        # Hedges that may be sent right now, at most a burst of 10
+        self._budget = 0.0
+
+        # Counters
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_denied = 0
+
+    def host(self, url: str) -> HostState:
+        host = urlsplit(url).netloc
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(self.window, self.failure_threshold, self.open_seconds)
+        return state
+
+    def hedge_delay(self, state: HostState) -> Optional[float]:
+        """Seconds after which a request to the host is hedged, None to not hedge it"""
+        self.requests += 1
+        self._budget = min(10.0, self._budget + self.max_ratio)
+        if not self.hedging or state.breaker.state != CLOSED or len(state.latency) < self.min_samples:
+            return None
+        return max(self.min_delay, state.latency.percentile(self.percentile))
+
+    def try_hedge(self) -> bool:
+        if self._budget < 1:
+            self.hedges_denied += 1
+            return False
+        self._budget -= 1
+        self.hedges += 1
+        return True
+
+    def hosts(self) -> Dict[str, HostState]:
+        return dict(self._hosts)
+
+    def stats(self) -> Dict:
+        return {
+            "hedging": {
+                "enabled": self.hedging,
+                "percentile": self.percentile,
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedges_denied": self.hedges_denied,
+                "hedge_rate": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            },
+            "hosts": {
+                host: {
+                    "latency": state.latency.stats(),
+                    "hedge_delay_ms": round(max(self.min_delay, state.latency.percentile(self.percentile)) * 1000, 1)
+                    if len(state.latency) >= self.min_samples else None,
+                    "breaker": state.breaker.stats(),
+                }
+                for host, state in self._hosts.items()
+            },
+        }
+
+
+# Hedging and circuit breakers used by every scraper instance
+upstream_guard = UpstreamGuard()
@@ -0,0 +1,191 @@
+"""
+Background Refresh Scheduler
+Periodically re-scrapes registered resources into a SnapshotStore
+"""
+
+import asyncio
+import heapq
+import os
+import random
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from scraper_base import PRIORITY_BACKGROUND, fetch_priority
+from snapshot import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshResource:
+    """A resource refreshed every interval seconds by calling loader"""
+
+    __slots__ = ("key", "loader", "interval", "on_success")
+
+    def __init__(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Dict]],
+        interval: float,
+        on_success: Optional[Callable[[Dict], Any]] = None,
+    ):
+        self.key = key
+        self.loader = loader
+        self.interval = interval
+        self.on_success = on_success
+
+
+class RefreshScheduler:
+    """
+    Refresh registered resources in the background
+
+    Each resource is refreshed every interval seconds, +/- jitter (a
+    fraction of the interval) so refreshes do not line up. All refreshes
+    share a budget of upstream requests per minute and at most concurrency
+    of them run at once. Successful results replace the resource's snapshot.
+    """
+
+    def __init__(
+        self,
+        store: SnapshotStore,
+        budget_per_minute: Optional[float] = None,
+        jitter: Optional[float] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self.store = store
+        self.budget_per_minute = budget_per_minute if budget_per_minute is not None else float(os.getenv('REFRESH_BUDGET_PER_MINUTE', 240))
+        self.jitter = jitter if jitter is not None else float(os.getenv('REFRESH_JITTER', 0.1))
+        self.concurrency = concurrency if concurrency is not None else int(os.getenv('REFRESH_CONCURRENCY', 4))
+
+        self._resources: Dict[str, RefreshResource] = {}
+        self._queue: List[Tuple[float, str]] = []  # (due time, key) heap
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+        # Token bucket holding up to 10 seconds worth of budget
+        self._rate = self.budget_per_minute / 60
+        self._capacity = max(1.0, self._rate * 10)
+        self._tokens = self._capacity
+        self._last_refill = time.monotonic()
+
+        # Counters
+        self.refreshed = 0
+        self.failures = 0
+        self.budget_waits = 0
+
+    def add(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Dict]],
+        interval: float,
+        on_success: Optional[Callable[[Dict], Any]] = None,
+    ):
+        """Register a resource; it is refreshed as soon as possible, then every interval"""
+        if key in self._resources:
+            resource = self._resources[key]
+            resource.loader = loader
+            resource.interval = interval
+            resource.on_success = on_success
+            return
+
+        self._resources[key] = RefreshResource(key, loader, interval, on_success)
+        heapq.heappush(self._queue, (time.monotonic(), key))
+        self._wakeup.set()
+
+    async def start(self):
+        """Start the scheduler loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Refresh scheduler started (budget={self.budget_per_minute}/min, "
+                f"jitter={self.jitter}, concurrency={self.concurrency})"
+            )
+
+    async def stop(self):
+        """Stop the scheduler loop and cancel running refreshes"""
+        tasks = list(self._running)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("Refresh scheduler stopped")
+
+    def stats(self) -> Dict:
+        """Return refresh counters"""
+        return {
+            "resources": len(self._resources),
+            "running": len(self._running),
+            "refreshed": self.refreshed,
+            "failures": self.failures,
+            "budget_waits": self.budget_waits,
+            "budget_per_minute": self.budget_per_minute,
+            **self.store.stats(),
+        }
+
+    async def _run(self):
+        while True:
+            if not self._queue:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            due, key = self._queue[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                # Sleep until the next refresh is due, or until a resource is added
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            heapq.heappop(self._queue)
+            resource = self._resources[key]
+            await self._acquire_budget()
+            await self._slots.acquire()
+            task = asyncio.create_task(self._refresh(resource))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _refresh(self, resource: RefreshResource):
+        # Background refreshes wait behind interactive and bulk fetches
+        fetch_priority.set(PRIORITY_BACKGROUND)
+        try:
+            result = await resource.loader()
+            if "error" in result:
+                self.failures += 1
+                logger.warning(f"Background refresh of {resource.key} failed: {result['error']}")
+            else:
+                self.store.put(resource.key, result)
+                self.refreshed += 1
+                if resource.on_success is not None:
+                    resource.on_success(result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Background refresh of {resource.key} failed: {e}")
+        finally:
+            self._slots.release()
+            spread = resource.interval * self.jitter
+            due = time.monotonic() + resource.interval + random.uniform(-spread, spread)
+            heapq.heappush(self._queue, (due, resource.key))
+            self._wakeup.set()
+
+    async def _acquire_budget(self):
+        if self._rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            self.budget_waits += 1
+            await asyncio.sleep((1 - self._tokens) / self._rate)
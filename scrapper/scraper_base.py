@@ -5,12 +5,26 @@ This module contains the base scraper classes and utilities
 
 import os
 import time
+import asyncio
+import codecs
+import contextvars
+import hashlib
+import heapq
+import itertools
+import random
+import threading
+import aiohttp
 import requests
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-from typing import Dict, List, Optional
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 
+import metrics
+from extraction_pool import extraction_pool
+from resilience import upstream_guard
+
 # Load environment variables
 load_dotenv()
 
@@ -22,35 +36,678 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class HttpClient:
+    """Process-wide pooled aiohttp session shared by all scrapers"""
+    
+    def __init__(self):
+        self.pool_size = int(os.getenv('HTTP_POOL_SIZE', 100))
+        self.max_per_host = int(os.getenv('HTTP_MAX_PER_HOST', 20))
+        self.keepalive_timeout = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 30))
+        self.session: Optional[aiohttp.ClientSession] = None
+        
+        # Counters
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+    
+    async def start(self):
+        """Create the shared session (call once at app startup)"""
+        if self.session is not None and not self.session.closed:
+            return
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.max_per_host,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        self.session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+        logger.info(
+            f"HTTP pool started (size={self.pool_size}, per_host={self.max_per_host}, "
+            f"keepalive={self.keepalive_timeout}s)"
+        )
+    
+    async def close(self):
+        """Close the shared session and its pooled connections (call at app shutdown)"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+            logger.info("HTTP pool closed")
+    
+    def stats(self) -> Dict:
+        """Return request and connection reuse counters"""
+        acquired = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": round(self.connections_reused / acquired, 4) if acquired else 0.0,
+            "pool_size": self.pool_size,
+            "max_per_host": self.max_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+        }
+    
+    async def _on_request_start(self, session, context, params):
+        self.requests += 1
+    
+    async def _on_connection_create_end(self, session, context, params):
+        self.connections_created += 1
+    
+    async def _on_connection_reuseconn(self, session, context, params):
+        self.connections_reused += 1
+
+
+# Shared HTTP client used by every scraper instance
+http_client = HttpClient()
+
+
+# Fetch priorities: when upstream requests have to wait, lower values go first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk", PRIORITY_BACKGROUND: "background"}
+
+# Priority of the upstream fetches made by the current task (inherited by the tasks it creates)
+fetch_priority: contextvars.ContextVar[int] = contextvars.ContextVar('fetch_priority', default=PRIORITY_INTERACTIVE)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamLimiter:
+    """
+    Process-wide rate limiter and concurrency cap for upstream requests
+    
+    With several WORKERS processes, each one gets an equal share of the
+    configured rate, burst and in-flight limit.
+    
+    Every fetch takes a token from a bucket refilled at REQUESTS_PER_SECOND
+    (0 disables the rate limit) and one of UPSTREAM_MAX_IN_FLIGHT slots.
+    Fetches that have to wait are let through by priority, then in arrival
+    order. A Retry-After from upstream pauses every fetch until it expires.
+    """
+    
+    def __init__(
+        self,
+        requests_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_in_flight: Optional[int] = None
+    ):
+        # The configured limits are shared by all WORKERS processes
+        workers = int(os.getenv('WORKERS', 1))
+        if workers < 1:
+            raise ValueError(f"WORKERS must be at least 1 (got {workers})")
+        self.requests_per_second = requests_per_second if requests_per_second is not None else float(os.getenv('REQUESTS_PER_SECOND', 10)) / workers
+        if burst is None:
+            burst = float(os.getenv('UPSTREAM_BURST', max(1.0, self.requests_per_second * workers))) / workers
+        # A request takes a whole token: with a smaller bucket none would ever be granted
+        self.burst = max(1.0, burst)
+        self.max_in_flight = max_in_flight if max_in_flight is not None else max(1, int(os.getenv('UPSTREAM_MAX_IN_FLIGHT', 10)) // workers)
+        self.backoff_base = float(os.getenv('RETRY_BACKOFF_BASE', 0.5))
+        self.backoff_max = float(os.getenv('RETRY_BACKOFF_MAX', 30))
+        
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Blocking fetches take tokens from other threads
+        self._lock = threading.Lock()
+        
+        # Counters
+        self.granted = 0
+        self.waits = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.retries = 0
+        self.throttled = 0
+        self.pauses = 0
+    
+    async def acquire(self, priority: Optional[int] = None):
+        """Wait for a token and an in-flight slot; pair with release()"""
+        if priority is None:
+            priority = fetch_priority.get()
+        if not self._waiters and self._try_take() == 0:
+            self.granted += 1
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self.waits[PRIORITY_NAMES.get(priority, "background")] += 1
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the waiter was cancelled: hand the slot on
+                self.release()
+            raise
+    
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+    
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+    
+    def release(self):
+        """Free the in-flight slot taken by acquire()"""
+        with self._lock:
+            self._in_flight -= 1
+        if self._waiters:
+            self._dispatch()
+    
+    def reserve(self) -> float:
+        """Take a token for a blocking fetch; returns how long to sleep before sending it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self._paused_until - now)
+            if self.requests_per_second > 0:
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.requests_per_second)
+            self.granted += 1
+            return wait
+    
+    def pause(self, seconds: float):
+        """Hold back every fetch for seconds (upstream asked us to slow down)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.pauses += 1
+    
+    def backoff(self, previous: float) -> float:
+        """Next retry delay after previous, with decorrelated jitter"""
+        return min(self.backoff_max, random.uniform(self.backoff_base, max(self.backoff_base, previous * 3)))
+    
+    def stats(self) -> Dict:
+        """Return rate limiter state and counters"""
+        return {
+            "requests_per_second": self.requests_per_second,
+            "burst": self.burst,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "waiting": self.waiting,
+            "granted": self.granted,
+            "waits": dict(self.waits),
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "pauses": self.pauses,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+        }
+    
+    def _refill(self, now: float):
+        if self.requests_per_second > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.requests_per_second)
+        self._updated = now
+    
+    def _try_take(self) -> Optional[float]:
+        """
+        Take a token and a slot if both are available and return 0; otherwise
+        return the seconds until a token is available, or None when waiting
+        for a slot to be released
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._in_flight >= self.max_in_flight:
+                return None
+            self._refill(now)
+            if self.requests_per_second > 0:
+                if self._tokens < 1:
+                    return (1 - self._tokens) / self.requests_per_second
+                self._tokens -= 1
+            self._in_flight += 1
+            return 0
+    
+    def _dispatch(self):
+        """Grant waiting fetches in priority order while tokens and slots last"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                # Waiter was cancelled
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._try_take()
+            if wait is None:
+                return
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+            self.granted += 1
+
+
+# Rate limiter shared by every scraper instance
+upstream_limiter = UpstreamLimiter()
+
+
+class FetchedPage:
+    """
+    An upstream response body with its validators
+    
+    A page fetched with a streaming parser has no body: parser holds what
+    was extracted from it and digest the hash of the body.
+    """
+    
+    __slots__ = ("status", "body", "encoding", "etag", "last_modified", "digest", "parser")
+    
+    def __init__(
+        self,
+        status: int,
+        body: bytes,
+        encoding: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        digest: Optional[str] = None,
+        parser=None
+    ):
+        self.status = status
+        self.body = body
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.parser = parser
+    
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding, errors='replace')
+
+
+class PageState:
+    """Validators, body hash and extracted result of the last successful fetch of a URL"""
+    
+    __slots__ = ("etag", "last_modified", "digest", "result")
+    
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], digest: str, result: Dict):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.result = result
+
+
+class PageStateStore:
+    """
+    Per-URL state for conditional fetching, shared by all scraper instances
+    
+    Lets a fetch send If-None-Match / If-Modified-Since and reuse the
+    previous extracted result on a 304 or when the body hash is unchanged.
+    """
+    
+    def __init__(self):
+        self.enabled = os.getenv('CONDITIONAL_FETCH', 'True').lower() == 'true'
+        self._states: Dict[str, PageState] = {}
+        
+        # Counters
+        self.not_modified = 0
+        self.unchanged_bodies = 0
+        self.parsed = 0
+    
+    def get(self, key: str) -> Optional[PageState]:
+        return self._states.get(key) if self.enabled else None
+    
+    def put(self, key: str, state: PageState):
+        if self.enabled:
+            self._states[key] = state
+    
+    def stats(self) -> Dict:
+        """Return conditional fetch counters"""
+        return {
+            "not_modified": self.not_modified,
+            "unchanged_bodies": self.unchanged_bodies,
+            "parsed": self.parsed,
+            "tracked_pages": len(self._states),
+        }
+
+
+# Conditional fetch state used by every scraper instance
+page_states = PageStateStore()
+
+
 class WebScraper:
     """Base web scraper class"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers = {
             'User-Agent': os.getenv('USER_AGENT', 'Mozilla/5.0')
-        })
+        }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
         self.timeout = int(os.getenv('REQUEST_TIMEOUT', 10))
         self.max_retries = int(os.getenv('MAX_RETRIES', 3))
+        self.stream_chunk_bytes = int(os.getenv('STREAM_CHUNK_BYTES', 16384))
     
     def fetch_page(self, url: str) -> Optional[str]:
         """Fetch HTML content from a URL"""
+        host = upstream_guard.host(url)
+        delay = upstream_limiter.backoff_base
         for attempt in range(self.max_retries):
+            if not host.breaker.allow():
+                logger.warning(f"Not fetching {url}: circuit breaker open")
+                return None
+            retry_after = None
+            time.sleep(upstream_limiter.reserve())
             try:
                 logger.info(f"Fetching {url} (attempt {attempt + 1}/{self.max_retries})")
+                start = time.perf_counter()
                 response = self.session.get(url, timeout=self.timeout)
                 response.raise_for_status()
+                host.latency.observe(time.perf_counter() - start)
+                host.breaker.record_success()
                 return response.text
             except requests.RequestException as e:
                 logger.error(f"Error fetching {url}: {e}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                else:
-                    return None
+                status = e.response.status_code if e.response is not None else None
+                if status is None or status >= 500:
+                    host.breaker.record_failure()
+                if status in (429, 503):
+                    retry_after = self._throttled(e.response.status_code, e.response.headers)
+            if attempt < self.max_retries - 1:
+                upstream_limiter.retries += 1
+                metrics.UPSTREAM_RETRIES.inc(metrics.url_pattern(url))
+                delay = upstream_limiter.backoff(delay)
+                time.sleep(max(delay, retry_after or 0))
+        return None
+    
+    async def fetch_page_async(self, url: str) -> Optional[str]:
+        """Fetch HTML content from a URL without blocking the event loop"""
+        page = await self._fetch_async(url)
+        return page.text if page else None
+    
+    async def fetch_and_extract_async(self, url: str, kind: str, extract: str, *args) -> Optional[Dict]:
+        """
+        Fetch a URL and run the extract method on its HTML (with args),
+        skipping work when the page has not changed since the last
+        successful fetch
+        
+        Large pages are extracted in the shared process pool, see
+        extraction_pool.
+        
+        Sends the stored ETag / Last-Modified validators; on a 304, or when
+        the body hashes the same as last time, the previous result is
+        returned without parsing. kind names the extraction (the scrape_*
+        method), since one page can be extracted in several ways. Returns
+        None if the page could not be fetched.
+        """
+        state_key = f"{kind}:{url}"
+        state = page_states.get(state_key)
+        page = await self._fetch_async(url, self._conditional_headers(state))
+        if page is None:
+            return None
+        
+        if page.status == 304 and state is not None:
+            page_states.not_modified += 1
+            return state.result
+        
+        digest = hashlib.blake2b(page.body, digest_size=16).hexdigest()
+        if state is not None and state.digest == digest:
+            page_states.unchanged_bodies += 1
+            state.etag, state.last_modified = page.etag, page.last_modified
+            return state.result
+        
+        result = await extraction_pool.extract(self, kind, extract, args, page.text)
+        page_states.parsed += 1
+        if "error" not in result:
+            page_states.put(state_key, PageState(page.etag, page.last_modified, digest, result))
+        return result
+    
+    async def fetch_and_stream_async(self, url: str, kind: str, parser_factory: Callable) -> Optional[Dict]:
+        """
+        Fetch a URL and extract it while it downloads, with a streaming
+        parser made by parser_factory (see lxml_extract)
+        
+        Parsing overlaps the transfer and the body is never held whole in
+        memory. Each chunk is parsed on the event loop as it arrives, so
+        the extraction pool is not used. Conditional fetching works as in
+        fetch_and_extract_async, except that an unchanged body has already
+        been parsed: the previous result is still returned, so unchanged
+        data keeps the same result object. Returns None if the page could
+        not be fetched.
+        """
+        state_key = f"{kind}:{url}"
+        state = page_states.get(state_key)
+        page = await self._fetch_async(url, self._conditional_headers(state), parser_factory)
+        if page is None:
+            return None
+        
+        if page.status == 304 and state is not None:
+            page_states.not_modified += 1
+            return state.result
+        
+        parser = page.parser
+        metrics.observe_extraction(kind, parser.parse_seconds, parser.elapsed)
+        if state is not None and state.digest == page.digest:
+            page_states.unchanged_bodies += 1
+            state.etag, state.last_modified = page.etag, page.last_modified
+            return state.result
+        
+        result = parser.extracted
+        page_states.parsed += 1
+        if "error" not in result:
+            page_states.put(state_key, PageState(page.etag, page.last_modified, page.digest, result))
+        return result
+    
+    def _conditional_headers(self, state: Optional[PageState]) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers from the last successful fetch"""
+        headers = {}
+        if state is not None:
+            if state.etag:
+                headers['If-None-Match'] = state.etag
+            if state.last_modified:
+                headers['If-Modified-Since'] = state.last_modified
+        return headers
+    
+    async def _fetch_async(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        parser_factory: Optional[Callable] = None
+    ) -> Optional[FetchedPage]:
+        if http_client.session is not None:
+            return await self._fetch_with_retries(http_client.session, url, headers, parser_factory)
+        
+        # No shared pool (e.g. standalone script): use a short-lived session
+        async with aiohttp.ClientSession() as session:
+            return await self._fetch_with_retries(session, url, headers, parser_factory)
+    
+    async def _fetch_with_retries(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        parser_factory: Optional[Callable] = None
+    ) -> Optional[FetchedPage]:
+        """
+        Fetch url, retrying failed attempts with backoff
+
+        Each attempt is hedged when it is slow (see resilience). No attempt
+        is made while the host's circuit breaker is open. With a
+        parser_factory, every attempt streams the body into a new parser.
+        """
+        request_headers = {**self.headers, **(headers or {})}
+        host = upstream_guard.host(url)
+        delay = upstream_limiter.backoff_base
+        for attempt in range(self.max_retries):
+            if not host.breaker.allow():
+                logger.warning(f"Not fetching {url}: circuit breaker open")
+                return None
+            retry_after = None
+            logger.info(f"Fetching {url} (attempt {attempt + 1}/{self.max_retries})")
+            try:
+                page = await self._send_hedged(session, url, request_headers, host, parser_factory)
+                host.breaker.record_success()
+                return page
+            except aiohttp.ClientResponseError as e:
+                logger.error(f"Error fetching {url}: {e!r}")
+                if e.status >= 500:
+                    host.breaker.record_failure()
+                if e.status in (429, 503):
+                    retry_after = self._throttled(e.status, e.headers or {})
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Error fetching {url}: {e!r}")
+                host.breaker.record_failure()
+            if attempt < self.max_retries - 1:
+                upstream_limiter.retries += 1
+                metrics.UPSTREAM_RETRIES.inc(metrics.url_pattern(url))
+                delay = max(upstream_limiter.backoff(delay), retry_after or 0)
+                metrics.record_timing("retry", delay)
+                await asyncio.sleep(delay)
+        return None
+    
+    async def _send_hedged(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, str],
+        host,
+        parser_factory: Optional[Callable] = None
+    ) -> FetchedPage:
+        """
+        One attempt: send the request and, if it has not answered after the
+        host's hedge delay, a second one; the first successful response wins
+        and the other request is cancelled
+        """
+        hedge_delay = upstream_guard.hedge_delay(host)
+        if hedge_delay is None:
+            return await self._send(session, url, headers, host, parser_factory)
+        
+        tasks = [asyncio.ensure_future(self._send(session, url, headers, host, parser_factory))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done or not upstream_guard.try_hedge():
+                return await tasks[0]
+            logger.info(f"Hedging {url}: no response after {hedge_delay * 1000:.0f} ms")
+            tasks.append(asyncio.ensure_future(self._send(session, url, headers, host, parser_factory)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            upstream_guard.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Mark the loser's error as retrieved
+                    task.exception()
+    
+    async def _send(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, str],
+        host,
+        parser_factory: Optional[Callable] = None
+    ) -> FetchedPage:
+        """Send one request (after the rate limiter lets it through); raises on failure"""
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        pattern = metrics.url_pattern(url)
+        priority = PRIORITY_NAMES.get(fetch_priority.get(), "background")
+        status = "error"
+        start = time.perf_counter()
+        await upstream_limiter.acquire()
+        sent = time.perf_counter()
+        metrics.UPSTREAM_WAIT_SECONDS.observe(sent - start, priority)
+        metrics.record_timing("wait", sent - start)
+        try:
+            async with session.get(url, headers=headers, timeout=timeout) as response:
+                status = str(response.status)
+                response.raise_for_status()
+                if parser_factory is not None:
+                    page = await self._stream_response(response, parser_factory)
+                    # Leave the parsing time out of the upstream latency
+                    host.latency.observe(time.perf_counter() - sent - page.parser.elapsed)
+                    return page
+                body = await response.read()
+                host.latency.observe(time.perf_counter() - sent)
+                return FetchedPage(
+                    response.status,
+                    body,
+                    response.get_encoding() if body else 'utf-8',
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified')
+                )
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            upstream_limiter.release()
+            elapsed = time.perf_counter() - sent
+            metrics.UPSTREAM_REQUEST_SECONDS.observe(elapsed, pattern, status)
+            metrics.record_timing("upstream", elapsed)
+    
+    async def _stream_response(self, response: aiohttp.ClientResponse, parser_factory: Callable) -> FetchedPage:
+        """Decode and feed the body to a new parser chunk by chunk as it arrives"""
+        encoding = response.charset or 'utf-8'
+        try:
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        except LookupError:
+            encoding = 'utf-8'
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        digest = hashlib.blake2b(digest_size=16)
+        parser = parser_factory()
+        async for chunk in response.content.iter_chunked(self.stream_chunk_bytes):
+            digest.update(chunk)
+            parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+        return FetchedPage(
+            response.status,
+            b'',
+            encoding,
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            digest.hexdigest(),
+            parser
+        )
+    
+    def _throttled(self, status: int, headers) -> Optional[float]:
+        """Record a 429 / 503 and pause all fetches for its Retry-After, if any"""
+        if status == 429:
+            upstream_limiter.throttled += 1
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        if retry_after is not None:
+            retry_after = min(retry_after, upstream_limiter.backoff_max)
+            upstream_limiter.pause(retry_after)
+        return retry_after
+    
+    def extraction_options(self) -> Dict:
+        """Constructor arguments recreating this scraper's extraction behaviour in a pool process"""
+        return {}
     
     def parse_html(self, html: str) -> BeautifulSoup:
         """Parse HTML content"""
-        return BeautifulSoup(html, 'lxml')
+        start = time.perf_counter()
+        soup = BeautifulSoup(html, 'lxml')
+        metrics.observe_parse(time.perf_counter() - start)
+        return soup
     
     def scrape(self, url: str) -> Dict:
         """
@@ -3,8 +3,25 @@ Custom scrapers for specific websites
 Extend the WebScraper class for site-specific scraping logic
 """
 
+import os
 from scraper_base import WebScraper
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+import lxml_extract
+
+# Nuit de l'Info pages (the base URL can point at a local stand-in server for benchmarks)
+BASE_URL = os.getenv('NUITDELINFO_BASE_URL', "https://www.nuitdelinfo.com").rstrip('/')
+CHALLENGES_URL = f"{BASE_URL}/inscription/defis/liste"
+
+
+def team_url(team_id: str) -> str:
+    """URL of a team page"""
+    return f"{BASE_URL}/inscription/equipes/{team_id}"
+
+
+def challenge_url(challenge_id: str) -> str:
+    """URL of a challenge page"""
+    return f"{BASE_URL}/inscription/defis/{challenge_id}"
 
 
 class ExampleScraper(WebScraper):
@@ -44,6 +61,21 @@ class ExampleScraper(WebScraper):
 class NuitDelInfoScraper(WebScraper):
     """Scraper for Nuit de l'Info challenge pages"""
     
+    # Extraction engines: "bs4" builds a BeautifulSoup tree, "lxml" runs
+    # precompiled XPath expressions (see lxml_extract), "stream" is lxml with
+    # the challenge list and challenge pages parsed while they download; all
+    # return the same data
+    ENGINES = ("bs4", "lxml", "stream")
+    
+    def __init__(self, engine: Optional[str] = None):
+        super().__init__()
+        self.engine = engine or os.getenv('SCRAPER_ENGINE', 'bs4')
+        if self.engine not in self.ENGINES:
+            raise ValueError(f"Unknown scraper engine: {self.engine} (expected one of {', '.join(self.ENGINES)})")
+    
+    def extraction_options(self) -> Dict:
+        return {"engine": self.engine}
+    
     def scrape_teams(self, url: str) -> Dict:
         """
         Scrape teams participating in a challenge
@@ -53,6 +85,21 @@ class NuitDelInfoScraper(WebScraper):
         if not html:
             return {"error": "Failed to fetch page", "url": url}
         
+        return self.extract_teams(html)
+    
+    async def scrape_teams_async(self, url: str) -> Dict:
+        """Async variant of scrape_teams"""
+        result = await self.fetch_and_extract_async(url, 'scrape_teams', 'extract_teams')
+        if result is None:
+            return {"error": "Failed to fetch page", "url": url}
+        
+        return result
+    
+    def extract_teams(self, html: str) -> Dict:
+        """Extract the team list from a challenge page"""
+        if self.engine in ("lxml", "stream"):
+            return lxml_extract.extract_teams(html)
+        
         soup = self.parse_html(html)
         
         # Find the panel-info div containing the teams
@@ -90,12 +137,29 @@ class NuitDelInfoScraper(WebScraper):
         Scrape details of a specific team
         Returns: {"members": ["member1", ...], "selectedchall": [{"id": "123", "name": "Challenge name"}, ...]}
         """
-        url = f"https://www.nuitdelinfo.com/inscription/equipes/{team_id}"
+        url = team_url(team_id)
         html = self.fetch_page(url)
         
         if not html:
             return {"error": "Failed to fetch page", "team_id": team_id}
         
+        return self.extract_team_details(html, team_id)
+    
+    async def scrape_team_details_async(self, team_id: str) -> Dict:
+        """Async variant of scrape_team_details"""
+        url = team_url(team_id)
+        result = await self.fetch_and_extract_async(url, 'scrape_team_details', 'extract_team_details', team_id)
+        
+        if result is None:
+            return {"error": "Failed to fetch page", "team_id": team_id}
+        
+        return result
+    
+    def extract_team_details(self, html: str, team_id: str) -> Dict:
+        """Extract members and selected challenges from a team page"""
+        if self.engine in ("lxml", "stream"):
+            return lxml_extract.extract_team_details(html, team_id)
+        
         soup = self.parse_html(html)
         
         # Find the main panel
@@ -151,12 +215,34 @@ class NuitDelInfoScraper(WebScraper):
         Scrape all available challenges
         Returns: {"challenges": [{"id": "123", "name": "...", "category": "...", "thumbnail": "...", "participants": 123}, ...]}
         """
-        url = "https://www.nuitdelinfo.com/inscription/defis/liste"
+        url = CHALLENGES_URL
         html = self.fetch_page(url)
         
         if not html:
             return {"error": "Failed to fetch page"}
         
+        return self.extract_challenges(html)
+    
+    async def scrape_challenges_async(self) -> Dict:
+        """Async variant of scrape_challenges"""
+        url = CHALLENGES_URL
+        if self.engine == "stream":
+            result = await self.fetch_and_stream_async(url, 'scrape_challenges', lxml_extract.ChallengeListParser)
+        else:
+            result = await self.fetch_and_extract_async(url, 'scrape_challenges', 'extract_challenges')
+        
+        if result is None:
+            return {"error": "Failed to fetch page"}
+        
+        return result
+    
+    def extract_challenges(self, html: str) -> Dict:
+        """Extract the challenge list from the challenge list page"""
+        if self.engine == "stream":
+            return lxml_extract.stream_extract(lxml_extract.ChallengeListParser(), html)
+        if self.engine == "lxml":
+            return lxml_extract.extract_challenges(html)
+        
         soup = self.parse_html(html)
         
         # Find the defiList div
@@ -218,12 +304,34 @@ class NuitDelInfoScraper(WebScraper):
         Scrape details of a specific challenge
         Returns: {"name": "...", "organizer": "...", "theme": "...", "prize": "...", "description": "...", "teams": [...]}
         """
-        url = f"https://www.nuitdelinfo.com/inscription/defis/{challenge_id}"
+        url = challenge_url(challenge_id)
         html = self.fetch_page(url)
         
         if not html:
             return {"error": "Failed to fetch page", "challenge_id": challenge_id}
         
+        return self.extract_challenge_details(html)
+    
+    async def scrape_challenge_details_async(self, challenge_id: str) -> Dict:
+        """Async variant of scrape_challenge_details"""
+        url = challenge_url(challenge_id)
+        if self.engine == "stream":
+            result = await self.fetch_and_stream_async(url, 'scrape_challenge_details', lxml_extract.ChallengeDetailsParser)
+        else:
+            result = await self.fetch_and_extract_async(url, 'scrape_challenge_details', 'extract_challenge_details')
+        
+        if result is None:
+            return {"error": "Failed to fetch page", "challenge_id": challenge_id}
+        
+        return result
+    
+    def extract_challenge_details(self, html: str) -> Dict:
+        """Extract challenge details and participating teams from a challenge page"""
+        if self.engine == "stream":
+            return lxml_extract.stream_extract(lxml_extract.ChallengeDetailsParser(), html)
+        if self.engine == "lxml":
+            return lxml_extract.extract_challenge_details(html)
+        
         soup = self.parse_html(html)
         
         # Find all panel-info divs
@@ -329,4 +437,8 @@ class NuitDelInfoScraper(WebScraper):
     
     def scrape(self, url: str) -> Dict:
         """Default scrape method calls scrape_teams"""
-        return self.scrape_teams(url)
\ No newline at end of file
+        return self.scrape_teams(url)
+    
+    async def scrape_async(self, url: str) -> Dict:
+        """Default async scrape method calls scrape_teams_async"""
+        return await self.scrape_teams_async(url)
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Response Serialization
+Encodes API payloads to JSON bytes (with orjson when it is installed),
+compresses them for clients that accept gzip or brotli, and keeps the
+encoded bodies of scrape results until the result changes, so the hot
+endpoints send ready-made bytes
+
+A body is cached per resource key together with the scrape result it was
+built from; a new result for the key (a new Snapshot data object) makes
+the old body stale, without touching the bodies of other resources.
+Compressed variants are built on first request and kept with the body.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli responses are only offered when installed
+    brotli = None
+
+# Content codings offered, most preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def dumps(payload: Any) -> bytes:
+    """Compact UTF-8 JSON, identical with or without orjson"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    The preferred content coding of ENCODINGS accepted by an Accept-Encoding
+    header (highest q-value first, then our preference); None for identity
+    """
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for coding in ENCODINGS:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class EncodedBody:
+    """A JSON body, its ETag and its compressed variants"""
+
+    __slots__ = ("body", "etag", "_variants")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        # encoding -> compressed body
+        self._variants: Dict[str, bytes] = {}
+
+    def compressible(self, min_bytes: int) -> bool:
+        return len(self.body) >= min_bytes
+
+    def variant(self, encoding: Optional[str], gzip_level: int = 6, brotli_quality: int = 5) -> Tuple[bytes, str]:
+        """(body, ETag) in encoding; each encoding has its own strong ETag"""
+        if encoding is None:
+            return self.body, self.etag
+        content = self._variants.get(encoding)
+        if content is None:
+            if encoding == "br":
+                content = brotli.compress(self.body, quality=brotli_quality)
+            else:
+                content = gzip.compress(self.body, compresslevel=gzip_level, mtime=0)
+            self._variants[encoding] = content
+        return content, f'{self.etag[:-1]}-{encoding}"'
+
+    def etags(self) -> List[str]:
+        """ETags of every variant: any of them identifies this body"""
+        return [self.etag] + [f'{self.etag[:-1]}-{encoding}"' for encoding in ENCODINGS]
+
+    def size(self) -> int:
+        return len(self.body) + sum(len(content) for content in self._variants.values())
+
+
+class BodyCache:
+    """
+    Encoded body per resource key, valid while the key's scrape result is
+    the one it was built from; least recently used bodies are dropped past
+    max_entries
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('RESPONSE_BODY_CACHE_ENTRIES', 4096))
+        self._entries: "OrderedDict[str, Tuple[Any, EncodedBody]]" = OrderedDict()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: str, source: Any) -> Optional[EncodedBody]:
+        """The body of key if it was built from source (the same object)"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] is not source:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, source: Any, body: EncodedBody):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (source, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        """Drop the body of key (its scrape result changed)"""
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def keys(self) -> Iterable[str]:
+        return list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": sum(body.size() for _, body in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "encoder": "orjson" if orjson is not None else "json",
+            "encodings": list(ENCODINGS),
+        }
@@ -0,0 +1,523 @@
+"""
+Snapshot Store
+Materialized scrape results with the time they were fetched, optionally
+persisted to SQLite so a restarted server starts with data
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import time
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from compact import compact, expand, string_pool
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Keep team / challenge results as compact records (see compact)
+COMPACT_SNAPSHOTS = os.getenv('COMPACT_SNAPSHOTS', 'true').lower() in ('true', '1', 'yes')
+
+# A saved snapshot as read from the database: (key, fetched_at, value, max_age); the
+# value is decoded, except in the rows of load()
+SavedRow = Tuple[str, float, Any, Optional[float]]
+
+
+class Snapshot:
+    """
+    A scrape result, the wall-clock time it was fetched and how long it stays fresh
+
+    The result is held in data, as a compact record when it has a known
+    shape; value rebuilds the result dict on every access, so read it once
+    per response. size is measured on first use, unless it was given, and
+    kept by with_max_age() copies.
+    """
+
+    __slots__ = ("data", "fetched_at", "max_age", "_size")
+
+    def __init__(
+        self,
+        value: Any,
+        fetched_at: Optional[float] = None,
+        max_age: Optional[float] = None,
+        size: Optional[int] = None
+    ):
+        self.data = compact(value) if COMPACT_SNAPSHOTS else value
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.max_age = max_age
+        self._size = size
+
+    @property
+    def value(self) -> Any:
+        return expand(self.data)
+
+    @property
+    def size(self) -> int:
+        """Approximate size of the result in bytes, as JSON"""
+        if self._size is None:
+            try:
+                self._size = len(dumps(self.value))
+            except (TypeError, ValueError):
+                self._size = len(repr(self.value))
+        return self._size
+
+    def with_max_age(self, max_age: Optional[float]) -> "Snapshot":
+        """The same result and fetch time, fresh for max_age"""
+        return Snapshot(self.data, self.fetched_at, max_age, self._size)
+
+    def is_error(self) -> bool:
+        """Whether the result is an error result, without rebuilding it"""
+        return isinstance(self.data, dict) and "error" in self.data
+
+    def age(self) -> float:
+        """Seconds since the result was fetched"""
+        return max(0.0, time.time() - self.fetched_at)
+
+    def is_stale(self) -> bool:
+        """Whether the result is older than max_age"""
+        return self.max_age is not None and self.age() > self.max_age
+
+    def headers(self) -> Dict[str, str]:
+        """HTTP headers telling clients how old the data is, and whether it is stale"""
+        fetched = datetime.fromtimestamp(self.fetched_at, tz=timezone.utc)
+        headers = {
+            "Age": str(int(self.age())),
+            "X-Snapshot-Time": fetched.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        if self.is_stale():
+            headers["X-Stale"] = "true"
+        return headers
+
+
+class SnapshotDatabase:
+    """
+    SQLite file holding the latest snapshot per key
+
+    Runs in WAL mode with synchronous=NORMAL: a write is one small
+    transaction that does not wait for fsync, and readers never block it.
+    Several worker processes can share the file: changed_since() lets each
+    pick up the others' writes, and leases let one of them fetch a page
+    while the others wait for its result. The file also holds the change
+    log (see changes), so its versions are shared by all processes.
+
+    Queries from the event loop go through run() / submit(), which execute
+    them in order on one dedicated thread: waiting for another process'
+    write lock never blocks the loop. The busy timeout is short
+    (SNAPSHOT_DB_BUSY_TIMEOUT), so a contended write fails and is logged
+    instead of holding up the queries behind it.
+    """
+
+    def __init__(self, path: str, busy_timeout: Optional[float] = None):
+        self.path = path
+        self.busy_timeout = busy_timeout if busy_timeout is not None else float(os.getenv('SNAPSHOT_DB_BUSY_TIMEOUT', 1))
+        self._connection = sqlite3.connect(
+            path, timeout=self.busy_timeout, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, value TEXT NOT NULL)"
+        )
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(snapshots)")}
+        if "max_age" not in columns:
+            self._connection.execute("ALTER TABLE snapshots ADD COLUMN max_age REAL")
+        if "updated_at" not in columns:
+            self._connection.execute("ALTER TABLE snapshots ADD COLUMN updated_at REAL NOT NULL DEFAULT 0")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS snapshots_updated_at ON snapshots (updated_at)")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        if "failure" not in {row[1] for row in self._connection.execute("PRAGMA table_info(leases)")}:
+            self._connection.execute("ALTER TABLE leases ADD COLUMN failure TEXT")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "version INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, change TEXT NOT NULL)"
+        )
+        self._connection.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-db")
+
+        # Counters
+        self.writes = 0
+        self.write_errors = 0
+
+    def run(self, function: Callable, *args) -> "asyncio.Future":
+        """Run function(*args) on the database thread; await the returned future for its result"""
+        return asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def submit(self, function: Callable, *args) -> Future:
+        """Queue function(*args) on the database thread without waiting for it; errors are logged"""
+        future = self._executor.submit(function, *args)
+        future.add_done_callback(self._log_error)
+        return future
+
+    def save(self, key: str, snapshot: Snapshot):
+        """Insert or replace the snapshot for key"""
+        try:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO snapshots (key, fetched_at, value, max_age, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    snapshot.fetched_at,
+                    json.dumps(snapshot.value, ensure_ascii=False, separators=(",", ":")),
+                    snapshot.max_age,
+                    time.time()
+                )
+            )
+            self.writes += 1
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self.write_errors += 1
+            logger.error(f"Could not persist snapshot {key}: {e}")
+
+    def get(self, key: str) -> Optional[SavedRow]:
+        """Return the saved row for key, if any"""
+        rows = self._rows("SELECT key, fetched_at, value, max_age FROM snapshots WHERE key = ?", (key,))
+        return rows[0] if rows else None
+
+    def load(self) -> List[SavedRow]:
+        """Every saved row, with values left as JSON text (decoding them all takes a while)"""
+        return list(self._connection.execute("SELECT key, fetched_at, value, max_age FROM snapshots"))
+
+    def changed_since(self, updated_at: float) -> List[SavedRow]:
+        """The rows saved at or after updated_at (wall-clock time)"""
+        return self._rows("SELECT key, fetched_at, value, max_age FROM snapshots WHERE updated_at >= ?", (updated_at,))
+
+    def try_lease(self, key: str, owner: str, seconds: float) -> bool:
+        """
+        Claim key for seconds unless another owner holds an unexpired lease
+        on it, or a failure was recorded on it (see fail_lease)
+        """
+        now = time.time()
+        cursor = self._connection.execute(
+            "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at, failure = NULL "
+            "WHERE leases.expires_at < ? OR (leases.owner = excluded.owner AND leases.failure IS NULL)",
+            (key, owner, now + seconds, now)
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, key: str, owner: str):
+        self._connection.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def fail_lease(self, key: str, owner: str, result: Dict, seconds: float):
+        """
+        Turn the lease of owner on key into a record of its failed result,
+        kept for seconds: until then nobody takes the lease and
+        lease_failure() returns the result
+        """
+        self._connection.execute(
+            "UPDATE leases SET failure = ?, expires_at = ? WHERE key = ? AND owner = ?",
+            (json.dumps(result, ensure_ascii=False), time.time() + seconds, key, owner)
+        )
+
+    def lease_failure(self, key: str) -> Optional[Dict]:
+        """The failed result recorded on key by fail_lease(), until it expires"""
+        row = self._connection.execute(
+            "SELECT failure FROM leases WHERE key = ? AND failure IS NOT NULL AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def append_changes(self, changes: List[Dict]) -> List[int]:
+        """Add changes to the change log in one transaction; returns their versions"""
+        now = time.time()
+        versions = []
+        with self._transaction():
+            for change in changes:
+                cursor = self._connection.execute(
+                    "INSERT INTO changes (created_at, change) VALUES (?, ?)",
+                    (now, json.dumps(change, ensure_ascii=False, separators=(",", ":")))
+                )
+                versions.append(cursor.lastrowid)
+        return versions
+
+    def changes_since(self, version: int, limit: int) -> List[Tuple[int, float, Dict]]:
+        """Up to limit (version, created_at, change) rows after version, oldest first"""
+        rows = self._connection.execute(
+            "SELECT version, created_at, change FROM changes WHERE version > ? ORDER BY version LIMIT ?",
+            (version, limit)
+        )
+        return [(row[0], row[1], json.loads(row[2])) for row in rows]
+
+    def change_versions(self) -> Tuple[int, int]:
+        """(oldest, latest) version in the change log, 0 when empty"""
+        oldest, latest = self._connection.execute("SELECT MIN(version), MAX(version) FROM changes").fetchone()
+        if latest is None:
+            # Versions keep counting after the log was pruned empty
+            row = self._connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+            latest = row[0] if row else 0
+            return latest + 1, latest
+        return oldest, latest
+
+    def prune_changes(self, keep: int):
+        """Drop all but the latest keep changes"""
+        self._connection.execute(
+            "DELETE FROM changes WHERE version <= (SELECT MAX(version) FROM changes) - ?", (keep,)
+        )
+
+    def setting(self, key: str, default: str) -> str:
+        """Value stored under key, storing default first if there is none"""
+        self._connection.execute("INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)", (key, default))
+        return self._connection.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()[0]
+
+    def close(self):
+        """Finish the queued queries, then close the connection"""
+        self._executor.shutdown(wait=True)
+        self._connection.close()
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "writes": self.writes,
+            "write_errors": self.write_errors,
+        }
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    def _rows(self, query: str, parameters: Tuple) -> List[SavedRow]:
+        rows = []
+        for key, fetched_at, value, max_age in self._connection.execute(query, parameters):
+            try:
+                rows.append((key, fetched_at, json.loads(value), max_age))
+            except ValueError:
+                logger.warning(f"Skipping unreadable snapshot {key}")
+        return rows
+
+    @staticmethod
+    def _log_error(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Snapshot database query failed: {future.exception()!r}")
+
+
+class SnapshotStore:
+    """
+    Latest snapshot per resource key (upstream URL), never evicted
+
+    With a database, every snapshot is also written to disk (on the
+    database thread, without waiting) and restore() reloads them after a
+    restart. Restored snapshots are flagged until the
+    resource is scraped again, so callers can serve them as stale data
+    while revalidating. A restored snapshot is only decoded, and passed to
+    the listeners, when it is first read or by replay() in the background,
+    so serving starts before the state derived from snapshots is rebuilt.
+    When several processes share the database, sync() picks up the
+    snapshots the others saved.
+    """
+
+    def __init__(self, database: Optional[SnapshotDatabase] = None, max_age: Optional[float] = None):
+        self.database = database
+        self.max_age = max_age
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._restored: Set[str] = set()
+        # Restored rows (values as JSON text) not yet decoded and passed to the listeners
+        self._unreplayed: Dict[str, SavedRow] = {}
+        self.restore_ms: Optional[float] = None
+        self.replay_ms: Optional[float] = None
+        self._synced_at = 0.0
+        self.synced = 0
+        self._listeners: List[Callable[[str, Snapshot, str], Any]] = []
+
+    def get(self, key: str) -> Optional[Snapshot]:
+        """Return the latest snapshot for key, if any"""
+        snapshot = self._snapshots.get(key)
+        if snapshot is None and key in self._unreplayed:
+            snapshot = self._replay(key)
+        return snapshot
+
+    def add_listener(self, listener: Callable[[str, Snapshot, str], Any]):
+        """
+        Call listener(key, snapshot, origin) with every new result; origin is
+        "put" or "persist" for results scraped by this process, "restore" or
+        "sync" for results loaded from the database
+        """
+        self._listeners.append(listener)
+
+    def put(self, key: str, value: Any, fetched_at: Optional[float] = None) -> Snapshot:
+        """Replace the snapshot for key"""
+        if key in self._unreplayed:
+            # Listeners diff against the previous result: give them the restored one first
+            self._replay(key)
+        snapshot = Snapshot(value, fetched_at, self.max_age)
+        self._snapshots[key] = snapshot
+        self._restored.discard(key)
+        if self.database is not None:
+            self.database.submit(self.database.save, key, snapshot)
+        self._notify(key, snapshot, "put")
+        return snapshot
+
+    def persist(self, key: str, snapshot: Snapshot):
+        """
+        Save an on-demand scrape result to disk so it survives a restart
+
+        A background snapshot for key is replaced by the newer result and a
+        restored one is dropped; otherwise the result is not kept in memory.
+        """
+        if key in self._unreplayed:
+            self._replay(key)
+        if key in self._restored:
+            self._snapshots.pop(key, None)
+            self._restored.discard(key)
+        elif key in self._snapshots:
+            self._snapshots[key] = snapshot.with_max_age(self.max_age)
+        if self.database is not None:
+            self.database.submit(self.database.save, key, snapshot)
+        self._notify(key, snapshot, "persist")
+
+    async def saved(self, key: str) -> Optional[Snapshot]:
+        """The snapshot for key in the database (possibly saved by another process), if any"""
+        if self.database is None:
+            return None
+        row = await self.database.run(self.database.get, key)
+        return self._snapshot(row) if row is not None else None
+
+    async def restore(self) -> int:
+        """
+        Load every snapshot saved in the database; returns how many
+
+        Snapshots are decoded and the listeners called as they are read,
+        or by replay(), which should run in the background once the
+        snapshots are being served.
+        """
+        if self.database is None:
+            return 0
+        start = time.perf_counter()
+        self._synced_at = time.time()
+        count = 0
+        for row in await self.database.run(self.database.load):
+            key = row[0]
+            if key not in self._snapshots:
+                self._restored.add(key)
+                self._unreplayed[key] = row
+                count += 1
+        self.restore_ms = round((time.perf_counter() - start) * 1000, 3)
+        logger.info(f"Restored {count} snapshots from {self.database.path} in {self.restore_ms} ms")
+        return count
+
+    async def replay(self, batch_size: int = 50) -> int:
+        """
+        Decode the restored snapshots not read yet and call the listeners
+        with them (origin "restore"), batch_size at a time, letting other
+        tasks run between batches; returns how many were replayed
+        """
+        elapsed = 0.0
+        count = 0
+        while self._unreplayed:
+            start = time.perf_counter()
+            for key in list(itertools.islice(self._unreplayed, batch_size)):
+                self._replay(key)
+                count += 1
+            elapsed += time.perf_counter() - start
+            await asyncio.sleep(0)
+        self.replay_ms = round(elapsed * 1000, 3)
+        if count:
+            logger.info(f"Replayed {count} restored snapshots to the listeners in {self.replay_ms} ms")
+        return count
+
+    async def sync(self) -> int:
+        """
+        Load the snapshots other processes saved since the last sync;
+        returns how many replaced or added an in-memory snapshot
+        """
+        if self.database is None:
+            return 0
+        # Rows saved during the previous query may carry a slightly older time
+        since = self._synced_at - 1.0
+        self._synced_at = time.time()
+        count = 0
+        for row in await self.database.run(self.database.changed_since, since):
+            key, fetched_at = row[0], row[1]
+            current = self.get(key)
+            if current is None or current.fetched_at < fetched_at:
+                snapshot = self._snapshot(row)
+                # Like restored snapshots, until this process scrapes the resource itself
+                self._snapshots[key] = snapshot
+                self._restored.add(key)
+                self._notify(key, snapshot, "sync")
+                count += 1
+        self.synced += count
+        return count
+
+    def is_restored(self, key: str) -> bool:
+        """Whether the snapshot for key was loaded from disk (restored or synced) and not re-scraped since"""
+        return key in self._restored
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self._snapshots) + list(self._unreplayed))
+
+    def __len__(self) -> int:
+        return len(self._snapshots) + len(self._unreplayed)
+
+    def stats(self) -> Dict:
+        """Return the number of snapshots and the age of the oldest one"""
+        now = time.time()
+        ages = [snapshot.age() for snapshot in self._snapshots.values()]
+        ages.extend(max(0.0, now - row[1]) for row in self._unreplayed.values())
+        stats = {
+            "snapshots": len(ages),
+            "oldest_age": round(max(ages), 1) if ages else None,
+            "restored": len(self._restored),
+        }
+        if COMPACT_SNAPSHOTS:
+            stats["compact_pool"] = string_pool.stats()
+        if self.database is not None:
+            stats["database"] = {
+                **self.database.stats(),
+                "restore_ms": self.restore_ms,
+                "replay_ms": self.replay_ms,
+                "unreplayed": len(self._unreplayed),
+                "synced": self.synced,
+            }
+        return stats
+
+    def _snapshot(self, row: SavedRow, size: Optional[int] = None) -> Snapshot:
+        """Snapshot of a saved row; max_age applies to rows saved without one"""
+        _, fetched_at, value, max_age = row
+        return Snapshot(value, fetched_at, max_age if max_age is not None else self.max_age, size)
+
+    def _replay(self, key: str) -> Optional[Snapshot]:
+        """Decode the restored row of key into its snapshot and pass it to the listeners"""
+        row = self._unreplayed.pop(key)
+        try:
+            # The saved JSON is the size: no need to serialize the result again
+            snapshot = self._snapshot((key, row[1], json.loads(row[2]), row[3]), len(row[2].encode("utf-8")))
+        except ValueError:
+            logger.warning(f"Skipping unreadable snapshot {key}")
+            self._restored.discard(key)
+            return None
+        self._snapshots[key] = snapshot
+        self._notify(key, snapshot, "restore")
+        return snapshot
+
+    def _notify(self, key: str, snapshot: Snapshot, origin: str):
+        for listener in self._listeners:
+            try:
+                listener(key, snapshot, origin)
+            except Exception as e:
+                logger.error(f"Snapshot listener failed for {key}: {e}")
+
+
+def open_snapshot_database(path: Optional[str] = None) -> Optional[SnapshotDatabase]:
+    """Open the database at path (default SNAPSHOT_DB_PATH); an empty path disables persistence"""
+    path = path if path is not None else os.getenv('SNAPSHOT_DB_PATH', 'snapshots.db')
+    if not path:
+        return None
+    try:
+        return SnapshotDatabase(path)
+    except sqlite3.Error as e:
+        logger.error(f"Could not open snapshot database {path}: {e}")
+        return None
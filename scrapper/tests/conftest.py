@@ -0,0 +1,14 @@
+"""
+Test setup: the scraper modules are imported from the scrapper directory,
+and the app is configured not to touch the disk or scrape in the background
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SNAPSHOT_DB_PATH", "")
+os.environ.setdefault("HISTORY_PATH", "")
+os.environ.setdefault("SCHEDULER_ENABLED", "False")
+os.environ.setdefault("EXTRACT_PROCESSES", "0")
@@ -0,0 +1,146 @@
+"""
+Response cache: single-flight loads and the keys of the API resources
+"""
+
+import asyncio
+import os
+
+import pytest
+
+import main
+from cache import ResponseCache
+from changes import CHALLENGE_PAGE, TEAM_LIST
+from scrapers import NuitDelInfoScraper, challenge_url
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_concurrent_misses_share_one_load():
+    async def run():
+        cache = ResponseCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": 1}
+
+        results = await asyncio.gather(*(cache.get_or_load("key", loader, ttl=60) for _ in range(5)))
+        return cache, calls, results
+
+    cache, calls, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [{"value": 1}] * 5
+    assert cache.coalesced == 4
+    assert cache.get("key") == {"value": 1}
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    async def run():
+        cache = ResponseCache()
+        release = asyncio.Event()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await release.wait()
+            return "value"
+
+        first = asyncio.create_task(cache.get_or_load("key", loader, ttl=60))
+        second = asyncio.create_task(cache.get_or_load("key", loader, ttl=60))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        value = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return cache, calls, value
+
+    cache, calls, value = asyncio.run(run())
+    assert value == "value"
+    assert len(calls) == 1
+    assert cache.get("key") == "value"
+
+
+def test_load_finishes_when_its_only_caller_is_cancelled():
+    async def run():
+        cache = ResponseCache()
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "value"
+
+        caller = asyncio.create_task(cache.get_or_load("key", loader, ttl=60))
+        await asyncio.sleep(0)
+        caller.cancel()
+        release.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.get("key") == "value"
+    assert cache.stats()["inflight"] == 0
+
+
+def test_failed_load_reaches_every_waiter_and_is_not_cached():
+    async def run():
+        cache = ResponseCache()
+
+        async def loader():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        return cache, await asyncio.gather(
+            *(cache.get_or_load("key", loader, ttl=60) for _ in range(3)), return_exceptions=True
+        )
+
+    cache, results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.get("key") is None
+
+
+@pytest.fixture
+def fake_scraper(monkeypatch):
+    """Scraper returning the fixture pages, counting the scrapes per method"""
+    calls = []
+    extractor = NuitDelInfoScraper("lxml")
+
+    class FakeScraper:
+        async def scrape_teams_async(self, url):
+            calls.append("teams")
+            return extractor.extract_teams(load_fixture("challenge_principal.html"))
+
+        async def scrape_challenge_details_async(self, challenge_id):
+            calls.append("challenge")
+            return extractor.extract_challenge_details(load_fixture("challenge_details.html"))
+
+    monkeypatch.setattr(main, "NuitDelInfoScraper", FakeScraper)
+    main.cache.clear()
+    yield calls
+    main.cache.clear()
+
+
+def test_team_list_and_principal_challenge_page_are_cached_apart(fake_scraper):
+    principal_id = main.PRINCIPAL_CHALLENGE_URL.rsplit("/", 1)[-1]
+
+    async def run():
+        teams = await main.load_teams()
+        challenge = await main.load_challenge_details(principal_id)
+        # Served from the cache this time
+        return teams, challenge, await main.load_teams(), await main.load_challenge_details(principal_id)
+
+    teams, challenge, teams_again, challenge_again = asyncio.run(run())
+    assert fake_scraper == ["teams", "challenge"]
+    assert teams.value != challenge.value
+    assert teams_again.value == teams.value
+    assert challenge_again.value == challenge.value
+    assert main.resource_kind(main.PRINCIPAL_TEAMS_KEY)[0] == TEAM_LIST
+    assert main.resource_kind(challenge_url(principal_id))[0] == CHALLENGE_PAGE
@@ -0,0 +1,181 @@
+"""
+Change feed: diffs between scrape results, cursors and paging
+"""
+
+import asyncio
+
+import pytest
+
+from changes import CHALLENGE_PAGE, TEAM_LIST, TEAM_PAGE, ChangeLog, diff, entities
+from snapshot import SnapshotDatabase
+
+KEY = "teams:https://example.com/challenge"
+
+
+def team_list(*teams):
+    return {"teams": [{"id": team_id, "name": name} for team_id, name in teams]}
+
+
+def by_id(changes):
+    return {change["id"]: change for change in changes}
+
+
+def test_diff_of_a_list_reports_added_removed_and_modified_entities():
+    old = entities(TEAM_LIST, None, team_list(("1", "Alpha"), ("2", "Beta")))
+    new = entities(TEAM_LIST, None, team_list(("1", "Alpha"), ("2", "Bêta"), ("3", "Gamma")))
+    assert diff(TEAM_LIST, old, new) == [
+        {"entity": "team", "kind": TEAM_LIST, "id": "2", "op": "modified", "fields": {"name": "Bêta"}},
+        {"entity": "team", "kind": TEAM_LIST, "id": "3", "op": "added", "fields": {"name": "Gamma"}},
+    ]
+    assert diff(TEAM_LIST, new, old) == [
+        {"entity": "team", "kind": TEAM_LIST, "id": "2", "op": "modified", "fields": {"name": "Beta"}},
+        {"entity": "team", "kind": TEAM_LIST, "id": "3", "op": "removed", "fields": None},
+    ]
+    assert diff(TEAM_LIST, new, new) == []
+
+
+def test_diff_of_a_page_only_reports_modified_fields():
+    page = {"name": "Alpha", "members": [{"name": "Ada"}], "selectedchall": [], "ignored": 1}
+    first = diff(TEAM_PAGE, None, entities(TEAM_PAGE, "1", page))
+    # A page's entity is never added: list pages decide which entities exist
+    assert first == [{
+        "entity": "team", "kind": TEAM_PAGE, "id": "1", "op": "modified",
+        "fields": {"name": "Alpha", "members": [{"name": "Ada"}], "selectedchall": []},
+    }]
+    old = entities(TEAM_PAGE, "1", page)
+    new = entities(TEAM_PAGE, "1", {**page, "members": [], "ignored": 2})
+    assert diff(TEAM_PAGE, old, new) == [
+        {"entity": "team", "kind": TEAM_PAGE, "id": "1", "op": "modified", "fields": {"members": []}},
+    ]
+    # Missing from a page is not a removal
+    assert diff(CHALLENGE_PAGE, entities(CHALLENGE_PAGE, "9", {"name": "Defi"}), {}) == []
+
+
+@pytest.fixture(params=["memory", "database"])
+def change_log(request, tmp_path):
+    if request.param == "memory":
+        yield lambda **options: ChangeLog(**options)
+        return
+    databases = []
+
+    def open_log(**options):
+        databases.append(SnapshotDatabase(str(tmp_path / "snapshots.db")))
+        return ChangeLog(databases[-1], **options)
+
+    yield open_log
+    for database in databases:
+        database.close()
+
+
+async def settle(log: ChangeLog):
+    """Wait for the changes being written to the database"""
+    while log._writes:
+        await asyncio.gather(*log._writes)
+
+
+def test_changes_since_a_cursor(change_log):
+    async def run():
+        log = change_log()
+        start = (await log.since(None, 10))["cursor"]
+        log.observe(KEY, TEAM_LIST, None, team_list(("1", "Alpha"), ("2", "Beta")))
+        await settle(log)
+        log.observe(KEY, TEAM_LIST, None, team_list(("1", "Alpha"), ("3", "Gamma")))
+        await settle(log)
+
+        page = await log.since(start, 10)
+        assert not page["reset"] and not page["more"]
+        assert [(change["id"], change["op"]) for change in page["changes"]] == [
+            ("1", "added"), ("2", "added"), ("3", "added"), ("2", "removed"),
+        ]
+        assert [change["version"] for change in page["changes"]] == [1, 2, 3, 4]
+        assert page["cursor"] == log.cursor(4)
+        # Nothing new after the last cursor
+        assert await log.since(page["cursor"], 10) == {
+            "cursor": page["cursor"], "changes": [], "more": False, "reset": False,
+        }
+        # Results loaded from the database are not changes
+        log.observe(KEY, TEAM_LIST, None, team_list(("4", "Delta")), record=False)
+        await settle(log)
+        assert (await log.since(page["cursor"], 10))["changes"] == []
+
+    asyncio.run(run())
+
+
+def test_changes_are_paged(change_log):
+    async def run():
+        log = change_log()
+        cursor = log.cursor()
+        log.observe(KEY, TEAM_LIST, None, team_list(*((str(i), f"Team {i}") for i in range(5))))
+        await settle(log)
+
+        seen = []
+        pages = 0
+        while True:
+            page = await log.since(cursor, 2)
+            pages += 1
+            seen += [change["id"] for change in page["changes"]]
+            cursor = page["cursor"]
+            if not page["more"]:
+                break
+        assert pages == 3
+        assert sorted(seen) == ["0", "1", "2", "3", "4"]
+        assert len(set(seen)) == 5
+
+    asyncio.run(run())
+
+
+def test_unusable_cursors_reset(change_log):
+    async def run():
+        log = change_log(max_entries=3)
+        cursor = log.cursor()
+        log.observe(KEY, TEAM_LIST, None, team_list(("1", "Alpha")))
+        await settle(log)
+        latest = log.cursor()
+
+        for stale in (
+            None,
+            "",
+            "garbage",
+            f"{log.epoch}:x",
+            # From another epoch: the log started over
+            f"other:{latest.split(':')[1]}",
+            # Ahead of the log
+            log.cursor(99),
+        ):
+            page = await log.since(stale, 10)
+            assert page["reset"], stale
+            assert page["changes"] == [] and page["cursor"] == latest
+        assert not (await log.since(cursor, 10))["reset"]
+
+        # Changes after cursor no longer all kept
+        log.observe(KEY, TEAM_LIST, None, team_list(*((str(i), "Team") for i in range(2, 10))))
+        await settle(log)
+        if log.database is not None:
+            log.database.prune_changes(3)
+        page = await log.since(cursor, 10)
+        assert page["reset"] and page["cursor"] == log.cursor()
+
+    asyncio.run(run())
+
+
+def test_cursor_survives_a_restart_with_the_database(tmp_path):
+    path = str(tmp_path / "snapshots.db")
+
+    async def record():
+        database = SnapshotDatabase(path)
+        log = ChangeLog(database)
+        log.observe(KEY, TEAM_LIST, None, team_list(("1", "Alpha")))
+        await settle(log)
+        database.close()
+        return log.cursor()
+
+    cursor = asyncio.run(record())
+    database = SnapshotDatabase(path)
+    try:
+        restarted = ChangeLog(database)
+        page = asyncio.run(restarted.since(cursor, 10))
+        assert not page["reset"] and page["cursor"] == cursor
+    finally:
+        database.close()
+    # Without the database, the log starts over with a new epoch
+    assert asyncio.run(ChangeLog().since(cursor, 10))["reset"]
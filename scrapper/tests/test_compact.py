@@ -0,0 +1,93 @@
+"""
+Compact records: expand(compact(result)) gives back the exact scrape result
+"""
+
+import json
+import os
+
+import pytest
+
+from compact import ChallengeRecord, StringPool, TeamListRecord, TeamRecord, compact, expand
+from scrapers import NuitDelInfoScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def extraction_results():
+    extractor = NuitDelInfoScraper("lxml")
+    return {
+        "team_list": extractor.extract_teams(load_fixture("challenge_principal.html")),
+        "team": extractor.extract_team_details(load_fixture("team_details.html"), "1"),
+        "challenges": extractor.extract_challenges(load_fixture("challenge_list.html")),
+        "challenge": extractor.extract_challenge_details(load_fixture("challenge_details.html")),
+    }
+
+
+RESULTS = extraction_results()
+
+
+def same(first, second) -> bool:
+    """Equal, with the same key order (the order responses are serialized in)"""
+    return json.dumps(first, ensure_ascii=False) == json.dumps(second, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("name, record_type", [
+    ("team_list", TeamListRecord),
+    ("team", TeamRecord),
+    ("challenge", ChallengeRecord),
+    # Not stored as a record
+    ("challenges", dict),
+])
+def test_fixture_results_round_trip(name, record_type):
+    result = RESULTS[name]
+    compacted = compact(result, StringPool())
+    assert type(compacted) is record_type
+    assert same(expand(compacted), result)
+    # Records are not compacted twice
+    assert compact(compacted) is compacted
+
+
+def test_challenge_without_logo_round_trips():
+    result = {key: value for key, value in RESULTS["challenge"].items() if key != "logo"}
+    compacted = compact(result, StringPool())
+    assert isinstance(compacted, ChallengeRecord)
+    assert same(expand(compacted), result)
+
+
+@pytest.mark.parametrize("link_id", ["42", "0", "007", "-1", "abc", "٣", None])
+def test_link_ids_round_trip(link_id):
+    result = {"teams": [{"id": link_id, "name": "Team"}], "total": 1, "status": "success"}
+    assert same(expand(compact(result, StringPool())), result)
+
+
+@pytest.mark.parametrize("result", [
+    {"status": "error", "error": "Failed to fetch page"},
+    {"name": "Team", "members": ["Ada"], "status": "success"},
+    {"name": "Team", "members": ["Ada", None], "selectedchall": [], "status": "success"},
+    {"name": "Team", "members": [], "selectedchall": [{"name": "x", "id": "1"}], "status": "success"},
+    {"teams": [], "total": 3, "status": "success"},
+    ["not", "a", "dict"],
+])
+def test_other_shapes_are_kept_as_they_are(result):
+    assert compact(result, StringPool()) is result
+
+
+def test_pool_shares_strings_and_links():
+    pool = StringPool()
+    first = compact(RESULTS["team_list"], pool)
+    second = compact(json.loads(json.dumps(RESULTS["team_list"])), pool)
+    assert all(a is b for a, b in zip(first.teams, second.teams))
+    team = compact({"name": "Team", "members": [], "selectedchall": first.to_json()["teams"][:1], "status": "success"}, pool)
+    assert team.challenges[0] is first.teams[0]
+
+
+def test_full_pool_is_cleared_without_changing_results():
+    pool = StringPool(max_entries=10)
+    compacted = compact(RESULTS["team_list"], pool)
+    assert pool.clears > 0
+    assert same(expand(compacted), RESULTS["team_list"])
@@ -0,0 +1,170 @@
+"""
+Event crawler: page dedup, checkpoints and resuming an interrupted crawl
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from crawl import Crawler, JsonLinesWriter, ParquetWriter, linked_keys
+from scraper_base import page_states
+
+# challenges -> challenge pages -> their teams -> the challenges teams selected
+CHALLENGE_TEAMS = {"10": ["1", "2"], "11": ["2", "3"], "12": ["3"]}
+TEAM_CHALLENGES = {"1": ["10", "12"], "2": ["10", "11"], "3": ["11"]}
+ALL_PAGES = {"challenges"} | {f"challenge:{i}" for i in CHALLENGE_TEAMS} | {f"team:{i}" for i in TEAM_CHALLENGES}
+
+
+class FakeScraper:
+    """Serves the event graph above; interrupt_on raises KeyboardInterrupt when that page is crawled"""
+
+    def __init__(self, interrupt_on=None, fail_on=None):
+        self.interrupt_on = interrupt_on
+        self.fail_on = fail_on
+        self.calls = []
+
+    def _call(self, key):
+        self.calls.append(key)
+        if key == self.interrupt_on:
+            raise KeyboardInterrupt
+
+    async def scrape_challenges_async(self):
+        self._call("challenges")
+        # Challenge 12 is only linked from team 1
+        return {"challenges": [{"id": "10", "name": "A"}, {"id": "11", "name": "B"}], "status": "success"}
+
+    async def scrape_challenge_details_async(self, challenge_id):
+        self._call(f"challenge:{challenge_id}")
+        teams = [{"id": team_id, "name": f"Team {team_id}"} for team_id in CHALLENGE_TEAMS[challenge_id]]
+        return {"name": challenge_id, "teams": teams, "status": "success"}
+
+    async def scrape_team_details_async(self, team_id):
+        key = f"team:{team_id}"
+        self._call(key)
+        if key == self.fail_on:
+            return {"error": "Failed to fetch page"}
+        challenges = [{"id": challenge_id, "name": challenge_id} for challenge_id in TEAM_CHALLENGES[team_id]]
+        return {"name": team_id, "members": [], "selectedchall": challenges, "status": "success"}
+
+
+@pytest.fixture(autouse=True)
+def keep_page_states(monkeypatch):
+    # The crawler turns page states off for the whole process
+    monkeypatch.setattr(page_states, "enabled", page_states.enabled)
+
+
+def crawl(tmp_path, scraper, resume=False, interval=30.0):
+    output = str(tmp_path / "event.jsonl")
+    crawler = Crawler(JsonLinesWriter(output), f"{output}.checkpoint", concurrency=2, checkpoint_interval=interval)
+    crawler.scraper = scraper
+    return crawler, asyncio.run(crawler.run(resume=resume))
+
+
+def rows(tmp_path):
+    with open(tmp_path / "event.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def row_keys(records):
+    return [record["type"] if record["id"] is None else f"{record['type']}:{record['id']}" for record in records]
+
+
+def test_linked_keys():
+    assert linked_keys("challenges", {"challenges": [{"id": "1"}, {"id": None}]}) == ["challenge:1"]
+    assert linked_keys("challenge:1", {"teams": [{"id": "7"}]}) == ["team:7"]
+    assert linked_keys("team:7", {"selectedchall": [{"id": "1"}, {}]}) == ["challenge:1"]
+
+
+def test_every_page_is_crawled_once(tmp_path):
+    scraper = FakeScraper()
+    crawler, summary = crawl(tmp_path, scraper)
+    assert sorted(scraper.calls) == sorted(ALL_PAGES)
+    keys = row_keys(rows(tmp_path))
+    assert sorted(keys) == sorted(ALL_PAGES)
+    assert summary["pages"] == len(ALL_PAGES)
+    assert summary["fetched"] == {"challenges": 1, "challenge": 3, "team": 3}
+    # 12 links to 6 distinct pages
+    assert summary["duplicates_skipped"] == 12 - 6
+    assert summary["pending"] == 0 and summary["failed"] == {}
+
+
+def test_failed_pages_are_reported_and_not_written(tmp_path):
+    crawler, summary = crawl(tmp_path, FakeScraper(fail_on="team:3"))
+    assert summary["failed"] == {"team:3": "Failed to fetch page"}
+    assert "team:3" not in row_keys(rows(tmp_path))
+    # Challenge 11 is still reached through team 2
+    assert "challenge:11" in row_keys(rows(tmp_path))
+
+
+def test_interrupted_crawl_resumes_without_duplicates(tmp_path):
+    first = FakeScraper(interrupt_on="team:2")
+    with pytest.raises(KeyboardInterrupt):
+        crawl(tmp_path, first)
+    assert os.path.exists(tmp_path / "event.jsonl.checkpoint")
+    written = set(row_keys(rows(tmp_path)))
+    assert written and "team:2" not in written
+
+    second = FakeScraper()
+    crawler, summary = crawl(tmp_path, second, resume=True)
+    # Only what the first run did not finish
+    assert set(second.calls) == ALL_PAGES - written
+    keys = row_keys(rows(tmp_path))
+    assert sorted(keys) == sorted(ALL_PAGES)
+    assert summary["pages"] == len(ALL_PAGES)
+
+
+def test_rows_written_after_the_last_checkpoint_are_crawled_again(tmp_path, monkeypatch):
+    # Two checkpoints, then none until the process dies (as with kill -9)
+    checkpoints = []
+
+    def checkpoint(self):
+        if len(checkpoints) < 2:
+            checkpoints.append(self)
+            original(self)
+
+    original = Crawler.checkpoint
+    monkeypatch.setattr(Crawler, "checkpoint", checkpoint)
+    with pytest.raises(KeyboardInterrupt):
+        crawl(tmp_path, FakeScraper(interrupt_on="team:2"), interval=0)
+    monkeypatch.setattr(Crawler, "checkpoint", original)
+    with open(tmp_path / "event.jsonl.checkpoint", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    done = set(checkpoint["done"])
+    assert len(rows(tmp_path)) > len(done)
+    assert os.path.getsize(tmp_path / "event.jsonl") > checkpoint["output"]["bytes"]
+
+    second = FakeScraper()
+    crawl(tmp_path, second, resume=True)
+    assert set(second.calls) == ALL_PAGES - done
+    assert sorted(row_keys(rows(tmp_path))) == sorted(ALL_PAGES)
+
+
+def test_resume_rejects_other_checkpoint_versions(tmp_path):
+    with open(tmp_path / "event.jsonl.checkpoint", "w", encoding="utf-8") as f:
+        json.dump({"version": 99}, f)
+    with pytest.raises(ValueError):
+        crawl(tmp_path, FakeScraper(), resume=True)
+
+
+def test_parquet_output_resumes_without_duplicates(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    output = str(tmp_path / "parquet")
+    os.makedirs(output)
+    with open(os.path.join(output, "README.txt"), "w") as f:
+        f.write("not a part")
+
+    def run(scraper, resume):
+        crawler = Crawler(ParquetWriter(output, batch_rows=2), f"{output}.checkpoint", concurrency=2, checkpoint_interval=0)
+        crawler.scraper = scraper
+        return asyncio.run(crawler.run(resume=resume))
+
+    with pytest.raises(KeyboardInterrupt):
+        run(FakeScraper(interrupt_on="team:2"), False)
+    run(FakeScraper(), True)
+    table = parquet.read_table(output)
+    keys = [kind if page_id is None else f"{kind}:{page_id}" for kind, page_id in zip(table["type"].to_pylist(), table["id"].to_pylist())]
+    assert sorted(keys) == sorted(ALL_PAGES)
+    # Files that are not parts are left alone
+    assert os.path.exists(os.path.join(output, "README.txt"))
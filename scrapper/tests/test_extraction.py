@@ -0,0 +1,62 @@
+"""
+Extraction engines: lxml and stream return exactly what bs4 returns for
+the saved fixture pages
+"""
+
+import json
+import os
+
+import pytest
+
+import lxml_extract
+from scrapers import NuitDelInfoScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+# Fixture file -> (extract method, extra arguments)
+PAGES = {
+    "challenge_principal.html": ("extract_teams", ()),
+    "team_details.html": ("extract_team_details", ("28",)),
+    "challenge_list.html": ("extract_challenges", ()),
+    "challenge_details.html": ("extract_challenge_details", ()),
+}
+
+# Pages the stream engine parses while they download
+STREAM_PARSERS = {
+    "challenge_list.html": lxml_extract.ChallengeListParser,
+    "challenge_details.html": lxml_extract.ChallengeDetailsParser,
+}
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def extract(engine: str, name: str, html: str) -> str:
+    """Result of engine for fixture name as JSON, so key order is compared too"""
+    method, args = PAGES[name]
+    return json.dumps(getattr(NuitDelInfoScraper(engine), method)(html, *args), ensure_ascii=False)
+
+
+@pytest.mark.parametrize("engine", ["lxml", "stream"])
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_engine_matches_bs4(engine, name):
+    html = load_fixture(name)
+    expected = extract("bs4", name, html)
+    assert json.loads(expected)
+    assert extract(engine, name, html) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000, 65536])
+@pytest.mark.parametrize("name", sorted(STREAM_PARSERS))
+def test_stream_parser_does_not_depend_on_chunk_boundaries(name, chunk_size):
+    html = load_fixture(name)
+    result = lxml_extract.stream_extract(STREAM_PARSERS[name](), html, chunk_size=chunk_size)
+    assert json.dumps(result, ensure_ascii=False) == extract("bs4", name, html)
+
+
+@pytest.mark.parametrize("engine", NuitDelInfoScraper.ENGINES)
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_engines_agree_on_an_empty_page(engine, name):
+    assert extract(engine, name, "") == extract("bs4", name, "")
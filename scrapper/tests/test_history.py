@@ -0,0 +1,130 @@
+"""
+History: downsampling, the on-disk segment (flush and reload) and compaction
+"""
+
+import asyncio
+import os
+import time
+
+from history import History, downsample
+
+NOW = 1_700_000_000.0
+
+
+def test_downsample_min_max_last_per_bucket():
+    times = [10.0, 15.0, 25.0, 26.0]
+    values = [1, 5, 3, 4]
+    result = downsample(times, values, 0.0, 40.0, 10.0, now=100.0)
+    # Nothing before the first point; the value in effect when a bucket
+    # starts counts towards it (5 in the third bucket)
+    assert result["min"] == [None, 1, 3, 4]
+    assert result["max"] == [None, 5, 5, 4]
+    assert result["last"] == [None, 5, 4, 4]
+
+
+def test_downsample_leaves_buckets_after_now_empty():
+    result = downsample([0.0], [7], 0.0, 40.0, 10.0, now=15.0)
+    assert result["last"] == [7, 7, None, None]
+
+
+def test_unchanged_values_are_not_recorded(tmp_path):
+    history = History(str(tmp_path / "history.bin"))
+    assert history.record("event:teams", NOW, 10)
+    assert not history.record("event:teams", NOW + 1, 10)
+    # Older than the last point
+    assert not history.record("event:teams", NOW - 1, 11)
+    assert history.record("event:teams", NOW + 2, 11)
+    assert history.stats()["pending"] == 2
+
+
+def test_points_survive_flush_and_reload(tmp_path):
+    path = str(tmp_path / "history.bin")
+
+    async def run():
+        history = History(path, max_points=100, retention=0)
+        for i in range(10):
+            history.record("team:1:members", NOW + i, i)
+            history.record("team:2:members", NOW + i, 100 + i % 2)
+            if i % 3 == 0:
+                await history.flush()
+        await history.flush()
+
+        reloaded = History(path, max_points=100, retention=0)
+        count = await reloaded.load()
+        query = await reloaded.query(["team:1:members", "team:2:members"], NOW, NOW + 10, 1)
+        return count, reloaded, query
+
+    count, reloaded, query = asyncio.run(run())
+    assert count == 20
+    assert reloaded.names(["team:*:members"]) == ["team:1:members", "team:2:members"]
+    assert query["team:1:members"]["last"] == list(range(10))
+    assert query["team:2:members"]["last"] == [100 + i % 2 for i in range(10)]
+
+
+def test_ranges_older_than_memory_are_read_from_disk(tmp_path):
+    path = str(tmp_path / "history.bin")
+
+    async def run():
+        history = History(path, max_points=4, retention=0)
+        for i in range(20):
+            history.record("event:teams", NOW + i, i)
+            history.record("event:other", NOW + i, -i)
+            await history.flush()
+        query = await history.query(["event:teams"], NOW, NOW + 20, 1)
+        return history, query
+
+    history, query = asyncio.run(run())
+    assert len(history._series["event:teams"].times) < 20
+    assert query["event:teams"]["last"] == list(range(20))
+    assert history.disk_reads == 1
+
+
+def test_reload_keeps_the_latest_points_in_memory(tmp_path):
+    path = str(tmp_path / "history.bin")
+
+    async def run():
+        history = History(path, max_points=4, retention=0)
+        for i in range(20):
+            history.record("event:teams", NOW + i, i)
+        await history.flush()
+        reloaded = History(path, max_points=4, retention=0)
+        await reloaded.load()
+        return reloaded, await reloaded.query(["event:teams"], NOW, NOW + 20, 1)
+
+    reloaded, query = asyncio.run(run())
+    assert list(reloaded._series["event:teams"].values) == [16, 17, 18, 19]
+    assert query["event:teams"]["last"] == list(range(20))
+
+
+def test_compaction_drops_points_older_than_retention(tmp_path):
+    path = str(tmp_path / "history.bin")
+
+    async def run():
+        history = History(path, max_points=100, retention=100)
+        now = time.time()
+        for i in range(10):
+            # 50 seconds apart: points 0-7 are older than the retention
+            history.record("event:teams", now - 450 + 50 * i, i)
+            history.record("event:old", now - 1000 + i, i)
+            await history.flush()
+        size = os.path.getsize(path)
+        dropped = await history.compact()
+        again = await history.compact()
+
+        # Another worker appending to the compacted segment
+        other = History(path, max_points=100, retention=100)
+        other.record("event:teams", now + 1, 42)
+        await other.flush()
+
+        reloaded = History(path, max_points=100, retention=100)
+        await reloaded.load()
+        return size, dropped, again, reloaded
+
+    size, dropped, again, reloaded = asyncio.run(run())
+    # event:teams keeps 8 (the value in effect at the cutoff), 9 and the appended 42;
+    # event:old keeps its last value
+    assert dropped == 7 + 9
+    assert again == 0
+    assert os.path.getsize(path) < size
+    assert list(reloaded._series["event:teams"].values) == [7, 8, 9, 42]
+    assert list(reloaded._series["event:old"].values) == [9]
@@ -0,0 +1,115 @@
+"""
+Data index: name search, team / challenge links and re-scraped pages
+"""
+
+import pytest
+
+from index import CHALLENGE, MEMBER, TEAM, DataIndex, NameIndex, normalize
+
+
+def test_normalize_folds_case_accents_and_spaces():
+    assert normalize("  Équipe   ÉTÉ ") == "equipe ete"
+    assert normalize("Straße") == "strasse"
+
+
+def test_name_index_replaces_and_removes_names():
+    names = NameIndex()
+    names.set((TEAM, "1"), "Les Hiboux")
+    assert names.search("hib") == [(TEAM, "1")]
+    names.set((TEAM, "1"), "Les Chouettes")
+    assert names.search("hib") == []
+    assert names.search("chouette") == [(TEAM, "1")]
+    names.remove((TEAM, "1"))
+    assert names.search("chouette") == [] and len(names) == 0
+    assert not names._trigrams
+
+
+@pytest.fixture
+def index():
+    index = DataIndex()
+    index.update_team_list("principal", [
+        {"id": "1", "name": "Les Hiboux"},
+        {"id": "2", "name": "Hibou"},
+        {"id": "3", "name": "Les Grands Hiboux de Nuit"},
+    ])
+    index.update_challenges([
+        {"id": "10", "name": "Défi Accessibilité", "participants": 4},
+        {"id": "11", "name": "Éco-conception"},
+    ])
+    index.update_team("1", {
+        "name": "Les Hiboux",
+        "members": ["Zoé Martin", "Léo"],
+        "selectedchall": [{"id": "10", "name": "Défi Accessibilité"}, {"id": "11", "name": "Éco-conception"}],
+    })
+    index.update_team("2", {"name": "Hibou", "members": ["zoe martin"], "selectedchall": []})
+    return index
+
+
+def test_search_folds_case_and_accents(index):
+    assert [result["id"] for result in index.search("ACCESSIBILITE")] == ["10"]
+    assert [result["id"] for result in index.search("eco")] == ["11"]
+    # One member, whichever way the name is written
+    assert index.search("zoé MARTIN") == [{"type": MEMBER, "name": "Zoé Martin", "teams": ["1", "2"]}]
+
+
+def test_search_ranks_exact_then_prefix_then_shortest(index):
+    assert [result["name"] for result in index.search("hibou")] == [
+        "Hibou",
+        "Les Hiboux",
+        "Les Grands Hiboux de Nuit",
+    ]
+    assert [result["name"] for result in index.search("les")] == ["Les Hiboux", "Les Grands Hiboux de Nuit"]
+    assert len(index.search("hibou", limit=2)) == 2
+    assert index.search("hibou", kinds={CHALLENGE}) == []
+
+
+def test_short_queries_scan_every_name(index):
+    assert {result["name"] for result in index.search("éo")} == {"Léo"}
+    assert [result["name"] for result in index.search("h")] == ["Hibou", "Les Hiboux", "Les Grands Hiboux de Nuit"]
+    assert index.search("") == [] and index.search("   ") == []
+    assert index.search("xyz") == []
+
+
+def test_links_are_kept_in_both_directions(index):
+    index.update_challenge("10", {"name": "Défi Accessibilité", "teams": [{"id": "3", "name": "Les Grands Hiboux de Nuit"}]})
+    # Team 1 selected the challenge on its page, team 3 is listed on the challenge page
+    assert [team["id"] for team in index.challenge_teams("10")] == ["3", "1"]
+    # Unnamed challenges (the principal one, known only by its team list) last
+    assert [challenge["id"] for challenge in index.team_challenges("3")] == ["10", "principal"]
+    assert [challenge["id"] for challenge in index.team_challenges("1")] == ["10", "11", "principal"]
+
+
+def test_rescraped_team_page_drops_members_and_challenges(index):
+    index.update_team("1", {
+        "name": "Les Hiboux",
+        "members": ["Zoé Martin"],
+        "selectedchall": [{"id": "11", "name": "Éco-conception"}],
+    })
+    assert index.member("Léo") is None
+    assert index.search("leo") == []
+    assert [team["id"] for team in index.member("zoe martin")["teams"]] == ["2", "1"]
+    assert [challenge["id"] for challenge in index.team_challenges("1")] == ["11", "principal"]
+    assert index.challenge_teams("10") == []
+    assert "10" not in index._teams_by_team_pages
+
+    # The last team of a member drops them too
+    index.update_team("2", {"name": "Hibou", "members": [], "selectedchall": []})
+    index.update_team("1", {"name": "Les Hiboux", "members": [], "selectedchall": []})
+    assert index.member("Zoé Martin") is None
+    assert index.stats()["members"] == 0
+
+
+def test_rescraped_challenge_page_drops_teams(index):
+    index.update_challenge("11", {"name": "Éco-conception", "teams": [{"id": "2"}, {"id": "3"}]})
+    index.update_challenge("11", {"name": "Éco-conception", "teams": [{"id": "3"}]})
+    # Team 1 still selected it on its own page
+    assert [team["id"] for team in index.challenge_teams("11")] == ["3", "1"]
+    assert [challenge["id"] for challenge in index.team_challenges("2")] == ["principal"]
+    assert index._challenges_by_challenge_pages["2"] == {"principal"}
+
+
+def test_renamed_team_is_found_by_its_new_name(index):
+    index.update_team_list("principal", [{"id": "2", "name": "Chouette"}])
+    assert index.team("2")["name"] == "Chouette"
+    assert [result["id"] for result in index.search("chouette")] == ["2"]
+    assert [result["id"] for result in index.search("hibou", kinds={TEAM})] == ["1", "3"]
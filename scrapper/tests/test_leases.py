@@ -0,0 +1,157 @@
+"""
+Coordination between worker processes: fetch leases in the snapshot
+database and the leader lock file
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import main
+from leader import LeaderElection
+from snapshot import SnapshotDatabase, SnapshotStore
+
+KEY = "https://example.com/team/1"
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """Two connections to the same database, as two workers would have"""
+    path = str(tmp_path / "snapshots.db")
+    first, second = SnapshotDatabase(path), SnapshotDatabase(path)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_lease_is_exclusive_until_released(databases):
+    first, second = databases
+    assert first.try_lease(KEY, "a", 30)
+    assert not second.try_lease(KEY, "b", 30)
+    # The holder can renew it
+    assert first.try_lease(KEY, "a", 30)
+    first.release_lease(KEY, "a")
+    assert second.try_lease(KEY, "b", 30)
+
+
+def test_expired_lease_can_be_taken(databases):
+    first, second = databases
+    assert first.try_lease(KEY, "a", 0.05)
+    time.sleep(0.1)
+    assert second.try_lease(KEY, "b", 30)
+
+
+def test_failed_lease_blocks_everyone_until_it_expires(databases):
+    first, second = databases
+    assert first.try_lease(KEY, "a", 30)
+    first.fail_lease(KEY, "a", {"error": "Failed to fetch page"}, 0.2)
+    assert second.lease_failure(KEY) == {"error": "Failed to fetch page"}
+    assert not second.try_lease(KEY, "b", 30)
+    assert not first.try_lease(KEY, "a", 30)
+    time.sleep(0.25)
+    assert second.lease_failure(KEY) is None
+    assert second.try_lease(KEY, "b", 30)
+    assert second.lease_failure(KEY) is None
+
+
+@pytest.fixture
+def shared_store(tmp_path, monkeypatch):
+    """main.snapshots on a database file, plus a connection of another worker"""
+    path = str(tmp_path / "snapshots.db")
+    store = SnapshotStore(SnapshotDatabase(path), max_age=60)
+    other = SnapshotDatabase(path)
+    monkeypatch.setattr(main, "snapshots", store)
+    yield store, other
+    store.database.close()
+    other.close()
+
+
+def test_waiters_get_the_failure_of_the_lease_holder(shared_store):
+    store, other = shared_store
+    scrapes = []
+
+    async def scrape():
+        scrapes.append(1)
+        return {"name": "scraped"}
+
+    async def run():
+        assert other.try_lease(KEY, "other-worker", 30)
+        waiters = [asyncio.create_task(main.load_shared(KEY, scrape, 60)) for _ in range(3)]
+        await asyncio.sleep(0.1)
+        other.fail_lease(KEY, "other-worker", {"error": "Failed to fetch page"}, 5)
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(run())
+    assert scrapes == []
+    assert [snapshot.value for snapshot in results] == [{"error": "Failed to fetch page"}] * 3
+
+
+def test_failed_scrape_is_not_repeated_during_the_backoff(shared_store):
+    store, other = shared_store
+    scrapes = []
+
+    async def scrape():
+        scrapes.append(1)
+        return {"error": "Failed to fetch page"}
+
+    async def run():
+        first = await main.load_shared(KEY, scrape, 60)
+        second = await main.load_shared(KEY, scrape, 60)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(scrapes) == 1
+    assert first.value == second.value == {"error": "Failed to fetch page"}
+    assert other.lease_failure(KEY) == {"error": "Failed to fetch page"}
+
+
+def test_successful_scrape_is_shared_and_releases_the_lease(shared_store):
+    store, other = shared_store
+
+    async def scrape():
+        return {"name": "scraped"}
+
+    async def run():
+        return await main.load_shared(KEY, scrape, 60)
+
+    assert asyncio.run(run()).value == {"name": "scraped"}
+    # Waits for the queued save and release
+    store.database.submit(lambda: None).result()
+    assert other.get(KEY)[2] == {"name": "scraped"}
+    assert other.try_lease(KEY, "other-worker", 30)
+
+
+def test_one_leader_per_lock_file(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    first, second = LeaderElection(path), LeaderElection(path)
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    asyncio.run(first.stop())
+    assert second.try_acquire()
+    asyncio.run(second.stop())
+
+
+def test_leader_lock_is_held_across_processes(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    holder = subprocess.Popen(
+        [sys.executable, "-c", (
+            "import sys; from leader import LeaderElection; "
+            f"election = LeaderElection({path!r}); print(election.try_acquire(), flush=True); sys.stdin.read()"
+        )],
+        cwd=os.path.dirname(os.path.abspath(main.__file__)),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "True"
+        election = LeaderElection(path)
+        assert not election.try_acquire()
+    finally:
+        holder.stdin.close()
+        holder.wait(timeout=10)
+    # The lock goes away with the process
+    assert election.try_acquire()
+    asyncio.run(election.stop())
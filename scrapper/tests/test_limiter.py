@@ -0,0 +1,190 @@
+"""
+Upstream rate limiter: token bucket, priorities, cancellation and pauses
+"""
+
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+import scraper_base
+from scraper_base import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    UpstreamLimiter,
+    WebScraper,
+    parse_retry_after,
+)
+
+
+@pytest.mark.parametrize("workers, requests_per_second", [(4, 1), (11, 10)])
+def test_share_of_the_burst_is_at_least_one_request(monkeypatch, workers, requests_per_second):
+    monkeypatch.setenv("WORKERS", str(workers))
+    monkeypatch.setenv("REQUESTS_PER_SECOND", str(requests_per_second))
+    monkeypatch.delenv("UPSTREAM_BURST", raising=False)
+    limiter = UpstreamLimiter()
+    assert limiter.requests_per_second == requests_per_second / workers
+    assert limiter.burst == 1.0
+
+    async def run():
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+        limiter.release()
+
+    asyncio.run(run())
+
+
+def test_rejects_workers_below_one(monkeypatch):
+    monkeypatch.setenv("WORKERS", "0")
+    with pytest.raises(ValueError):
+        UpstreamLimiter()
+
+
+def test_tokens_refill_at_the_configured_rate():
+    limiter = UpstreamLimiter(requests_per_second=20, burst=2, max_in_flight=10)
+
+    async def run():
+        start = time.monotonic()
+        # The burst is granted right away, then one request every 50 ms
+        for _ in range(4):
+            await limiter.acquire()
+        elapsed = time.monotonic() - start
+        assert 0.09 <= elapsed < 0.5
+        assert limiter.granted == 4 and limiter.in_flight == 4
+
+    asyncio.run(run())
+    time.sleep(0.2)
+    limiter._refill(time.monotonic())
+    # Never more than the burst
+    assert limiter._tokens == 2
+
+
+async def hold_all_slots(limiter: UpstreamLimiter):
+    for _ in range(limiter.max_in_flight):
+        await limiter.acquire()
+
+
+def test_waiters_are_granted_by_priority_then_arrival():
+    limiter = UpstreamLimiter(requests_per_second=0, max_in_flight=1)
+    order = []
+
+    async def fetch(name, priority):
+        await limiter.acquire(priority)
+        order.append(name)
+        limiter.release()
+
+    async def run():
+        await hold_all_slots(limiter)
+        tasks = [
+            asyncio.create_task(fetch(name, priority))
+            for name, priority in [
+                ("background", PRIORITY_BACKGROUND),
+                ("bulk", PRIORITY_BULK),
+                ("interactive 1", PRIORITY_INTERACTIVE),
+                ("interactive 2", PRIORITY_INTERACTIVE),
+            ]
+        ]
+        await asyncio.sleep(0)
+        assert limiter.waiting == 4
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["interactive 1", "interactive 2", "bulk", "background"]
+    assert limiter.waits == {"interactive": 2, "bulk": 1, "background": 1}
+    assert limiter.in_flight == 0
+
+
+def test_cancelled_waiters_give_up_their_turn():
+    limiter = UpstreamLimiter(requests_per_second=0, max_in_flight=1)
+
+    async def run():
+        await hold_all_slots(limiter)
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        limiter.release()
+        await asyncio.wait_for(second, timeout=1)
+        assert first.cancelled()
+        assert limiter.in_flight == 1
+
+    asyncio.run(run())
+
+
+def test_waiter_cancelled_as_it_is_granted_hands_the_slot_on():
+    limiter = UpstreamLimiter(requests_per_second=0, max_in_flight=1)
+
+    async def run():
+        await hold_all_slots(limiter)
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # Grants the first waiter, which is cancelled before it runs
+        limiter.release()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await asyncio.wait_for(second, timeout=1)
+        assert limiter.in_flight == 1
+
+    asyncio.run(run())
+
+
+def test_pause_holds_back_new_and_waiting_fetches():
+    limiter = UpstreamLimiter(requests_per_second=0, max_in_flight=2)
+
+    async def run():
+        await limiter.acquire()
+        limiter.pause(0.2)
+        start = time.monotonic()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        await asyncio.wait_for(waiting, timeout=1)
+        assert time.monotonic() - start >= 0.18
+        assert limiter.pauses == 1
+        # A blocking fetch sleeps through the rest of the pause
+        limiter.pause(0.2)
+        assert 0.15 < limiter.reserve() <= 0.2
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("", None),
+    ("120", 120.0),
+    (" 3 ", 3.0),
+    ("soon", None),
+])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert 25 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    # A date in the past means no wait
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0
+
+
+def test_retry_after_from_upstream_pauses_every_fetch(monkeypatch):
+    limiter = UpstreamLimiter(requests_per_second=0, max_in_flight=10)
+    monkeypatch.setattr(scraper_base, "upstream_limiter", limiter)
+    scraper = WebScraper()
+    assert scraper._throttled(429, {"Retry-After": "1"}) == 1
+    assert limiter.throttled == 1 and limiter.pauses == 1
+    # Capped at the longest retry backoff
+    assert scraper._throttled(503, {"Retry-After": "3600"}) == limiter.backoff_max
+    assert limiter.throttled == 1
+    assert scraper._throttled(429, {}) is None
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire(), timeout=0.1)
+
+    asyncio.run(run())
+    assert limiter.stats()["paused_for"] > 0
@@ -0,0 +1,31 @@
+"""
+Sampling profiler: reading the profile while it is being sampled
+"""
+
+import time
+
+from profiler import SamplingProfiler
+
+
+def busy(seconds: float):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(1000))
+
+
+def test_profile_can_be_read_while_sampling():
+    profiler = SamplingProfiler()
+    profiler.start(5, interval=0.0005)
+    try:
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            busy(0.001)
+            profiler.collapsed()
+            profiler.stats()
+    finally:
+        profiler.stop()
+    lines = profiler.collapsed().splitlines()
+    assert profiler.samples > 0
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == profiler.samples
+    assert any("busy" in line for line in lines)
+    assert profiler.stats()["distinct_stacks"] == len(lines)
@@ -0,0 +1,100 @@
+"""
+Circuit breaker state transitions, on a fake clock
+"""
+
+import pytest
+
+import resilience
+from resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeTime:
+    now = 1000.0
+
+    @classmethod
+    def monotonic(cls) -> float:
+        return cls.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    FakeTime.now = 1000.0
+    monkeypatch.setattr(resilience, "time", FakeTime)
+    return FakeTime
+
+
+def failures(breaker: CircuitBreaker, count: int):
+    for _ in range(count):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_opens_after_threshold_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, open_seconds=30)
+    failures(breaker, 2)
+    assert breaker.state == CLOSED
+    failures(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.opens == 1
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3, open_seconds=30)
+    failures(breaker, 2)
+    breaker.record_success()
+    failures(breaker, 2)
+    assert breaker.state == CLOSED
+
+
+def test_lets_one_probe_through_after_open_seconds(clock):
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=30)
+    failures(breaker, 1)
+    clock.now += 29.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=30)
+    failures(breaker, 1)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_failed_probe_opens_again(clock):
+    breaker = CircuitBreaker(failure_threshold=3, open_seconds=30)
+    failures(breaker, 3)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.opens == 2
+    assert not breaker.allow()
+    assert breaker.stats()["retry_in"] == 30
+
+
+def test_probe_that_never_reports_back_is_replaced(clock):
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=30)
+    failures(breaker, 1)
+    clock.now += 30
+    assert breaker.allow()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_threshold_zero_disables_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=0, open_seconds=30)
+    failures(breaker, 100)
+    assert breaker.state == CLOSED
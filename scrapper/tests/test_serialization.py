@@ -0,0 +1,162 @@
+"""
+Response encoding: JSON serialization, content negotiation, the encoded
+body cache and conditional requests
+"""
+
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import main
+import serialization
+from serialization import ENCODINGS, BodyCache, EncodedBody, dumps, negotiate
+from snapshot import Snapshot
+
+PAYLOAD = {"teams": [{"id": str(i), "name": f"Équipe {i}", "members": [{"name": "Zoé"}]} for i in range(100)]}
+
+# The preferred encoding, and the one picked when both are accepted equally
+BEST = ENCODINGS[0]
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("GZIP", "gzip"),
+    ("deflate, gzip;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=nope", None),
+    ("*", BEST),
+    ("*;q=0.2, gzip;q=0", "br" if "br" in ENCODINGS else None),
+    ("gzip, br", BEST),
+    ("gzip;q=1, br;q=0.5", "gzip"),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+def test_dumps_is_compact_utf8_json():
+    body = dumps({"name": "Zoé", "values": [1, 2.5, None, True]})
+    assert body == '{"name":"Zoé","values":[1,2.5,null,true]}'.encode("utf-8")
+
+
+def test_dumps_is_the_same_with_or_without_orjson(monkeypatch):
+    pytest.importorskip("orjson")
+    with_orjson = dumps(PAYLOAD)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert dumps(PAYLOAD) == with_orjson
+    assert json.loads(with_orjson) == PAYLOAD
+
+
+def test_encoded_body_variants_are_built_once():
+    body = EncodedBody(dumps(PAYLOAD))
+    identity, etag = body.variant(None)
+    assert identity is body.body and etag == body.etag
+    compressed, gzip_etag = body.variant("gzip")
+    assert gzip.decompress(compressed) == body.body
+    assert gzip_etag == body.etag[:-1] + '-gzip"'
+    assert body.variant("gzip")[0] is compressed
+    assert gzip_etag in body.etags()
+    assert body.size() == len(body.body) + len(compressed)
+    # Same content, same ETag
+    assert EncodedBody(dumps(PAYLOAD)).etag == body.etag
+
+
+def test_body_cache_is_keyed_by_the_source_object():
+    cache = BodyCache(max_entries=2)
+    source, body = {"a": 1}, EncodedBody(b"{}")
+    cache.put("a", source, body)
+    assert cache.get("a", source) is body
+    # An equal but new scrape result is a new source
+    assert cache.get("a", {"a": 1}) is None
+    cache.put("b", {}, EncodedBody(b"[]"))
+    cache.get("a", source)
+    cache.put("c", {}, EncodedBody(b"[]"))
+    # Least recently used first
+    assert cache.keys() == ["a", "c"]
+    cache.invalidate("a")
+    assert cache.keys() == ["c"]
+    assert (cache.hits, cache.misses, cache.invalidations) == (2, 1, 1)
+    disabled = BodyCache(max_entries=0)
+    disabled.put("a", source, body)
+    assert len(disabled) == 0
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", W/"abc-gzip"', True),
+    ('  "other" ,"abc"  ', True),
+    ('"other"', False),
+    ('"ab"', False),
+    ("*", True),
+])
+def test_etag_matches(header, matches):
+    assert main.etag_matches(header, ['"abc"', '"abc-gzip"']) is matches
+
+
+def make_request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/teams",
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.fixture
+def bodies(monkeypatch):
+    cache = BodyCache()
+    monkeypatch.setattr(main, "response_bodies", cache)
+    return cache
+
+
+def test_snapshot_response_negotiates_and_reuses_the_body(bodies):
+    snapshot = Snapshot(PAYLOAD)
+    respond = lambda headers: main.snapshot_response(make_request(headers), "teams", snapshot, main.teams_response, "no-cache")
+
+    plain = respond({})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+    assert json.loads(plain.body) == main.teams_response(PAYLOAD)
+
+    compressed = respond({"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(compressed.body) == plain.body
+    assert compressed.headers["etag"] != plain.headers["etag"]
+    assert (bodies.hits, bodies.misses) == (1, 1)
+
+    # Any variant's ETag validates the others
+    for etag in (plain.headers["etag"], "W/" + compressed.headers["etag"]):
+        not_modified = respond({"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert not_modified.status_code == 304 and not_modified.body == b""
+        assert not_modified.headers["etag"] == compressed.headers["etag"]
+        assert not_modified.headers["vary"] == "Accept-Encoding"
+
+    # A new scrape result is encoded again
+    changed = main.snapshot_response(make_request({}), "teams", Snapshot({"teams": []}), main.teams_response, "no-cache")
+    assert json.loads(changed.body) == {"teams": []}
+    assert bodies.misses == 2
+
+
+def test_small_bodies_are_not_compressed():
+    response = main.json_response(make_request({"Accept-Encoding": "gzip"}), {"ok": True}, "no-cache")
+    assert "content-encoding" not in response.headers
+    assert response.body == b'{"ok":true}'
+
+
+def test_search_answers_not_modified():
+    client = TestClient(main.app)
+    response = client.get("/search", params={"q": "zz"})
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert client.get("/search", params={"q": "zz"}, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/search", params={"q": "zz"}, headers={"If-None-Match": f'"nope", W/{etag}'}).status_code == 304
+    assert client.get("/search", params={"q": "zz"}, headers={"If-None-Match": '"nope"'}).status_code == 200
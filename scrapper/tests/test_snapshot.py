@@ -0,0 +1,141 @@
+"""
+Snapshot store: results saved to SQLite come back identical after a
+restart, and are passed to the listeners once each
+"""
+
+import asyncio
+import json
+import os
+
+import snapshot as snapshot_module
+from scrapers import CHALLENGES_URL, NuitDelInfoScraper, challenge_url, team_url
+from snapshot import SnapshotDatabase, SnapshotStore
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def scrape_results():
+    """Results of every page kind, by snapshot key"""
+    scraper = NuitDelInfoScraper("lxml")
+    return {
+        "teams:" + challenge_url("174"): scraper.extract_teams(load_fixture("challenge_principal.html")),
+        team_url("28"): scraper.extract_team_details(load_fixture("team_details.html"), "28"),
+        CHALLENGES_URL: scraper.extract_challenges(load_fixture("challenge_list.html")),
+        challenge_url("494"): scraper.extract_challenge_details(load_fixture("challenge_details.html")),
+        team_url("404"): {"error": "Failed to fetch page", "team_id": "404"},
+    }
+
+
+def save_all(path: str, results):
+    store = SnapshotStore(SnapshotDatabase(path), max_age=60)
+    for i, (key, value) in enumerate(results.items()):
+        store.put(key, value, fetched_at=1_700_000_000.0 + i)
+    # Waits for the queued saves
+    store.database.close()
+
+
+def test_restored_snapshots_match_the_saved_results(tmp_path):
+    path = str(tmp_path / "snapshots.db")
+    results = scrape_results()
+    save_all(path, results)
+
+    async def run():
+        store = SnapshotStore(SnapshotDatabase(path), max_age=60)
+        events = []
+        store.add_listener(lambda key, snapshot, origin: events.append((key, origin)))
+        count = await store.restore()
+        # Nothing is decoded or passed to the listeners until read or replayed
+        assert events == []
+        assert sorted(store.keys()) == sorted(results)
+        assert len(store) == len(results)
+
+        first_key = team_url("28")
+        assert store.get(first_key) is not None
+        assert events == [(first_key, "restore")]
+        replayed = await store.replay()
+        store.database.close()
+        return store, count, replayed, events
+
+    store, count, replayed, events = asyncio.run(run())
+    assert count == len(results)
+    assert replayed == len(results) - 1
+    assert sorted(events) == sorted((key, "restore") for key in results)
+    for i, (key, value) in enumerate(results.items()):
+        restored = store.get(key)
+        assert store.is_restored(key)
+        assert restored.fetched_at == 1_700_000_000.0 + i
+        assert restored.max_age == 60
+        # Key order included
+        assert json.dumps(restored.value, ensure_ascii=False) == json.dumps(value, ensure_ascii=False)
+    assert store.get(team_url("404")).is_error()
+
+
+def test_team_and_challenge_results_are_kept_compact(tmp_path):
+    path = str(tmp_path / "snapshots.db")
+    results = scrape_results()
+    save_all(path, results)
+
+    async def run():
+        store = SnapshotStore(SnapshotDatabase(path), max_age=60)
+        await store.restore()
+        await store.replay()
+        store.database.close()
+        return store
+
+    store = asyncio.run(run())
+    if snapshot_module.COMPACT_SNAPSHOTS:
+        for key in (team_url("28"), challenge_url("494")):
+            assert not isinstance(store.get(key).data, dict)
+    assert isinstance(store.get(team_url("404")).data, dict)
+
+
+def test_replacing_a_restored_snapshot_replays_it_first(tmp_path):
+    path = str(tmp_path / "snapshots.db")
+    results = scrape_results()
+    save_all(path, results)
+    key = team_url("28")
+    changed = {**results[key], "name": "Renamed"}
+
+    async def run():
+        store = SnapshotStore(SnapshotDatabase(path), max_age=60)
+        previous = []
+        store.add_listener(lambda k, snapshot, origin: previous.append((origin, snapshot.value["name"])) if k == key else None)
+        await store.restore()
+        store.put(key, changed)
+        store.database.close()
+        return store, previous
+
+    store, previous = asyncio.run(run())
+    assert previous == [("restore", results[key]["name"]), ("put", "Renamed")]
+    assert not store.is_restored(key)
+    assert store.get(key).value["name"] == "Renamed"
+
+
+def test_snapshot_size_is_measured_once(monkeypatch):
+    measured = []
+    real_dumps = snapshot_module.dumps
+    monkeypatch.setattr(snapshot_module, "dumps", lambda value: measured.append(value) or real_dumps(value))
+    result = scrape_results()[team_url("28")]
+    snapshot = snapshot_module.Snapshot(result)
+    assert snapshot.size == len(json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    assert snapshot.size == snapshot.with_max_age(5).size
+    assert len(measured) == 1
+
+
+def test_restored_snapshot_size_comes_from_the_saved_json(tmp_path, monkeypatch):
+    path = str(tmp_path / "snapshots.db")
+    results = scrape_results()
+    save_all(path, results)
+    monkeypatch.setattr(snapshot_module, "dumps", None)
+    store = SnapshotStore(SnapshotDatabase(path), max_age=60)
+    asyncio.run(store.restore())
+    try:
+        for key, value in results.items():
+            assert store.get(key).size == len(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    finally:
+        store.database.close()